@@ -0,0 +1,24 @@
+"""
+gunicorn sozlamalari (`gunicorn` ishga tushirilgan papkadan avtomatik o'qiladi).
+
+Sayt WSGI orqali gthread workerlarida ishlaydi: eksportlar (StreamingHttpResponse,
+FileResponse) iterator bo'yicha, xotirada to'planmasdan yuboriladi. Lentaning
+long-poll so'rovlari (/api/shipments/changes/?wait=) qisqa (feed.MAX_WAIT) va
+faqat bitta threadni band qiladi, shuning uchun har bir workerda bir nechta thread.
+
+    gunicorn                      # shu fayl bilan
+    WEB_CONCURRENCY=4 WEB_THREADS=16 gunicorn
+"""
+import os
+
+# SQLite bo'lsa: server jarayonlarida WAL rejimi (config/settings.py, SQLITE_WAL)
+os.environ.setdefault('SQLITE_WAL', 'True')
+
+wsgi_app = 'config.wsgi:application'
+worker_class = 'gthread'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('WEB_THREADS', '8'))
+# Long-poll (feed.MAX_WAIT = 25) va katta eksportlardan uzunroq
+timeout = 90
+graceful_timeout = 30
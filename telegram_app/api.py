@@ -0,0 +1,254 @@
+"""
+Faqat o'qish uchun JSON API (v1): yuklar, xabarlar va kanal statistikasi.
+
+- `?fields=origin,destination` - faqat kerakli ustunlar (bazadan ham faqat
+  shular o'qiladi).
+- Kursor pagination (pagination.py): `next` / `previous` havolalari.
+- ETag va Last-Modified bazadan (oxirgi xabar id si, yuklarning eng yangi
+  updated_at - ikkalasi indeks bo'yicha bitta qator o'qiydi), shuning uchun
+  barcha workerlarda bir xil: o'zgarmagan ma'lumotga qayta so'rov asosiy
+  so'rovni bajarmasdan 304 oladi.
+- Javoblar gzip bilan siqiladi.
+"""
+import hashlib
+from functools import partial, wraps
+from operator import attrgetter
+
+from django.db.models import Max
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET
+
+from .contacts import normalize_phone
+from .feed import BATCH_LIMIT, MAX_BATCH_LIMIT, MAX_WAIT, parse_cursor, stream_changes, wait_for_changes
+from .models import Message, Shipment
+from .pagination import keyset_paginate
+from .stats import get_channel_stats
+from .utils import InvalidDateRange, resolve_date_range
+
+API_VERSION = 'v1'
+MAX_PER_PAGE = 200
+
+# API maydoni -> (bazadan o'qiladigan ustunlar, qiymatni olish)
+SHIPMENT_FIELDS = {
+    'id': (('id',), attrgetter('id')),
+    'date': (('date',), attrgetter('date')),
+    'channel_id': (('message__channel__channel_id',), lambda s: s.message.channel.channel_id),
+    'message_id': (('message__message_id',), lambda s: s.message.message_id),
+    'origin': (('origin',), attrgetter('origin')),
+    'destination': (('destination',), attrgetter('destination')),
+    'cargo_type': (('cargo_type',), attrgetter('cargo_type')),
+    'truck_type': (('truck_type',), attrgetter('truck_type')),
+    'payment_type': (('payment_type',), attrgetter('payment_type')),
+    'phone': (('phone',), attrgetter('phone')),
+    'contact_kind': (('contact_kind',), attrgetter('contact_kind')),
+}
+
+MESSAGE_FIELDS = {
+    'id': (('id',), attrgetter('id')),
+    'date': (('date',), attrgetter('date')),
+    'channel_id': (('channel__channel_id',), lambda m: m.channel.channel_id),
+    'message_id': (('message_id',), attrgetter('message_id')),
+    'sender_id': (('sender_id',), attrgetter('sender_id')),
+    'sender_name': (('sender_name',), attrgetter('sender_name')),
+    # Siqilgan matn o'qishda ochiladi (Message.from_db)
+    'text': (('text', 'text_zstd', 'text_dictionary'), attrgetter('text')),
+    'duplicate_of': (('duplicate_of',), attrgetter('duplicate_of_id')),
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _data_state(request):
+    """(eng katta Message.id, eng yangi Shipment.updated_at) - so'rov davomida bir marta o'qiladi."""
+    state = getattr(request, '_api_data_state', None)
+    if state is None:
+        # Alohida so'rovlar: har biri indeksdan bitta qator (MIN/MAX optimizatsiyasi)
+        state = request._api_data_state = (
+            Message.objects.aggregate(last=Max('id'))['last'],
+            Shipment.objects.aggregate(last=Max('updated_at'))['last'],
+        )
+    return state
+
+
+def _etag(request, *args, **kwargs):
+    query = sorted((k, v) for k, v in request.GET.lists())
+    raw = f"{API_VERSION}:{request.path}:{query}:{_data_state(request)}"
+    return 'api:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _shipments_modified(request, *args, **kwargs):
+    return _data_state(request)[1]
+
+
+def api_view(view=None, *, last_modified=_shipments_modified):
+    """
+    GET + gzip + shartli so'rov (If-None-Match / If-Modified-Since).
+    `last_modified=None` - javob yuklarga bog'liq bo'lmasa (faqat ETag).
+    """
+    if view is None:
+        return partial(api_view, last_modified=last_modified)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return _error(str(exc))
+    return gzip_page(require_GET(condition(etag_func=_etag, last_modified_func=last_modified)(wrapper)))
+
+
+def _select_fields(request, available):
+    raw = request.GET.get('fields', '').strip()
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f"Noma'lum maydonlar: {', '.join(unknown)}. Mavjud: {', '.join(available)}")
+    return fields
+
+
+def _per_page(request):
+    try:
+        return max(1, min(int(request.GET.get('limit') or 50), MAX_PER_PAGE))
+    except ValueError:
+        raise BadRequest("limit butun son bo'lishi kerak")
+
+
+def _date_filter(request, queryset, date_field):
+    if not request.GET.get('date_from') and not request.GET.get('date_to'):
+        return queryset
+    try:
+        start, end, _, _ = resolve_date_range(request.GET.get('date_from'), request.GET.get('date_to'))
+    except InvalidDateRange as exc:
+        raise BadRequest(str(exc))
+    return queryset.filter(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+
+
+def _paginated(request, queryset, spec, fields, date_field):
+    # Kursor uchun sana ustuni har doim o'qiladi
+    columns = {date_field, 'id'}
+    for name in fields:
+        columns.update(spec[name][0])
+    # message__channel__channel_id -> JOIN message, message__channel
+    relations = {
+        '__'.join(column.split('__')[:depth])
+        for column in columns
+        for depth in range(1, column.count('__') + 1)
+    }
+    queryset = queryset.select_related(*relations).only(*columns, *relations)
+
+    page = keyset_paginate(request, queryset, date_field=date_field, per_page=_per_page(request), with_total=False)
+    base = request.build_absolute_uri(request.path)
+    return JsonResponse({
+        'results': [{name: spec[name][1](obj) for name in fields} for obj in page.object_list],
+        'next': base + page.next_url if page.next_url else None,
+        'previous': base + page.prev_url if page.prev_url else None,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def shipments_api(request):
+    """GET /api/v1/shipments/?channel=&origin=&destination=&cargo_type=&phone=&date_from=&date_to="""
+    fields = _select_fields(request, SHIPMENT_FIELDS)
+    shipments = Shipment.objects.all()
+
+    if request.GET.get('channel'):
+        shipments = shipments.filter(channel__channel_id=request.GET['channel'])
+    for name in ('origin', 'destination'):
+        if request.GET.get(name):
+            shipments = shipments.filter(**{f'{name}__iexact': request.GET[name]})
+    if request.GET.get('cargo_type'):
+        shipments = shipments.filter(cargo_type=request.GET['cargo_type'])
+    if request.GET.get('phone'):
+        shipments = shipments.filter(contact__phone=normalize_phone(request.GET['phone']))
+    shipments = _date_filter(request, shipments, 'date')
+
+    return _paginated(request, shipments, SHIPMENT_FIELDS, fields, 'date')
+
+
+# Xabar sanasi Telegramdagi vaqt (tarix yuklanganda eski bo'ladi) - Last-Modified uchun yaramaydi
+@api_view(last_modified=None)
+def messages_api(request):
+    """GET /api/v1/messages/?channel=&date_from=&date_to="""
+    fields = _select_fields(request, MESSAGE_FIELDS)
+    messages = Message.objects.all()
+
+    if request.GET.get('channel'):
+        messages = messages.filter(channel__channel_id=request.GET['channel'])
+    messages = _date_filter(request, messages, 'date')
+
+    return _paginated(request, messages, MESSAGE_FIELDS, fields, 'date')
+
+
+@api_view
+def channel_stats_api(request, channel_id):
+    """GET /api/v1/channels/<id>/stats/ - stats.html dagi agregatlar (bir xil kesh)"""
+    from .views import _get_filtered_shipments
+
+    shipments, date_from, date_to = _get_filtered_shipments(request, channel_id)
+    stats = get_channel_stats(channel_id, shipments, {
+        'date_from': date_from,
+        'date_to': date_to,
+        'search': request.GET.get('search', '').strip(),
+    })
+
+    try:
+        limit = max(1, min(int(request.GET.get('limit') or 100), 1000))
+    except ValueError:
+        raise BadRequest("limit butun son bo'lishi kerak")
+
+    return JsonResponse({
+        'channel_id': channel_id,
+        'total': stats['total'],
+        'oldest': stats['oldest'],
+        'newest': stats['newest'],
+        'routes': stats['route'][:limit],
+        'cargo': stats['cargo'][:limit],
+        'trucks': stats['truck'][:limit],
+        'payments': stats['payment'][:limit],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@require_GET
+def shipment_changes_api(request):
+    """
+    GET /api/shipments/changes/?since=<cursor>&limit=&wait=<soniya>
+    NDJSON: har qatorda bitta yuk, oxirgi qatorda keyingi `since` kursori.
+    `wait` berilsa va yangi o'zgarish bo'lmasa, ko'pi bilan shuncha (MAX_WAIT)
+    soniya kutiladi (qisqa long-poll).
+    """
+    try:
+        cursor = parse_cursor(request.GET.get('since'))
+    except ValueError:
+        return _error("Noto'g'ri kursor")
+    try:
+        limit = max(1, min(int(request.GET.get('limit') or BATCH_LIMIT), MAX_BATCH_LIMIT))
+        wait = max(0.0, min(float(request.GET.get('wait') or 0), MAX_WAIT))
+    except ValueError:
+        return _error("limit va wait son bo'lishi kerak")
+
+    if wait:
+        wait_for_changes(cursor, wait)
+
+    # WSGI ostida qatorlar iterator bo'yicha yuboriladi (xotirada to'planmaydi)
+    response = StreamingHttpResponse(stream_changes(cursor, limit), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@require_GET
+def outbox_stats_api(request):
+    """GET /api/outbox/stats/ - bot xabarlari navbati: chuqurlik va yuborish kechikishi (soniya)"""
+    from . import outbox
+
+    response = JsonResponse(outbox.stats())
+    response['Cache-Control'] = 'no-store'
+    return response
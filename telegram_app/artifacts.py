@@ -0,0 +1,157 @@
+"""
+Tayyor export fayllari keshi (web va bot uchun umumiy).
+
+Kalit - export tavsifi (format, sana oralig'i, filtrlar) va ma'lumot
+versiyasi (qatorlar soni, max id, max updated_at) dan olingan sha256: ma'lumot
+o'zgarmasa bir xil fayl qayta yaratilmaydi. Fayllar EXPORT_CACHE_DIR da,
+yonidagi .json faylda esa meta (fayl nomi, Telegram file_id) saqlanadi.
+Umumiy hajm EXPORT_CACHE_MAX_BYTES dan oshsa eng uzoq ishlatilmaganlari
+(mtime bo'yicha, LRU) o'chiriladi.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@dataclass
+class Artifact:
+    key: str
+    path: Path
+    filename: str
+    meta: dict = field(default_factory=dict)
+    hit: bool = False
+
+    @property
+    def file_id(self):
+        return self.meta.get('telegram_file_id')
+
+    @property
+    def size(self):
+        return self.path.stat().st_size
+
+
+def cache_dir() -> Path:
+    path = Path(settings.EXPORT_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def artifact_key(**descriptor) -> str:
+    raw = json.dumps(descriptor, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _meta_path(path: Path) -> Path:
+    return path.with_name(path.name + '.json')
+
+
+def _read_meta(path: Path) -> dict:
+    try:
+        return json.loads(_meta_path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path: Path, meta: dict):
+    tmp = path.with_name(path.name + '.json.tmp')
+    tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, _meta_path(path))
+
+
+def _lock(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def get_or_build(key, extension, filename, build):
+    """
+    Keshdagi faylni qaytarish yoki `build()` (fayl obyekti qaytaradi) bilan yaratish.
+    Bir xil kalit uchun bir vaqtda faqat bitta build ishlaydi.
+    """
+    path = cache_dir() / f"{key}.{extension}"
+    with _lock(key):
+        if path.exists():
+            os.utime(path)  # LRU: oxirgi ishlatilgan vaqt
+            return Artifact(key, path, filename, _read_meta(path), hit=True)
+
+        source = build()
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            with open(tmp, 'wb') as out:
+                shutil.copyfileobj(source, out, 1024 * 1024)
+            os.replace(tmp, path)
+        finally:
+            source.close()
+            if tmp.exists():
+                tmp.unlink()
+
+        meta = {'filename': filename}
+        _write_meta(path, meta)
+
+    evict()
+    return Artifact(key, path, filename, meta)
+
+
+def zipped(artifact: Artifact) -> Artifact:
+    """Artefaktning zip (deflate) nusxasi - u ham shu keshda saqlanadi."""
+    def build():
+        output = SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(artifact.path, arcname=artifact.filename)
+        output.seek(0)
+        return output
+
+    extension = artifact.path.name.partition('.')[2] + '.zip'
+    return get_or_build(f"{artifact.key}-zip", extension, f"{artifact.filename}.zip", build)
+
+
+def remember_file_id(artifact: Artifact, file_id: str):
+    """Bot yuklagan faylning Telegram file_id si - keyingi safar qayta yuklanmaydi."""
+    artifact.meta['telegram_file_id'] = file_id
+    if artifact.path.exists():
+        _write_meta(artifact.path, artifact.meta)
+
+
+def forget_file_id(artifact: Artifact):
+    artifact.meta.pop('telegram_file_id', None)
+    if artifact.path.exists():
+        _write_meta(artifact.path, artifact.meta)
+
+
+def evict(max_bytes=None):
+    """Umumiy hajm chegaradan oshsa eng eski ishlatilgan fayllarni o'chirish."""
+    max_bytes = settings.EXPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    for path in cache_dir().iterdir():
+        if path.suffix in ('.json', '.tmp'):
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        for victim in (path, _meta_path(path)):
+            try:
+                victim.unlink()
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,71 @@
+"""
+Bot jarayoniga (manage.py runbot) topshiriladigan vazifalar navbati.
+
+Web yoki export worker botni o'zi ishga tushirmaydi: `enqueue()` bazaga
+yozadi, doimiy ishlayotgan bot jarayoni esa navbatni tekshirib, bitta
+`Application` orqali bajaradi. Vazifa atomik `UPDATE ... WHERE
+status='pending'` bilan olinadi; jarayon o'lib qolsa "running" vazifa
+STALE_AFTER dan keyin navbatga qaytadi (MAX_ATTEMPTS gacha).
+"""
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BotTask
+
+STALE_AFTER = timedelta(minutes=10)
+MAX_ATTEMPTS = 3
+
+Status = BotTask.Status
+
+
+def enqueue(kind, **payload):
+    return BotTask.objects.create(kind=kind, payload=payload)
+
+
+def requeue_stale():
+    stale = BotTask.objects.filter(status=Status.RUNNING, started_at__lt=timezone.now() - STALE_AFTER)
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=Status.FAILED, error="Jarayon to'xtab qoldi", finished_at=timezone.now()
+    )
+    return stale.update(status=Status.PENDING)
+
+
+def claim_next():
+    """Navbatdagi birinchi vazifani atomik olish (yoki None)."""
+    for task_id in BotTask.objects.filter(status=Status.PENDING).order_by('id').values_list('id', flat=True)[:5]:
+        claimed = BotTask.objects.filter(id=task_id, status=Status.PENDING).update(
+            status=Status.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            return BotTask.objects.get(id=task_id)
+    return None
+
+
+def next_task():
+    """Bot jarayoni sikli uchun: eskirgan ulanishlar yopiladi, o'lik vazifalar qaytariladi."""
+    close_old_connections()
+    requeue_stale()
+    return claim_next()
+
+
+def finish(task, error=None):
+    """Bajarildi yoki xatolik; xatolikda urinishlar qolgan bo'lsa navbatga qaytadi."""
+    if error is None:
+        status = Status.DONE
+    elif task.attempts < MAX_ATTEMPTS:
+        status = Status.PENDING
+    else:
+        status = Status.FAILED
+    BotTask.objects.filter(id=task.id).update(
+        status=status,
+        error=str(error or ''),
+        finished_at=timezone.now() if status != Status.PENDING else None,
+    )
+    return status
+
+
+def pending_count():
+    return BotTask.objects.filter(status=Status.PENDING).count()
@@ -1,16 +1,43 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from dataclasses import dataclass
 from datetime import timedelta
 
 from django.conf import settings
 from django.utils import timezone
 
-from telegram import Update, InputFile, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, ApplicationBuilder, CommandHandler, ContextTypes, CallbackQueryHandler
+from telegram import (
+    Update, InputFile, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent,
+)
+from telegram.ext import (
+    Application, ApplicationBuilder, CommandHandler, ContextTypes, CallbackQueryHandler, InlineQueryHandler,
+)
 
-from .exports import build_shipments_workbook_bytes
+from telegram.error import BadRequest
+from telegram.helpers import escape_markdown
+
+from . import bot_queue, outbox
+from .artifacts import forget_file_id, remember_file_id
+from .exports import available_formats, build_export_part, days_range, export_format, plan_export_parts
+
+logger = logging.getLogger(__name__)
+
+# Bot navbatini (bot_queue.py) tekshirish oralig'i, soniya
+BOT_TASK_POLL = 2.0
+# Katta fayllarni yuklash uchun, soniya
+UPLOAD_TIMEOUT = 300
+# Inline qidiruv: yozish to'xtaguncha kutish va Telegram tomonidagi kesh, soniya
+INLINE_DEBOUNCE = 0.4
+INLINE_CACHE_TIME = 30
+
+FORMAT_LABELS = {
+    'xlsx': '📊 Excel',
+    'csv': '📄 CSV',
+    'csv.gz': '🗜 CSV.gz',
+    'parquet': '🧱 Parquet',
+}
 
 
 @dataclass(frozen=True)
@@ -36,7 +63,40 @@ def _is_admin_chat(chat_id: int) -> bool:
     return int(chat_id) == int(cfg.admin_chat_id)
 
 
-async def _send_export(application: Application, *, days: int) -> None:
+async def _send_artifact(application: Application, chat_id: int, artifact, caption: str) -> None:
+    # Avval yuklangan fayl Telegramga qayta yuklanmaydi - file_id yetarli
+    if artifact.file_id:
+        try:
+            await outbox.send_with_limits(chat_id, lambda: application.bot.send_document(
+                chat_id=chat_id, document=artifact.file_id, caption=caption, parse_mode='Markdown'
+            ))
+            return
+        except BadRequest:
+            forget_file_id(artifact)
+
+    async def upload():
+        # Fayl xotiraga o'qilmaydi: diskdan oqim bilan yuklanadi
+        with open(artifact.path, 'rb') as fh:
+            return await application.bot.send_document(
+                chat_id=chat_id,
+                document=InputFile(fh, filename=artifact.filename, read_file_handle=False),
+                caption=caption,
+                parse_mode='Markdown',
+                write_timeout=UPLOAD_TIMEOUT,
+                read_timeout=UPLOAD_TIMEOUT,
+            )
+
+    message = await outbox.send_with_limits(chat_id, upload)
+    if message.document:
+        remember_file_id(artifact, message.document.file_id)
+
+
+async def _send_export(application: Application, *, days: int, fmt: str = 'xlsx', status=None) -> int:
+    """
+    Exportni admin chatga yuborish. Fayl Telegram limitidan oshadigan bo'lsa haftalarga /
+    kanallarga bo'linadi yoki zip qilinadi (exports.plan_export_parts).
+    `status(matn)` - progress xabarini yangilash. Qaytaradi: yuborilgan fayllar soni.
+    """
     from asgiref.sync import sync_to_async
 
     cfg = get_bot_config()
@@ -46,23 +106,42 @@ async def _send_export(application: Application, *, days: int) -> None:
     if days > 60:
         days = 60
 
-    today = timezone.localdate()
-    date_from = today - timedelta(days=days - 1)
-    date_to = today
-
-    # ✅ TO'G'RILANDI: sync_to_async bilan chaqirish
-    data = await sync_to_async(build_shipments_workbook_bytes)(days=days)
-    filename = f"shipments_{date_from.isoformat()}_{date_to.isoformat()}.xlsx"
-
-    await application.bot.send_document(
-        chat_id=cfg.admin_chat_id,
-        document=InputFile(data, filename=filename),
-        caption=f"📊 *TG Yuk Monitor Hisobot*\n\n"
-                f"📅 Sana: {date_from.isoformat()} → {date_to.isoformat()}\n"
-                f"⏰ Muddat: {days} kun\n"
-                f"✅ Fayl tayyor!",
-        parse_mode='Markdown'
-    )
+    date_from, date_to = days_range(days)
+    fmt = export_format(fmt)
+    parts = await sync_to_async(plan_export_parts)(date_from, date_to, fmt)
+
+    if status is None and len(parts) > 1:
+        progress_message = await application.bot.send_message(
+            chat_id=cfg.admin_chat_id, text=f"⏳ {FORMAT_LABELS[fmt]}: {len(parts)} qismga bo'linadi..."
+        )
+        status = progress_message.edit_text
+
+    for number, part in enumerate(parts, start=1):
+        if status and len(parts) > 1:
+            try:
+                await status(f"📤 {FORMAT_LABELS[fmt]}: {number}/{len(parts)} qism yuborilmoqda\n{part.label}")
+            except BadRequest:
+                pass
+
+        # Ma'lumot o'zgarmagan bo'lsa fayl keshdan olinadi (artifacts.py)
+        artifact = await sync_to_async(build_export_part)(part, fmt)
+        caption = (
+            f"📊 *TG Yuk Monitor Hisobot*\n\n"
+            f"📅 Sana: {date_from.isoformat()} → {date_to.isoformat()}\n"
+            f"⏰ Muddat: {days} kun\n"
+            f"📁 Format: {FORMAT_LABELS[fmt]}\n"
+        )
+        if len(parts) > 1:
+            caption += f"🧩 Qism: {number}/{len(parts)} ({escape_markdown(part.label)})\n"
+        caption += "✅ Fayl tayyor!"
+        await _send_artifact(application, cfg.admin_chat_id, artifact, caption)
+
+    if status and len(parts) > 1:
+        try:
+            await status(f"✅ {FORMAT_LABELS[fmt]}: {len(parts)} ta qism yuborildi")
+        except BadRequest:
+            pass
+    return len(parts)
 
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -118,20 +197,27 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text("❌ Ruxsat yo'q!")
         return
 
-    # Excel export menyusi
-    if query.data == "show_export_menu":
+    # Excel export menyusi (format tanlash: show_export_menu:csv)
+    if query.data == "show_export_menu" or query.data.startswith("show_export_menu:"):
+        fmt = export_format(query.data.partition(":")[2])
         keyboard = [
             [
-                InlineKeyboardButton("📅 1 kun", callback_data="export_1"),
-                InlineKeyboardButton("📅 3 kun", callback_data="export_3"),
+                InlineKeyboardButton("📅 1 kun", callback_data=f"export_1_{fmt}"),
+                InlineKeyboardButton("📅 3 kun", callback_data=f"export_3_{fmt}"),
+            ],
+            [
+                InlineKeyboardButton("📅 7 kun", callback_data=f"export_7_{fmt}"),
+                InlineKeyboardButton("📅 14 kun", callback_data=f"export_14_{fmt}"),
             ],
             [
-                InlineKeyboardButton("📅 7 kun", callback_data="export_7"),
-                InlineKeyboardButton("📅 14 kun", callback_data="export_14"),
+                InlineKeyboardButton("📅 30 kun", callback_data=f"export_30_{fmt}"),
+                InlineKeyboardButton("📅 60 kun", callback_data=f"export_60_{fmt}"),
             ],
             [
-                InlineKeyboardButton("📅 30 kun", callback_data="export_30"),
-                InlineKeyboardButton("📅 60 kun", callback_data="export_60"),
+                InlineKeyboardButton(
+                    ("✅ " if code == fmt else "") + FORMAT_LABELS[code], callback_data=f"show_export_menu:{code}"
+                )
+                for code in available_formats()
             ],
             [
                 InlineKeyboardButton("◀️ Orqaga", callback_data="back_to_main"),
@@ -140,8 +226,9 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         await query.edit_message_text(
-            "📊 *Excel Export*\n\n"
-            "Ma'lumotlarni Excel formatida yuklash uchun muddatni tanlang:\n\n"
+            "📊 *Export*\n\n"
+            "Ma'lumotlarni yuklash uchun format va muddatni tanlang:\n\n"
+            f"📁 Format: {FORMAT_LABELS[fmt]}\n"
             "⏰ Kunlik avtomatik export: har kuni soat 00:05",
             reply_markup=reply_markup,
             parse_mode='Markdown'
@@ -158,7 +245,10 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "ℹ️ *Yordam*\n\n"
             "🤖 *Bot buyruqlari:*\n"
             "• /start - Botni ishga tushirish\n"
-            "• /export [kunlar] - Excel yuklash\n\n"
+            "• /export [kunlar] [xlsx|csv|csv.gz|parquet] - Export\n"
+            "• @bot Toshkent Moskva - istalgan chatda yuk qidirish\n"
+            "• /subscribe Fargona \\* ref - yangi yuklarga obuna\n"
+            "• /subscriptions, /unsubscribe <id> - obunalar\n\n"
             "📊 *Excel Export:*\n"
             "Telegram kanallaridagi yuk ma'lumotlarini\n"
             "Excel formatida yuklab olish.\n\n"
@@ -175,38 +265,32 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Statistika
     elif query.data == "stats":
         from asgiref.sync import sync_to_async
-        from .models import Shipment
-
-        today = timezone.localdate()
+        from .stats import get_bot_stats
 
-        # Bugungi yuklar
-        today_count = await sync_to_async(
-            lambda: Shipment.objects.filter(message__date__date=today).count()
-        )()
-
-        # Oxirgi 7 kun
-        week_ago = today - timedelta(days=7)
-        week_count = await sync_to_async(
-            lambda: Shipment.objects.filter(message__date__date__gte=week_ago).count()
-        )()
-
-        # Oxirgi 30 kun
-        month_ago = today - timedelta(days=30)
-        month_count = await sync_to_async(
-            lambda: Shipment.objects.filter(message__date__date__gte=month_ago).count()
-        )()
+        # Bitta so'rov (yoki qisqa muddatli kesh) - bitta thread hop
+        stats, _ = await sync_to_async(get_bot_stats)(timezone.localdate())
 
         keyboard = [
             [InlineKeyboardButton("◀️ Orqaga", callback_data="back_to_main")],
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
+        lanes = "".join(
+            f"• {escape_markdown(row['origin'])} → {escape_markdown(row['destination'])}: {row['total']}\n"
+            for row in stats['lanes']
+        )
+        channels = "".join(
+            f"• {escape_markdown(row['title'])}: {row['total']}\n" for row in stats['channels']
+        )
+
         await query.edit_message_text(
             "📈 *Statistika*\n\n"
-            f"📦 *Bugun:* {today_count} ta yuk\n"
-            f"📅 *Oxirgi 7 kun:* {week_count} ta yuk\n"
-            f"📊 *Oxirgi 30 kun:* {month_count} ta yuk\n\n"
-            f"🕐 *Oxirgi yangilanish:* {timezone.now().strftime('%H:%M')}\n\n"
+            f"📦 *Bugun:* {stats['today']} ta yuk\n"
+            f"📅 *Oxirgi 7 kun:* {stats['week']} ta yuk\n"
+            f"📊 *Oxirgi 30 kun:* {stats['month']} ta yuk\n\n"
+            + (f"🛣 *Top yo'nalishlar (7 kun):*\n{lanes}\n" if lanes else "")
+            + (f"📡 *Kanallar (7 kun):*\n{channels}\n" if channels else "")
+            + f"🕐 *Oxirgi yangilanish:* {timezone.now().strftime('%H:%M')}\n\n"
             f"💡 Batafsil ma'lumot uchun web platformadan foydalaning.",
             reply_markup=reply_markup,
             parse_mode='Markdown'
@@ -236,47 +320,57 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode='Markdown'
         )
 
-    # Excel export
-    elif query.data.startswith("export_"):
-        days = int(query.data.split("_")[1])
+
+async def export_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Excel export tugmalari (export_<kun>_<format>)"""
+    query = update.callback_query
+    await query.answer()
+
+    if not _is_admin_chat(query.message.chat_id):
+        await query.edit_message_text("❌ Ruxsat yo'q!")
+        return
+
+    _, days, *rest = query.data.split("_", 2)
+    days = int(days)
+    fmt = export_format(rest[0] if rest else 'xlsx')
+
+    await query.edit_message_text(
+        f"⏳ *{FORMAT_LABELS[fmt]} tayyorlanmoqda...*\n\n"
+        f"📅 Muddat: {days} kun\n"
+        f"⏱ Iltimos biroz kuting...",
+        parse_mode='Markdown'
+    )
+
+    try:
+        await _send_export(context.application, days=days, fmt=fmt, status=query.edit_message_text)
+
+        keyboard = [
+            [InlineKeyboardButton("📊 Yana export", callback_data=f"show_export_menu:{fmt}")],
+            [InlineKeyboardButton("◀️ Bosh sahifa", callback_data="back_to_main")],
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
 
         await query.edit_message_text(
-            f"⏳ *Excel tayyorlanmoqda...*\n\n"
-            f"📅 Muddat: {days} kun\n"
-            f"⏱ Iltimos biroz kuting...",
+            f"✅ *Fayl yuborildi!*\n\n"
+            f"📊 Muddat: {days} kun\n"
+            f"📥 Fayl yuqorida 👆",
+            reply_markup=reply_markup,
             parse_mode='Markdown'
         )
+    except Exception as e:
+        keyboard = [
+            [InlineKeyboardButton("🔄 Qayta urinish", callback_data=query.data)],
+            [InlineKeyboardButton("◀️ Orqaga", callback_data="show_export_menu")],
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
 
-        try:
-            await _send_export(context.application, days=days)
-
-            keyboard = [
-                [InlineKeyboardButton("📊 Yana export", callback_data="show_export_menu")],
-                [InlineKeyboardButton("◀️ Bosh sahifa", callback_data="back_to_main")],
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            await query.edit_message_text(
-                f"✅ *Excel yuborildi!*\n\n"
-                f"📊 Muddat: {days} kun\n"
-                f"📥 Fayl yuqorida 👆",
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            keyboard = [
-                [InlineKeyboardButton("🔄 Qayta urinish", callback_data=query.data)],
-                [InlineKeyboardButton("◀️ Orqaga", callback_data="show_export_menu")],
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            await query.edit_message_text(
-                f"❌ *Xatolik yuz berdi!*\n\n"
-                f"Xato: {str(e)}\n\n"
-                f"Iltimos qaytadan urinib ko'ring.",
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
+        await query.edit_message_text(
+            f"❌ *Xatolik yuz berdi!*\n\n"
+            f"Xato: {str(e)}\n\n"
+            f"Iltimos qaytadan urinib ko'ring.",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
 
 
 async def cmd_export(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -293,19 +387,20 @@ async def cmd_export(update: Update, context: ContextTypes.DEFAULT_TYPE):
             days = int(context.args[0])
         except Exception:
             days = 1
+    fmt = export_format(context.args[1].lower() if len(context.args or []) > 1 else 'xlsx')
 
-    await update.message.reply_text(
-        f"⏳ *Excel tayyorlanmoqda...*\n\n"
+    progress_message = await update.message.reply_text(
+        f"⏳ *{FORMAT_LABELS[fmt]} tayyorlanmoqda...*\n\n"
         f"📅 Muddat: {days} kun\n"
         f"⏱ Iltimos kuting...",
         parse_mode='Markdown'
     )
 
     try:
-        await _send_export(context.application, days=days)
+        await _send_export(context.application, days=days, fmt=fmt, status=progress_message.edit_text)
         await update.message.reply_text(
             f"✅ *Yuborildi!*\n\n"
-            f"📊 {days} kunlik ma'lumotlar Excel formatida yuborildi.",
+            f"📊 {days} kunlik ma'lumotlar {FORMAT_LABELS[fmt]} formatida yuborildi.",
             parse_mode='Markdown'
         )
     except Exception as e:
@@ -315,15 +410,147 @@ async def cmd_export(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
-def build_application() -> Application:
+# ==================== OBUNALAR ====================
+
+def _can_subscribe(chat_id: int) -> bool:
+    dispatchers = getattr(settings, 'TELEGRAM_DISPATCHER_CHAT_IDS', None) or []
+    return _is_admin_chat(chat_id) or int(chat_id) in dispatchers
+
+
+async def cmd_subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/subscribe Fargona * ref - yangi mos yuklar haqida xabar olish"""
+    from asgiref.sync import sync_to_async
+    from .subscriptions import TRUCK_CATEGORIES, parse_subscription, subscribe
+
+    if not update.effective_chat:
+        return
+    chat_id = update.effective_chat.id
+    if not _can_subscribe(chat_id):
+        await update.message.reply_text("❌ Ruxsat yo'q.")
+        return
+
+    try:
+        origin, destination, truck = parse_subscription(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(
+            f"❌ {e}\n\n"
+            "Misollar:\n"
+            "/subscribe Fargona * ref\n"
+            "/subscribe Toshkent Moskva\n"
+            "/subscribe * Moskva tent\n\n"
+            f"Transport turlari: {', '.join(TRUCK_CATEGORIES)}"
+        )
+        return
+
+    subscription = await sync_to_async(subscribe)(chat_id, origin, destination, truck)
+    await update.message.reply_text(
+        f"🔔 Obuna #{subscription.id}: {subscription}\n"
+        "Mos yangi yuk chiqqanda xabar yuboriladi. Bekor qilish: /unsubscribe " + str(subscription.id)
+    )
+
+
+async def cmd_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/subscriptions - shu chat obunalari"""
+    from asgiref.sync import sync_to_async
+    from .subscriptions import chat_subscriptions
+
+    if not update.effective_chat or not _can_subscribe(update.effective_chat.id):
+        return
+    subscriptions = await sync_to_async(chat_subscriptions)(update.effective_chat.id)
+    if not subscriptions:
+        await update.message.reply_text("Obunalar yo'q. Qo'shish: /subscribe Fargona * ref")
+        return
+    await update.message.reply_text(
+        "🔔 Obunalar:\n" + "\n".join(f"#{sub.id}: {sub}" for sub in subscriptions)
+    )
+
+
+async def cmd_unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/unsubscribe <id>"""
+    from asgiref.sync import sync_to_async
+    from .subscriptions import unsubscribe
+
+    if not update.effective_chat or not _can_subscribe(update.effective_chat.id):
+        return
+    try:
+        subscription_id = int((context.args or [''])[0].lstrip('#'))
+    except ValueError:
+        await update.message.reply_text("Format: /unsubscribe <id> (ro'yxat: /subscriptions)")
+        return
+    removed = await sync_to_async(unsubscribe)(update.effective_chat.id, subscription_id)
+    await update.message.reply_text("✅ Obuna bekor qilindi" if removed else "❌ Bunday obuna topilmadi")
+
+
+# ==================== INLINE QIDIRUV ====================
+
+# foydalanuvchi -> oxirgi inline so'rov id si (debounce uchun)
+_inline_latest = {}
+
+
+def _inline_result(row) -> InlineQueryResultArticle:
+    route = f"{row['origin'] or '-'} → {row['destination'] or '-'}"
+    date = timezone.localtime(row['message__date']).strftime('%d.%m %H:%M') if row['message__date'] else ''
+    details = [value for value in (row['cargo_type'], row['truck_type'], row['payment_type']) if value]
+    text = "\n".join([
+        f"🚛 {route}",
+        *(f"• {value}" for value in details),
+        f"📞 {row['phone'] or '-'}",
+        f"📅 {date} · {row['message__channel__title'] or ''}",
+    ])
+    return InlineQueryResultArticle(
+        id=str(row['id']),
+        title=route,
+        description=" · ".join([*details, row['phone'] or '', date]).strip(" ·"),
+        input_message_content=InputTextMessageContent(text),
+    )
+
+
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """@bot Toshkent Moskva | @bot Tosh | @bot 90 123 - eng yangi mos yuklar"""
+    from asgiref.sync import sync_to_async
+    from .search import search_shipments
+
+    query = update.inline_query
+    if not query:
+        return
+    if not _is_admin_chat(query.from_user.id):
+        await query.answer([], cache_time=INLINE_CACHE_TIME, is_personal=True)
+        return
+
+    # Debounce: foydalanuvchi yozishda davom etsa, eski so'rov javobsiz qoladi
+    user_id = query.from_user.id
+    _inline_latest[user_id] = query.id
+    await asyncio.sleep(INLINE_DEBOUNCE)
+    if _inline_latest.get(user_id) != query.id:
+        return
+
+    rows, _ = await sync_to_async(search_shipments)(query.query)
+    await query.answer(
+        [_inline_result(row) for row in rows], cache_time=INLINE_CACHE_TIME, is_personal=True
+    )
+
+
+def build_application(*, post_init=None, post_stop=None) -> Application:
     cfg = get_bot_config()
 
-    application = ApplicationBuilder().token(cfg.token).build()
+    builder = ApplicationBuilder().token(cfg.token)
+    if post_init:
+        builder = builder.post_init(post_init)
+    if post_stop:
+        builder = builder.post_stop(post_stop)
+    application = builder.build()
 
     # Handlerlar qo'shish
     application.add_handler(CommandHandler('start', cmd_start))
-    application.add_handler(CommandHandler('export', cmd_export))
+    # block=False: ko'p qismli export (_send_export) boshqa yangilanishlarni to'xtatmaydi
+    application.add_handler(CommandHandler('export', cmd_export, block=False))
+    application.add_handler(CommandHandler('subscribe', cmd_subscribe))
+    application.add_handler(CommandHandler('subscriptions', cmd_subscriptions))
+    application.add_handler(CommandHandler('unsubscribe', cmd_unsubscribe))
+    application.add_handler(CallbackQueryHandler(export_callback, pattern=r'^export_', block=False))
     application.add_handler(CallbackQueryHandler(callback_handler))
+    # block=False: debounce kutayotgan so'rov keyingi yangilanishlarni to'xtatmaydi
+    application.add_handler(InlineQueryHandler(inline_query_handler, block=False))
 
     return application
 
@@ -342,15 +569,81 @@ async def daily_sender_loop(application: Application, *, hour: int = 0, minute:
         try:
             await _send_export(application, days=1)
         except Exception:
-            pass
+            logger.exception("Kunlik export yuborilmadi")
 
 
-async def send_export_now(*, days: int) -> None:
-    """Web interfeysdan export (dashboard)"""
-    application = build_application()
-    await application.initialize()
-    await application.bot.initialize()
-    try:
-        await _send_export(application, days=days)
-    finally:
-        await application.shutdown()
\ No newline at end of file
+async def city_index_loop(*, interval: float | None = None) -> None:
+    """Inline qidiruv shaharlar lug'ati: ishga tushganda va har kuni qayta quriladi"""
+    from asgiref.sync import sync_to_async
+    from .search import CITY_INDEX_REFRESH, rebuild_city_index
+
+    while True:
+        try:
+            await sync_to_async(rebuild_city_index)()
+        except Exception:
+            logger.exception("Shaharlar lug'ati qurilmadi")
+        await asyncio.sleep(interval or CITY_INDEX_REFRESH)
+
+
+# ==================== BOT NAVBATI ====================
+
+async def _task_send_export(application: Application, task) -> None:
+    await _send_export(application, days=int(task.payload.get('days', 1)), fmt=task.payload.get('fmt', 'xlsx'))
+
+
+async def _task_send_message(application: Application, task) -> None:
+    # Eski yozuvlar uchun: xabarlar endi outbox orqali (limitlar va jamlash bilan) yuboriladi
+    from asgiref.sync import sync_to_async
+
+    await sync_to_async(outbox.enqueue)(task.payload['chat_id'], task.payload['text'])
+
+
+BOT_TASKS = {
+    'send_export': _task_send_export,
+    'send_message': _task_send_message,
+}
+
+
+async def bot_task_loop(application: Application, *, poll: float = BOT_TASK_POLL) -> None:
+    """Web va export worker navbatga qo'ygan vazifalarni shu Application orqali bajarish"""
+    from asgiref.sync import sync_to_async
+
+    while True:
+        task = await sync_to_async(bot_queue.next_task)()
+        if task is None:
+            await asyncio.sleep(poll)
+            continue
+        try:
+            await BOT_TASKS[task.kind](application, task)
+        except Exception as exc:
+            logger.exception("Bot vazifasi %s bajarilmadi", task.id)
+            await sync_to_async(bot_queue.finish)(task, exc)
+        else:
+            await sync_to_async(bot_queue.finish)(task)
+
+
+def run_bot(*, poll: float = BOT_TASK_POLL, daily: bool = True) -> None:
+    """manage.py runbot: bitta doimiy Application - polling, kunlik export, bot navbati, outbox va shaharlar lug'ati"""
+    background = []
+
+    async def post_init(application: Application) -> None:
+        background.append(asyncio.create_task(bot_task_loop(application, poll=poll), name='bot-tasks'))
+        background.append(asyncio.create_task(outbox.outbox_loop(application), name='outbox'))
+        background.append(asyncio.create_task(city_index_loop(), name='city-index'))
+        if daily:
+            background.append(asyncio.create_task(daily_sender_loop(application), name='daily-export'))
+
+    async def post_stop(application: Application) -> None:
+        # Bajarilayotgan vazifa to'xtatilsa, bot_queue.STALE_AFTER dan keyin qayta bajariladi;
+        # outbox xabarlari bazada qoladi va keyingi ishga tushishda yuboriladi
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+
+    application = build_application(post_init=post_init, post_stop=post_stop)
+    application.run_polling(allowed_updates=Update.ALL_TYPES)
+
+
+def enqueue_export(*, days: int, fmt: str = 'xlsx'):
+    """Web interfeysdan export (dashboard): fayl runbot jarayoni orqali yuboriladi"""
+    return bot_queue.enqueue('send_export', days=days, fmt=fmt)
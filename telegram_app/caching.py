@@ -0,0 +1,119 @@
+"""
+Agregatlar uchun kesh yordamchilari (Django cache ustida).
+
+- Versiyalash: ingest yangi yuk yozganda `bump_version(*namespaces)` chaqiriladi,
+  eski kalitlar o'z-o'zidan eskiradi (o'chirish shart emas). Versiya bazada
+  (CacheVersion) saqlanadi: kesh har bir jarayonda alohida (locmem) bo'lsa ham
+  ingest bajarmagan workerlar ham yangi versiyani ko'radi. Bir nechta
+  namespace bitta UPDATE bilan oshiriladi.
+- Bir vaqtdagi so'rovlar birlashtiriladi: bitta jarayon ichida lock bilan,
+  jarayonlar orasida esa cache.add() bilan - faqat bittasi hisoblaydi,
+  qolganlari natijani kutadi (stampede bo'lmaydi).
+- Hit/miss hisoblagichlari keshning o'zida saqlanadi (barcha workerlar uchun).
+"""
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import CacheVersion
+
+LOCK_TTL = 30
+WAIT_STEP = 0.05
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def get_version(namespace) -> int:
+    return CacheVersion.objects.filter(namespace=namespace).values_list('version', flat=True).first() or 0
+
+
+def bump_version(*namespaces):
+    namespaces = set(namespaces)
+    versions = CacheVersion.objects.filter(namespace__in=namespaces)
+    if versions.update(version=F('version') + 1) == len(namespaces):
+        return
+    # Yangi namespace (masalan, yangi kun yoki kanal): qatorlarni yaratib, yana oshiramiz.
+    # Mavjudlari ikki marta oshadi - bu faqat ortiqcha eskirtirish, oshirish yo'qolmaydi.
+    CacheVersion.objects.bulk_create(
+        [CacheVersion(namespace=namespace) for namespace in namespaces], ignore_conflicts=True
+    )
+    versions.update(version=F('version') + 1)
+
+
+def make_key(namespace, *parts) -> str:
+    raw = f"{namespace}:{get_version(namespace)}:" + ":".join(str(p) for p in parts)
+    return f"{namespace}:" + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def record(name, hit: bool):
+    _incr(f"cache_stats:{name}:{'hits' if hit else 'misses'}")
+
+
+def cache_stats(name) -> dict:
+    hits = cache.get(f"cache_stats:{name}:hits", 0)
+    misses = cache.get(f"cache_stats:{name}:misses", 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits * 100 / total, 1) if total else 0,
+    }
+
+
+def _local_lock(key):
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def get_or_compute(name, key, compute, ttl):
+    """
+    Keshdan olish yoki `compute()` ni faqat bir marta chaqirish.
+    Qaytaradi: (qiymat, hit)
+    """
+    value = cache.get(key)
+    if value is not None:
+        record(name, True)
+        return value, True
+
+    with _local_lock(key):
+        value = cache.get(key)
+        if value is not None:
+            record(name, True)
+            return value, True
+
+        lock_key = f"lock:{key}"
+        if not cache.add(lock_key, 1, LOCK_TTL):
+            # Boshqa worker hisoblayapti - natijani kutamiz
+            deadline = time.monotonic() + LOCK_TTL
+            while time.monotonic() < deadline:
+                time.sleep(WAIT_STEP)
+                value = cache.get(key)
+                if value is not None:
+                    record(name, True)
+                    return value, True
+
+        try:
+            value = compute()
+            cache.set(key, value, ttl)
+        finally:
+            cache.delete(lock_key)
+
+    with _locks_guard:
+        _locks.pop(key, None)
+    record(name, False)
+    return value, False
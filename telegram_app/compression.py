@@ -0,0 +1,127 @@
+"""
+Message.text ni zstd + o'z korpusimizda o'qitilgan lug'at bilan siqish.
+
+Yuk eʼlonlari bir xil shablon, emoji va telefon bloklaridan iborat, shuning
+uchun lug'at bilan siqish oddiy zstd dan ancha samarali. Siqilgan xabarda
+`text` ustuni NULL bo'ladi, matn esa `text_zstd` da saqlanadi va
+Message.from_db orqali avtomatik ochiladi.
+
+`text` bo'yicha qidiruv siqilgan xabarlarni topmaydi, shuning uchun faqat
+MESSAGE_TEXT_COMPRESSION_AFTER_DAYS dan eski xabarlar siqiladi, matn
+filtrlari esa `text_searchable()` orqali siqilganlarni aniq chiqarib tashlaydi.
+
+zstandard o'rnatilmagan bo'lsa siqish shunchaki o'chirilgan holatda qoladi.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - ixtiyoriy kutubxona
+    zstandard = None
+
+ZSTD_LEVEL = 9
+DICT_SIZE = 64 * 1024
+ACTIVE_DICT_TTL = 60
+
+_local = threading.local()
+_dicts = {}
+_active = {'pk': None, 'checked_at': 0.0}
+
+
+def is_available() -> bool:
+    return zstandard is not None
+
+
+def is_enabled() -> bool:
+    """Ingest paytida yangi xabarlarni siqish kerakmi."""
+    return is_available() and getattr(settings, 'MESSAGE_TEXT_COMPRESSION', False)
+
+
+def compression_cutoff():
+    """Shundan eski xabarlar siqiladi."""
+    return timezone.now() - timedelta(days=settings.MESSAGE_TEXT_COMPRESSION_AFTER_DAYS)
+
+
+def should_compress(date) -> bool:
+    # Sanasiz yoki yangi xabar qidiruv uchun oddiy matnda qoladi (tarix yuklanganda eskilari siqiladi)
+    return is_enabled() and date is not None and date < compression_cutoff()
+
+
+def text_searchable(queryset):
+    """
+    `text__icontains` kabi filtrlar uchun: siqilgan xabarlarda `text` NULL,
+    shuning uchun ular qidiruvdan so'rovning o'zida chiqarib tashlanadi.
+    """
+    return queryset.filter(text_zstd__isnull=True)
+
+
+def _zstd_dict(dictionary_id):
+    zdict = _dicts.get(dictionary_id)
+    if zdict is None:
+        from .models import CompressionDictionary
+
+        data = CompressionDictionary.objects.values_list('data', flat=True).get(pk=dictionary_id)
+        zdict = zstandard.ZstdCompressionDict(bytes(data))
+        zdict.precompute_compress(level=ZSTD_LEVEL)
+        _dicts[dictionary_id] = zdict
+    return zdict
+
+
+def _codec(kind, dictionary_id):
+    # zstd compressor/decompressor obyektlari thread-safe emas
+    cache = getattr(_local, kind, None)
+    if cache is None:
+        cache = {}
+        setattr(_local, kind, cache)
+
+    codec = cache.get(dictionary_id)
+    if codec is None:
+        zdict = _zstd_dict(dictionary_id) if dictionary_id else None
+        if kind == 'compressor':
+            codec = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict)
+        else:
+            codec = zstandard.ZstdDecompressor(dict_data=zdict)
+        cache[dictionary_id] = codec
+    return codec
+
+
+def active_dictionary_id():
+    """Eng oxirgi o'qitilgan lug'at ID si (qisqa muddat keshlanadi)."""
+    now = time.monotonic()
+    if now - _active['checked_at'] > ACTIVE_DICT_TTL:
+        from .models import CompressionDictionary
+
+        _active['pk'] = CompressionDictionary.objects.order_by('-id').values_list('id', flat=True).first()
+        _active['checked_at'] = now
+    return _active['pk']
+
+
+def reset_active_dictionary():
+    _active['checked_at'] = 0.0
+
+
+def compress_text(text: str, dictionary_id=None) -> bytes:
+    return _codec('compressor', dictionary_id).compress(text.encode('utf-8'))
+
+
+def decompress_text(data, dictionary_id=None) -> str:
+    return _codec('decompressor', dictionary_id).decompress(bytes(data)).decode('utf-8')
+
+
+def train_dictionary(samples, *, size: int = DICT_SIZE):
+    """Xabar matnlari namunasidan yangi lug'at o'qitib, bazaga saqlaydi."""
+    from .models import CompressionDictionary
+
+    encoded = [s.encode('utf-8') for s in samples if s]
+    zdict = zstandard.train_dictionary(size, encoded, level=ZSTD_LEVEL)
+    dictionary = CompressionDictionary.objects.create(
+        data=zdict.as_bytes(),
+        sample_count=len(encoded),
+    )
+    reset_active_dictionary()
+    return dictionary
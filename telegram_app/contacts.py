@@ -0,0 +1,196 @@
+"""
+Kontaktlar katalogi: telefon bo'yicha agregatlar ingest paytida yangilanadi.
+
+Contact - normallashtirilgan telefon bo'yicha umumiy ko'rsatkichlar,
+ContactChannelStat - har bir kanal uchun yuklar soni (top-N ro'yxatlar
+shu jadvaldan (channel, -total) indeksi orqali o'qiladi).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Contact, ContactChannelStat, ContactKind, Shipment
+
+ROUTE_LIMIT = 50
+TOP_LIMIT = 500
+
+
+def normalize_phone(phone: str | None) -> str | None:
+    """+998 90 123-45-67, 998901234567, 901234567 -> 998901234567; @Ali_Logist99 -> @ali_logist99"""
+    if not phone:
+        return None
+    phone = phone.strip()
+    if phone.startswith('@'):
+        # Username raqamlarga qisqartirilmaydi: @ali_99 va @bob_99 - boshqa-boshqa kontakt
+        return phone.lower()[:64]
+    digits = ''.join(ch for ch in phone if ch.isdigit())
+    if not digits:
+        return phone.strip().lower()[:64] or None
+    if len(digits) == 9:
+        digits = '998' + digits
+    return digits
+
+
+def classify_contact(phone: str | None) -> str | None:
+    """Telefon, Telegram @username yoki boshqa (ID va h.k.)."""
+    if not phone:
+        return None
+    phone = phone.strip()
+    if phone.startswith('@'):
+        return ContactKind.USERNAME
+    digits_only = ''.join(ch for ch in phone if ch.isdigit())
+    if phone.startswith('+') or len(digits_only) >= 9:
+        return ContactKind.PHONE
+    return ContactKind.OTHER
+
+
+def route_key(origin, destination) -> str:
+    return f"{origin or '-'} → {destination or '-'}"
+
+
+def _add_route(route_counts: dict, key: str, amount: int = 1) -> dict:
+    route_counts[key] = route_counts.get(key, 0) + amount
+    if len(route_counts) > ROUTE_LIMIT:
+        # Eng kam uchragan yo'nalishni tashlab yuboramiz (top_routes taxminiy)
+        del route_counts[min(route_counts, key=route_counts.get)]
+    return route_counts
+
+
+def record_shipment(shipment, message):
+    """Yangi saqlangan yukni kontakt agregatlariga qo'shish."""
+    phone = normalize_phone(shipment.phone)
+    if not phone:
+        return None
+
+    seen = message.date or timezone.now()
+    kind = shipment.contact_kind or classify_contact(shipment.phone)
+    with transaction.atomic():
+        contact, _ = Contact.objects.select_for_update().get_or_create(
+            phone=phone,
+            defaults={
+                'display_phone': shipment.phone.strip()[:64],
+                'kind': kind,
+                'first_seen': seen,
+                'last_seen': seen,
+            },
+        )
+        stat, stat_created = ContactChannelStat.objects.select_for_update().get_or_create(
+            contact=contact,
+            channel_id=message.channel_id,
+            defaults={'last_seen': seen, 'kind': contact.kind},
+        )
+
+        contact.total_loads += 1
+        contact.first_seen = min(contact.first_seen or seen, seen)
+        contact.last_seen = max(contact.last_seen or seen, seen)
+        _add_route(contact.route_counts, route_key(shipment.origin, shipment.destination))
+        if stat_created:
+            contact.channel_count += 1
+        contact.save()
+
+        stat.total += 1
+        stat.last_seen = max(stat.last_seen or seen, seen)
+        stat.save(update_fields=['total', 'last_seen'])
+
+        Shipment.objects.filter(pk=shipment.pk).update(contact=contact)
+    shipment.contact = contact
+    return contact
+
+
+def channel_top_contacts(channel, limit=TOP_LIMIT, kinds=None):
+    """Kanaldagi eng faol kontaktlar (indeks bo'yicha, LIMIT bilan)."""
+    if channel is None:
+        return ContactChannelStat.objects.none()
+    stats = ContactChannelStat.objects.filter(channel=channel)
+    if kinds:
+        stats = stats.filter(kind__in=kinds)
+    stats = stats.select_related('contact').order_by('-total')
+    return stats[:limit] if limit else stats
+
+
+def rebuild_contacts(chunk_size=5000, apps=None):
+    """
+    Barcha Shipment'lardan Contact va ContactChannelStat ni qaytadan hisoblash.
+    `apps` - data migratsiyadan chaqirilganda tarixiy modellar uchun.
+    """
+    if apps is None:
+        contact_model, stat_model, shipment_model = Contact, ContactChannelStat, Shipment
+    else:
+        contact_model, stat_model, shipment_model = (
+            apps.get_model('telegram_app', name) for name in ('Contact', 'ContactChannelStat', 'Shipment')
+        )
+
+    contacts = {}
+    channel_stats = defaultdict(lambda: {'total': 0, 'last_seen': None})
+    shipment_ids = defaultdict(list)
+
+    rows = (
+        shipment_model.objects
+        .exclude(phone__isnull=True)
+        .exclude(phone__exact="")
+        .values_list('id', 'phone', 'origin', 'destination', 'message__channel_id', 'message__date')
+        .order_by('id')
+    )
+    for pk, raw_phone, origin, destination, channel_pk, date in rows.iterator(chunk_size=chunk_size):
+        phone = normalize_phone(raw_phone)
+        if not phone:
+            continue
+        contact = contacts.setdefault(phone, {
+            'display_phone': raw_phone.strip()[:64],
+            'kind': classify_contact(raw_phone),
+            'first_seen': date,
+            'last_seen': date,
+            'total_loads': 0,
+            'route_counts': {},
+            'channels': set(),
+        })
+        contact['total_loads'] += 1
+        if date:
+            contact['first_seen'] = min(contact['first_seen'] or date, date)
+            contact['last_seen'] = max(contact['last_seen'] or date, date)
+        _add_route(contact['route_counts'], route_key(origin, destination))
+        contact['channels'].add(channel_pk)
+
+        stat = channel_stats[(phone, channel_pk)]
+        stat['total'] += 1
+        if date:
+            stat['last_seen'] = max(stat['last_seen'] or date, date)
+        shipment_ids[phone].append(pk)
+
+    with transaction.atomic():
+        shipment_model.objects.update(contact=None)
+        stat_model.objects.all().delete()
+        contact_model.objects.all().delete()
+
+        contact_model.objects.bulk_create([
+            contact_model(
+                phone=phone,
+                display_phone=data['display_phone'],
+                kind=data['kind'],
+                first_seen=data['first_seen'],
+                last_seen=data['last_seen'],
+                total_loads=data['total_loads'],
+                channel_count=len(data['channels']),
+                route_counts=data['route_counts'],
+            )
+            for phone, data in contacts.items()
+        ], batch_size=1000)
+        contact_ids = dict(contact_model.objects.values_list('phone', 'id'))
+
+        stat_model.objects.bulk_create([
+            stat_model(
+                contact_id=contact_ids[phone],
+                channel_id=channel_pk,
+                kind=contacts[phone]['kind'],
+                total=data['total'],
+                last_seen=data['last_seen'],
+            )
+            for (phone, channel_pk), data in channel_stats.items()
+        ], batch_size=1000)
+
+        for phone, ids in shipment_ids.items():
+            for start in range(0, len(ids), 500):
+                shipment_model.objects.filter(pk__in=ids[start:start + 500]).update(contact_id=contact_ids[phone])
+
+    return len(contacts)
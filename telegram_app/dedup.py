@@ -0,0 +1,138 @@
+"""
+Xabar matnlari uchun SimHash (64-bit) va yaqin-dublikatlarni qidirish.
+
+Fingerprint 4 ta 16-bitlik bandga bo'linadi va har bir band indekslangan
+ustunda saqlanadi. Hamming masofasi MAX_DISTANCE (3) dan oshmaydigan ikki
+fingerprint kamida bitta bandda to'liq mos keladi, shuning uchun nomzodlar
+indeks orqali olinadi va faqat ular Python'da tekshiriladi.
+"""
+import hashlib
+import re
+from collections import Counter
+
+from django.db.models import Q
+
+SIMHASH_BITS = 64
+BAND_COUNT = 4
+BAND_BITS = SIMHASH_BITS // BAND_COUNT
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_DISTANCE = 3
+FINGERPRINT_FIELDS = ['simhash'] + [f'simhash_band{i}' for i in range(BAND_COUNT)]
+
+_NON_WORD_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Kichik harf, tinish belgilari va emoji'siz, bitta bo'shliq bilan."""
+    if not text:
+        return ""
+    return _NON_WORD_RE.sub(' ', text.lower()).strip()
+
+
+def _features(normalized: str) -> Counter:
+    tokens = normalized.split()
+    if len(tokens) < 2:
+        return Counter(tokens)
+    # So'z juftliklari (shingle) tartibni ham hisobga oladi
+    return Counter(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: str) -> int | None:
+    """Matnning 64-bitlik SimHash qiymati (unsigned). Bo'sh matn uchun None."""
+    features = _features(normalize_text(text))
+    if not features:
+        return None
+
+    weights = [0] * SIMHASH_BITS
+    for feature, weight in features.items():
+        h = _hash64(feature)
+        for bit in range(SIMHASH_BITS):
+            if h >> bit & 1:
+                weights[bit] += weight
+            else:
+                weights[bit] -= weight
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def to_signed(value: int) -> int:
+    """BigIntegerField (signed 64-bit) da saqlash uchun."""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
+
+
+def bands(value: int) -> list[int]:
+    return [(value >> (i * BAND_BITS)) & BAND_MASK for i in range(BAND_COUNT)]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+
+def fingerprint_fields(text: str) -> dict:
+    """Message modeliga yoziladigan simhash ustunlari."""
+    value = simhash(text)
+    if value is None:
+        return {'simhash': None, **{f'simhash_band{i}': None for i in range(BAND_COUNT)}}
+    return {
+        'simhash': to_signed(value),
+        **{f'simhash_band{i}': band for i, band in enumerate(bands(value))},
+    }
+
+
+def band_lookup_q(fields: dict) -> Q:
+    """Kamida bitta bandi mos keladigan xabarlar uchun Q (indekslangan)."""
+    q = Q()
+    for i in range(BAND_COUNT):
+        q |= Q(**{f'simhash_band{i}': fields[f'simhash_band{i}']})
+    return q
+
+
+def find_near_duplicates(queryset, fields: dict, *, max_distance: int = MAX_DISTANCE):
+    """
+    `queryset` (Message) ichidan berilgan fingerprintga yaqin xabarlar ro'yxati.
+    Barcha kanallar bo'yicha qidirish uchun Message.objects.all() bering.
+    """
+    if fields.get('simhash') is None:
+        return []
+
+    candidates = (
+        queryset
+        .filter(band_lookup_q(fields))
+        .exclude(simhash__isnull=True)
+        .order_by('date', 'id')
+    )
+    return [
+        msg for msg in candidates
+        if hamming_distance(msg.simhash, fields['simhash']) <= max_distance
+    ]
+
+
+def find_original_id(queryset, fields: dict, *, max_distance: int = MAX_DISTANCE) -> int | None:
+    """Eng birinchi saqlangan yaqin-dublikatning ID si (yoki None)."""
+    if fields.get('simhash') is None:
+        return None
+
+    candidates = (
+        queryset
+        .filter(band_lookup_q(fields))
+        .exclude(simhash__isnull=True)
+        .order_by('date', 'id')
+        .values_list('id', 'simhash', 'duplicate_of_id')
+    )
+    for pk, value, duplicate_of_id in candidates:
+        if hamming_distance(value, fields['simhash']) <= max_distance:
+            # Zanjir hosil bo'lmasligi uchun asl nusxaga bog'laymiz
+            return duplicate_of_id or pk
+    return None
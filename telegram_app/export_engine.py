@@ -0,0 +1,351 @@
+"""
+Umumiy export dvigateli: ustunlar tavsifi + almashtiriladigan yozuvchilar.
+
+- `Column` - sarlavha, bazadan o'qiladigan `values_list` maydonlari va butun
+  ustun (ro'yxat) ustida bir marta ishlaydigan formatlovchi.
+- `ExportSpec.batches()` manbani bitta `values_list` so'rovi bilan bo'laklab
+  o'qiydi (model obyektlari va N+1 yo'q) va har bo'lakni formatlangan
+  ustunlar ro'yxatiga aylantiradi.
+- Yozuvchilar (XLSX, CSV, JSON, Parquet) shu bo'laklarni qabul qiladi:
+  CSV/JSON oqim bilan, XLSX write_only rejimida, Parquet row group'lar bilan.
+
+Barcha exportlar (web, bot, fon vazifalari) shu modul orqali o'tadi.
+"""
+import csv
+import io
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from typing import Callable, Optional
+
+import openpyxl
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - ixtiyoriy kutubxona
+    pa = pq = None
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+BATCH_SIZE = 2000
+# Shu hajmgacha fayl xotirada, kattasi vaqtinchalik faylga yoziladi
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+PARQUET_ROW_GROUP = 100_000
+
+# Bazada yo'q, dvigatel beradigan maydon: qatorning tartib raqami (1 dan)
+ROW_NUMBER = '#'
+
+
+# ==================== USTUNLAR ====================
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    fields: tuple = ()
+    # format(*maydon_ustunlari) -> qiymatlar ro'yxati (bo'lak uchun bir chaqiruv)
+    format: Optional[Callable] = None
+    width: int = 20
+    # Parquet turi va matnli formatlarda sanani ISO ko'rinishga o'tkazish uchun
+    type: str = 'string'
+
+    def values(self, raw):
+        columns = [raw[field] for field in self.fields]
+        if self.format is not None:
+            return list(self.format(*columns))
+        return list(columns[0])
+
+
+def default(value):
+    """None / bo'sh qiymat o'rniga `value`."""
+    return lambda column: [item or value for item in column]
+
+
+def truncate(limit, *, suffix='...'):
+    return lambda column: [
+        item[:limit] + suffix if item and len(item) > limit else (item or '') for item in column
+    ]
+
+
+def strftime(pattern, *, empty='-'):
+    return lambda column: [item.strftime(pattern) if item else empty for item in column]
+
+
+def coalesce(*columns):
+    """Birinchi bo'sh bo'lmagan qiymat (bir nechta maydondan bitta ustun)."""
+    return [next((item for item in items if item), None) for items in zip(*columns)]
+
+
+class ExportSpec:
+    def __init__(self, title, columns, *, styled=False, row_height=None):
+        self.title = title
+        self.columns = tuple(columns)
+        self.styled = styled
+        self.row_height = row_height
+
+    @property
+    def headers(self):
+        return [column.name for column in self.columns]
+
+    @property
+    def fields(self):
+        """values_list uchun maydonlar (takrorlanmasdan, tartib saqlanadi)."""
+        seen = {}
+        for column in self.columns:
+            for field in column.fields:
+                if field != ROW_NUMBER:
+                    seen.setdefault(field, None)
+        return tuple(seen)
+
+    def batches(self, source, *, batch_size=BATCH_SIZE, progress=None):
+        """
+        Formatlangan bo'laklar: har biri ustunlar ro'yxati (self.columns tartibida).
+        `source` - QuerySet (values_list bilan o'qiladi) yoki `fields` tartibidagi
+        kortejlar. `progress(qatorlar)` har bo'lakdan keyin chaqiriladi.
+        """
+        fields = self.fields
+        if hasattr(source, 'values_list'):
+            rows = source.values_list(*fields).iterator(chunk_size=batch_size)
+        else:
+            rows = iter(source)
+
+        done = 0
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            raw = dict(zip(fields, zip(*chunk)))
+            raw[ROW_NUMBER] = range(done + 1, done + len(chunk) + 1)
+            yield [column.values(raw) for column in self.columns]
+            done += len(chunk)
+            if progress:
+                progress(done)
+        if progress and not done:
+            progress(0)
+
+
+def _iso(column):
+    return [item.isoformat() if isinstance(item, datetime) else item for item in column]
+
+
+def text_columns(spec, batch):
+    """Matnli formatlar uchun: sana ustunlari ISO satrga (Excel timezone'ni bilmaydi)."""
+    return [
+        _iso(values) if column.type == 'timestamp' else values
+        for column, values in zip(spec.columns, batch)
+    ]
+
+
+# ==================== YOZUVCHILAR ====================
+
+class Writer:
+    """Bo'laklarni qabul qiladigan yozuvchi. Oqimli formatlar `stream()` ni beradi."""
+    streamable = True
+
+    def __init__(self, spec, title=None):
+        self.spec = spec
+        self.title = title or spec.title
+
+    def stream(self, batches):
+        raise NotImplementedError
+
+    def save(self, batches, output):
+        for chunk in self.stream(batches):
+            output.write(chunk)
+
+
+class CsvWriter(Writer):
+    def __init__(self, spec, title=None, *, compress=False):
+        super().__init__(spec, title)
+        self.compress = compress
+
+    def stream(self, batches):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if self.compress else None
+
+        def flush():
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            return gzip.compress(data) if gzip else data
+
+        writer.writerow(self.spec.headers)
+        for batch in batches:
+            writer.writerows(zip(*text_columns(self.spec, batch)))
+            chunk = flush()
+            if chunk:
+                yield chunk
+        chunk = flush()
+        if gzip:
+            chunk += gzip.flush()
+        if chunk:
+            yield chunk
+
+
+class JsonWriter(Writer):
+    """JSON massiv yoki (lines=True) JSON Lines."""
+
+    def __init__(self, spec, title=None, *, lines=False):
+        super().__init__(spec, title)
+        self.lines = lines
+
+    def stream(self, batches):
+        names = self.spec.headers
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        separator = '\n' if self.lines else ',\n'
+        first = True
+        if not self.lines:
+            yield b'['
+        for batch in batches:
+            records = separator.join(
+                encoder.encode(dict(zip(names, row))) for row in zip(*text_columns(self.spec, batch))
+            )
+            if self.lines:
+                yield (records + '\n').encode('utf-8')
+            else:
+                yield (('\n' if first else separator) + records).encode('utf-8')
+            first = False
+        if not self.lines:
+            yield b'\n]\n'
+
+
+def add_named_styles(wb):
+    """Header va oddiy katak uchun umumiy stillar (har katakka yangi obyekt yaratilmaydi)."""
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    header = NamedStyle(name='export_header')
+    header.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header.font = Font(bold=True, color="FFFFFF", size=12)
+    header.alignment = Alignment(horizontal='center', vertical='center')
+    header.border = border
+
+    body = NamedStyle(name='export_cell')
+    body.alignment = Alignment(vertical='center', wrap_text=True)
+    body.border = border
+
+    wb.add_named_style(header)
+    wb.add_named_style(body)
+
+
+def styled_row(ws, values, style):
+    row = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        row.append(cell)
+    return row
+
+
+class XlsxWriter(Writer):
+    """write_only workbook: qatorlar darhol diskka yoziladi, xotira sarfi o'zgarmaydi."""
+    streamable = False
+
+    def save(self, batches, output):
+        spec = self.spec
+        wb = openpyxl.Workbook(write_only=True)
+        if spec.styled:
+            add_named_styles(wb)
+        ws = wb.create_sheet(self.title[:31])
+        for idx, column in enumerate(spec.columns, start=1):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(idx)].width = column.width
+        if spec.row_height:
+            ws.sheet_format.defaultRowHeight = spec.row_height
+            ws.sheet_format.customHeight = True
+
+        ws.append(styled_row(ws, spec.headers, 'export_header') if spec.styled else spec.headers)
+        for batch in batches:
+            for row in zip(*text_columns(spec, batch)):
+                ws.append(styled_row(ws, row, 'export_cell') if spec.styled else row)
+        wb.save(output)
+
+
+class ParquetWriter(Writer):
+    """Har PARQUET_ROW_GROUP qator alohida row group bo'lib yoziladi (zstd)."""
+    streamable = False
+
+    def schema(self):
+        types = {
+            'string': pa.string(),
+            'int': pa.int64(),
+            'float': pa.float64(),
+            'timestamp': pa.timestamp('us', tz='UTC'),
+        }
+        return pa.schema([(column.name, types[column.type]) for column in self.spec.columns])
+
+    def save(self, batches, output):
+        schema = self.schema()
+        pending = [[] for _ in schema]
+
+        def write(writer):
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(pending, schema)], schema=schema
+            ))
+            for values in pending:
+                values.clear()
+
+        with pq.ParquetWriter(output, schema, compression='zstd') as writer:
+            for batch in batches:
+                for values, column in zip(pending, batch):
+                    values.extend(column)
+                if len(pending[0]) >= PARQUET_ROW_GROUP:
+                    write(writer)
+            if pending[0]:
+                write(writer)
+
+
+# ==================== FORMATLAR ====================
+
+@dataclass(frozen=True)
+class Format:
+    extension: str
+    content_type: str
+    writer: Callable
+    options: tuple = ()
+
+    def make_writer(self, spec, title=None):
+        return self.writer(spec, title, **dict(self.options))
+
+
+FORMATS = {
+    'xlsx': Format('xlsx', XLSX_CONTENT_TYPE, XlsxWriter),
+    'csv': Format('csv', 'text/csv; charset=utf-8', CsvWriter),
+    'csv.gz': Format('csv.gz', 'application/gzip', CsvWriter, (('compress', True),)),
+    'parquet': Format('parquet', 'application/vnd.apache.parquet', ParquetWriter),
+    'json': Format('json', 'application/json', JsonWriter),
+    'jsonl': Format('jsonl', 'application/x-ndjson', JsonWriter, (('lines', True),)),
+}
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def write_export(spec, source, fmt, output=None, *, title=None, progress=None):
+    """Exportni faylga yozish. `output` berilmasa vaqtinchalik fayl (boshiga o'tkazilgan) qaytadi."""
+    output = output or SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    writer = FORMATS[fmt].make_writer(spec, title)
+    writer.save(spec.batches(source, progress=progress), output)
+    output.seek(0)
+    return output
+
+
+def export_response(spec, source, fmt, filename_base, *, title=None):
+    """Oqimli formatlar StreamingHttpResponse, XLSX/Parquet vaqtinchalik fayldan."""
+    export = FORMATS[fmt]
+    filename = f"{filename_base}.{export.extension}"
+    writer = export.make_writer(spec, title)
+    if writer.streamable:
+        response = StreamingHttpResponse(writer.stream(spec.batches(source)), content_type=export.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    return FileResponse(
+        write_export(spec, source, fmt, title=title), as_attachment=True,
+        filename=filename, content_type=export.content_type,
+    )
@@ -1,15 +1,133 @@
-from django.http import HttpResponse
+from django.http import FileResponse
 from django.utils import timezone
-from datetime import timedelta
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from io import BytesIO
-from .models import Shipment, Message
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+from django.db.models import Count, Max
+from .artifacts import artifact_key, get_or_build, zipped
+from .compression import decompress_text
+from .export_engine import (
+    FORMATS, ROW_NUMBER, Column, ExportSpec, coalesce, default, export_response, parquet_available, strftime,
+    truncate, write_export,
+)
+from .models import Shipment
+from .utils import resolve_date_range
+
+# Foydalanuvchi tanlashi mumkin bo'lgan formatlar: format -> (kengaytma, content type)
+EXPORT_FORMATS = {
+    fmt: (FORMATS[fmt].extension, FORMATS[fmt].content_type)
+    for fmt in ('xlsx', 'csv', 'csv.gz', 'parquet')
+}
+
+
+def available_formats():
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or parquet_available()]
+
+
+def export_format(value, default='xlsx'):
+    return value if value in available_formats() else default
+
+
+def message_text(text, text_zstd, dictionary_id):
+    """values_list orqali o'qilgan (siqilgan bo'lishi mumkin) matn."""
+    if text is None and text_zstd is not None:
+        return decompress_text(text_zstd, dictionary_id)
+    return text
+
+
+def message_texts(texts, texts_zstd, dictionary_ids):
+    return [message_text(*row) for row in zip(texts, texts_zstd, dictionary_ids)]
+
+
+MESSAGE_TEXT_FIELDS = ('message__text', 'message__text_zstd', 'message__text_dictionary_id')
+DASH = default('-')
+# Ustunlar yoki yozuvchilar o'zgarsa oshiriladi - eski keshlangan fayllar ishlatilmaydi
+EXPORT_LAYOUT = 2
+
+# ==================== USTUNLAR ====================
+
+# Excel hisobot (web va bot): stillangan, qisqartirilgan matn bilan
+SHIPMENT_REPORT = ExportSpec('Shipments', [
+    Column('№', (ROW_NUMBER,), width=5, type='int'),
+    Column('Kanal', ('message__channel__title',), default("Noma'lum"), width=25),
+    Column('Xabar', MESSAGE_TEXT_FIELDS, lambda *text: truncate(100)(message_texts(*text)), width=50),
+    Column('Origin', ('origin',), DASH),
+    Column('Destination', ('destination',), DASH),
+    Column('Yuk turi', ('cargo_type',), DASH),
+    Column('Transport', ('truck_type',), DASH),
+    Column('To\'lov', ('payment_type',), DASH),
+    Column('Telefon', ('phone',), DASH),
+    Column('Sana', ('message__date',), strftime('%Y-%m-%d %H:%M')),
+], styled=True, row_height=20)
+
+# Tekis ustunlar (matnsiz - tahlil uchun): CSV / Parquet va kanal exporti
+SHIPMENT_FLAT = ExportSpec('Shipments', [
+    Column('channel_id', ('message__channel__channel_id',), width=18, type='int'),
+    Column('channel_title', ('message__channel__title',), width=18),
+    Column('message_id', ('message__message_id',), width=18, type='int'),
+    Column('date', ('message__date',), width=18, type='timestamp'),
+    *(Column(name, (name,), width=18)
+      for name in ('origin', 'destination', 'cargo_type', 'truck_type', 'payment_type', 'phone')),
+])
+
+SHIPMENT_JSON = ExportSpec('Shipments', [
+    Column('channel', ('message__channel__title',)),
+    Column('text', MESSAGE_TEXT_FIELDS, message_texts),
+    *(Column(name, (name,)) for name in ('origin', 'destination', 'cargo_type', 'truck_type', 'payment_type', 'phone')),
+    Column('date', ('message__date',), type='timestamp'),
+])
+
+# Telefonlar: filtrlangan yuklardan (values('phone').annotate(total=...)) ...
+PHONE_TOTALS = ExportSpec('Phones', [
+    Column('phone', ('phone',)),
+    Column('total_shipments', ('total',), type='int'),
+])
+
+# ... yoki kontaktlar katalogidan (ContactChannelStat)
+CONTACT_PHONE_TOTALS = ExportSpec('Phones', [
+    Column('phone', ('contact__display_phone', 'contact__phone'), coalesce),
+    Column('total_shipments', ('total',), type='int'),
+])
+
+
+def days_range(days):
+    """Oxirgi `days` kalendar kuni (bugun ham kiradi): (date_from, date_to)."""
+    date_to = timezone.localdate()
+    return date_to - timedelta(days=days - 1), date_to
+
+
+def _shipments_between(date_from, date_to, channel_id=None):
+    """date_from..date_to kalendar kunlari (ikkalasi ham kiradi), ixtiyoriy kanal bo'yicha."""
+    start_date, end_date, _, _ = resolve_date_range(date_from.isoformat(), date_to.isoformat())
+    shipments = Shipment.objects.filter(
+        message__date__gte=start_date,
+        message__date__lt=end_date
+    )
+    if channel_id is not None:
+        shipments = shipments.filter(message__channel_id=channel_id)
+    return shipments.order_by('-message__date')
+
+
+def _shipments_for_days(days):
+    return _shipments_between(*days_range(days))
+
+
+def data_version(shipments) -> dict:
+    """Export kesh kaliti uchun: yangi, o'zgargan yoki o'chirilgan qator versiyani o'zgartiradi."""
+    return shipments.order_by().aggregate(rows=Count('id'), max_id=Max('id'), max_updated=Max('updated_at'))
+
+
+def build_export_file(shipments, fmt, *, days=None, title=None, progress=None):
+    """Export faylini vaqtinchalik faylga yozish: Excel - hisobot, qolganlari - tekis ustunlar."""
+    if fmt == 'xlsx':
+        title = f"Shipments ({days} kun)" if days else (title or 'Shipments')
+        return write_export(SHIPMENT_REPORT, shipments, fmt, title=title, progress=progress)
+    return write_export(SHIPMENT_FLAT, shipments, fmt, progress=progress)
 
 
 def export_to_excel(request):
     """
-    Web interface uchun Excel export
+    Web interface uchun export (?format=xlsx|csv|csv.gz|parquet)
     """
     days = request.GET.get('days', '1')
 
@@ -18,153 +136,163 @@ def export_to_excel(request):
     except ValueError:
         days = 1
 
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=days)
+    fmt = export_format(request.GET.get('format'))
+    artifact = shipments_export_artifact(days, fmt)
 
-    # ✅ TO'G'RILANDI: Shipment va Message modellaridan foydalanish
-    shipments = Shipment.objects.filter(
-        message__date__gte=start_date,
-        message__date__lte=end_date
-    ).select_related('message__channel').order_by('-message__date')
-
-    wb = create_excel_workbook(shipments, days)
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    extension, content_type = EXPORT_FORMATS[fmt]
+    response = FileResponse(
+        open(artifact.path, 'rb'), as_attachment=True,
+        filename=f'telegram_messages_{days}_kun.{extension}', content_type=content_type,
     )
-    response['Content-Disposition'] = f'attachment; filename=telegram_messages_{days}_kun.xlsx'
-
-    wb.save(response)
+    response['X-Cache'] = 'HIT' if artifact.hit else 'MISS'
     return response
 
 
-def create_excel_workbook(shipments, days):
+def generate_excel_file(shipments, days):
     """
-    Excel workbook yaratish
+    Telegram bot uchun fayl obyekti qaytaradi (boshiga o'tkazilgan)
     """
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Shipments ({days} kun)"
-
-    headers = ['№', 'Kanal', 'Xabar', 'Origin', 'Destination', 'Yuk turi',
-               'Transport', 'To\'lov', 'Telefon', 'Sana']
-    ws.append(headers)
-
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal='center', vertical='center')
-
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+    return build_export_file(shipments, 'xlsx', days=days)
 
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-        cell.border = thin_border
-
-    for idx, shipment in enumerate(shipments, start=1):
-        msg = shipment.message
-        ch = msg.channel
-
-        row = [
-            idx,
-            ch.title if ch else 'Noma\'lum',
-            msg.text[:100] + '...' if msg.text and len(msg.text) > 100 else (msg.text or ''),
-            shipment.origin or '-',
-            shipment.destination or '-',
-            shipment.cargo_type or '-',
-            shipment.truck_type or '-',
-            shipment.payment_type or '-',
-            shipment.phone or '-',
-            msg.date.strftime('%Y-%m-%d %H:%M') if msg.date else '-'
-        ]
-        ws.append(row)
-
-        for cell in ws[idx + 1]:
-            cell.border = thin_border
-            cell.alignment = Alignment(vertical='center', wrap_text=True)
-
-    column_widths = [5, 25, 50, 20, 20, 20, 20, 20, 20, 20]
-    for idx, width in enumerate(column_widths, start=1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(idx)].width = width
-
-    ws.row_dimensions[1].height = 25
-    for row in range(2, len(shipments) + 2):
-        ws.row_dimensions[row].height = 20
-
-    return wb
 
+def build_shipments_workbook_bytes(days=1):
+    """
+    bot_service.py uchun funksiya - async kontekstdan chaqiriladi
+    """
+    return generate_excel_file(_shipments_for_days(days), days)
 
-def generate_excel_file(shipments, days):
+
+def range_export_artifact(date_from, date_to, fmt='xlsx', *, channel_id=None, progress=None):
     """
-    Telegram bot uchun BytesIO qaytaradi
+    date_from..date_to (ixtiyoriy bitta kanal) exporti - diskdagi keshdan (artifacts.py) yoki yangidan.
     """
-    wb = create_excel_workbook(shipments, days)
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+    fmt = export_format(fmt)
+    shipments = _shipments_between(date_from, date_to, channel_id)
+    filters = {'channel': channel_id} if channel_id is not None else {}
+    key = artifact_key(
+        kind='shipments', layout=EXPORT_LAYOUT, fmt=fmt, date_from=date_from, date_to=date_to, filters=filters,
+        version=data_version(shipments),
+    )
+    extension = EXPORT_FORMATS[fmt][0]
+    suffix = f"_channel_{channel_id}" if channel_id is not None else ''
+    filename = f"shipments_{date_from.isoformat()}_{date_to.isoformat()}{suffix}.{extension}"
+    days = (date_to - date_from).days + 1
+    title = f"{date_from.isoformat()} - {date_to.isoformat()}"
+    return get_or_build(
+        key, extension, filename,
+        lambda: build_export_file(shipments, fmt, days=None if filters else days, title=title, progress=progress),
+    )
 
 
-def build_shipments_workbook_bytes(days=1):
+def shipments_export_artifact(days=1, fmt='xlsx', progress=None):
     """
-    bot_service.py uchun funksiya - async kontekstdan chaqiriladi
+    Oxirgi `days` kunlik export. Web, bot va kunlik yuborish bir xil faylni ishlatadi.
     """
-    from asgiref.sync import sync_to_async
+    return range_export_artifact(*days_range(days), fmt, progress=progress)
 
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=days)
 
-    # ✅ TO'G'RILANDI: Shipment modelidan foydalanish
-    shipments = list(Shipment.objects.filter(
-        message__date__gte=start_date,
-        message__date__lte=end_date
-    ).select_related('message__channel').order_by('-message__date'))
+# ==================== BOT UCHUN BO'LAKLASH ====================
 
-    return generate_excel_file(shipments, days)
+# Bot API orqali yuklanadigan eng katta fayl
+BOT_UPLOAD_LIMIT = 50 * 1024 * 1024
+# Reja taxmin bo'yicha tuziladi, shuning uchun limitning bir qismi zaxira
+PLAN_HEADROOM = 0.8
+# Taxminiy hajm (bayt / qator); haqiqiy hajm fayl yaratilgach baribir tekshiriladi
+ESTIMATED_ROW_BYTES = {
+    'xlsx': 150,
+    'csv': 200,
+    'csv.gz': 50,
+    'parquet': 40,
+}
+# Siqilmagan formatlar zip bilan shuncha marta kichrayadi (taxminan)
+ZIP_RATIO = {'csv': 4}
 
 
-def export_to_json(request):
+@dataclass(frozen=True)
+class ExportPart:
+    date_from: date
+    date_to: date
+    channel_id: Optional[int] = None
+    label: str = ''
+    rows: int = 0
+
+
+def estimate_size(rows, fmt, *, zipped=False):
+    size = rows * ESTIMATED_ROW_BYTES[fmt]
+    return size // ZIP_RATIO.get(fmt, 1) if zipped else size
+
+
+def _fits(rows, fmt, limit):
+    return estimate_size(rows, fmt, zipped=fmt in ZIP_RATIO) <= limit * PLAN_HEADROOM
+
+
+def _weeks(date_from, date_to):
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=6), date_to)
+        yield start, end
+        start = end + timedelta(days=1)
+
+
+def _period_label(date_from, date_to):
+    if date_from == date_to:
+        return date_from.isoformat()
+    return f"{date_from.isoformat()} → {date_to.isoformat()}"
+
+
+def plan_export_parts(date_from, date_to, fmt, *, limit=BOT_UPLOAD_LIMIT):
     """
-    JSON formatda export
+    Bot uchun fayllar rejasi: butun davr bitta faylga sig'masa haftalarga,
+    hafta ham sig'masa kanallarga bo'linadi. Faqat COUNT so'rovlari - fayl yaratilmaydi.
     """
-    import json
+    rows = _shipments_between(date_from, date_to).count()
+    if _fits(rows, fmt, limit):
+        return [ExportPart(date_from, date_to, label=_period_label(date_from, date_to), rows=rows)]
+
+    parts = []
+    for week_from, week_to in _weeks(date_from, date_to):
+        label = _period_label(week_from, week_to)
+        week = _shipments_between(week_from, week_to)
+        rows = week.count()
+        if not rows:
+            continue
+        if _fits(rows, fmt, limit):
+            parts.append(ExportPart(week_from, week_to, label=label, rows=rows))
+            continue
+        channels = (
+            week.order_by()
+            .values_list('message__channel_id', 'message__channel__title')
+            .annotate(total=Count('id'))
+            .order_by('-total')
+        )
+        parts.extend(
+            ExportPart(week_from, week_to, channel_id, f"{label} · {title or channel_id}", total)
+            for channel_id, title, total in channels
+        )
+    return parts
+
+
+def build_export_part(part, fmt, *, limit=BOT_UPLOAD_LIMIT):
+    """Rejadagi bitta qism fayli; limitdan oshsa zip qilinadi. Baribir sig'masa ValueError."""
+    artifact = range_export_artifact(part.date_from, part.date_to, fmt, channel_id=part.channel_id)
+    if artifact.size > limit:
+        artifact = zipped(artifact)
+    if artifact.size > limit:
+        raise ValueError(f"{part.label}: fayl juda katta ({artifact.size // (1024 * 1024)} MB)")
+    return artifact
+
 
+def export_to_json(request):
+    """
+    JSON formatda export (oqim bilan, qatorlar bo'laklab o'qiladi)
+    """
     days = int(request.GET.get('days', '1'))
     end_date = timezone.now()
     start_date = end_date - timedelta(days=days)
 
-    # ✅ TO'G'RILANDI: Shipment modelidan foydalanish
     shipments = Shipment.objects.filter(
         message__date__gte=start_date,
         message__date__lte=end_date
-    ).select_related('message__channel').order_by('-message__date')
-
-    data = []
-    for shipment in shipments:
-        msg = shipment.message
-        ch = msg.channel
-        data.append({
-            'channel': ch.title if ch else None,
-            'text': msg.text,
-            'origin': shipment.origin,
-            'destination': shipment.destination,
-            'cargo_type': shipment.cargo_type,
-            'truck_type': shipment.truck_type,
-            'payment_type': shipment.payment_type,
-            'phone': shipment.phone,
-            'date': msg.date.isoformat() if msg.date else None
-        })
-
-    response = HttpResponse(
-        json.dumps(data, ensure_ascii=False, indent=2),
-        content_type='application/json'
-    )
-    response['Content-Disposition'] = f'attachment; filename=telegram_messages_{days}_kun.json'
+    ).order_by('-message__date')
 
-    return response
\ No newline at end of file
+    return export_response(SHIPMENT_JSON, shipments, 'json', f'telegram_messages_{days}_kun')
@@ -0,0 +1,124 @@
+"""
+Yuklar o'zgarishlari lentasi (delta-sync) - NDJSON.
+
+Kursor oxirgi yuborilgan qatorning change_seq qiymati: yangi va o'zgargan
+yuklar shu tartibda, indeks bo'ylab o'qiladi. change_seq yozish bilan bitta
+tranzaksiyada ChangeSequence qatoridan olinadi; qator commit gacha qulflangani
+uchun raqamlar commit tartibida o'sadi. (updated_at, id) kursoridan farqli
+ravishda, kech commit bo'lgan yozuv kursordan orqada qolib ketmaydi.
+
+Long-poll (`wait_for_changes`) qisqa va bloklovchi: kutish MAX_WAIT bilan
+cheklangan va gthread workerda faqat bitta threadni band qiladi
+(gunicorn.conf.py). Kuzatuvchilar bazani alohida so'ramaydi: umumiy "head"
+tekshiruvi HEAD_TTL da bir marta, barcha kuzatuvchilar uchun bitta so'rov;
+ingest shu jarayonda yozsa `notify_changes()` ularni darhol uyg'otadi.
+"""
+import json
+import threading
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import ChangeSequence, Shipment
+
+BATCH_LIMIT = 1000
+MAX_BATCH_LIMIT = 5000
+# Qisqa long-poll: kuzatuvchi ko'pi bilan shuncha soniya thread band qiladi
+MAX_WAIT = 25
+HEAD_TTL = 1.0
+SEQUENCE_NAME = 'shipments'
+
+FEED_FIELDS = (
+    'change_seq', 'id', 'updated_at', 'message__channel__channel_id', 'message__message_id', 'message__date',
+    'origin', 'destination', 'cargo_type', 'truck_type', 'payment_type', 'phone', 'contact_kind',
+)
+FEED_NAMES = (
+    'seq', 'id', 'updated_at', 'channel_id', 'message_id', 'date',
+    'origin', 'destination', 'cargo_type', 'truck_type', 'payment_type', 'phone', 'contact_kind',
+)
+
+_changed = threading.Condition()
+_head = {'value': None, 'checked': 0.0}
+_head_lock = threading.Lock()
+
+
+def next_change_seq():
+    """
+    Keyingi change_seq - chaqiruvchi tranzaksiyasi ichida. UPDATE hisoblagich qatorini
+    commit gacha qulflaydi: parallel yozuvchi shu yerda kutadi va kattaroq raqam oladi.
+    """
+    counter = ChangeSequence.objects.filter(name=SEQUENCE_NAME)
+    if not counter.update(value=F('value') + 1):
+        # Migratsiyasiz yaratilgan baza (masalan, bench_db_contention)
+        ChangeSequence.objects.get_or_create(name=SEQUENCE_NAME)
+        counter.update(value=F('value') + 1)
+    return counter.values_list('value', flat=True).get()
+
+
+def notify_changes():
+    """Ingest yangi/o'zgargan yuk yozdi: kutayotgan kuzatuvchilarni uyg'otish."""
+    with _head_lock:
+        _head['checked'] = 0.0
+    with _changed:
+        _changed.notify_all()
+
+
+def _latest_change():
+    """Eng katta change_seq - barcha kuzatuvchilar uchun HEAD_TTL da bir so'rov."""
+    with _head_lock:
+        now = time.monotonic()
+        if now - _head['checked'] >= HEAD_TTL:
+            _head['value'] = Shipment.objects.order_by('-change_seq').values_list('change_seq', flat=True).first()
+            _head['checked'] = now
+        return _head['value']
+
+
+def _is_after(head, cursor):
+    return head is not None and head > (cursor or 0)
+
+
+def wait_for_changes(cursor, timeout):
+    """Kursordan keyin o'zgarish paydo bo'lguncha yoki timeout tugaguncha kutish."""
+    deadline = time.monotonic() + min(timeout, MAX_WAIT)
+    while True:
+        if _is_after(_latest_change(), cursor):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        # Boshqa jarayondagi ingest HEAD_TTL ichida, shu jarayondagisi darhol ko'rinadi
+        with _changed:
+            _changed.wait(min(remaining, HEAD_TTL))
+
+
+def changes_since(cursor, limit):
+    shipments = Shipment.objects.filter(change_seq__gt=cursor or 0).order_by('change_seq')
+    return shipments.values_list(*FEED_FIELDS)[:limit]
+
+
+def stream_changes(cursor, limit):
+    """NDJSON qatorlari; oxirgi qatorda davom ettirish uchun kursor."""
+    last = cursor
+    sent = 0
+    for row in changes_since(cursor, limit).iterator(chunk_size=500):
+        record = dict(zip(FEED_NAMES, row))
+        last = record['seq']
+        sent += 1
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    yield json.dumps({
+        'cursor': str(last) if last else '',
+        'count': sent,
+        'has_more': sent >= limit,
+    }) + '\n'
+
+
+def parse_cursor(raw):
+    """Bo'sh kursor - boshidan. Noto'g'ri kursor uchun ValueError."""
+    if not raw:
+        return None
+    cursor = int(raw)
+    if cursor < 0:
+        raise ValueError(raw)
+    return cursor
@@ -0,0 +1,93 @@
+"""
+Telegram xabarlarini bazaga yozish (ingest).
+
+Xabar va undan ajratilgan yuklar shu yerda saqlanadi, shuning uchun ingest
+paytida hisoblanadigan barcha qo'shimcha ma'lumotlar (fingerprint va h.k.)
+ham shu modulda yangilanadi.
+"""
+from django.utils import timezone
+
+from .caching import bump_version
+from .contacts import classify_contact, record_shipment
+from .dedup import fingerprint_fields, find_original_id
+from .feed import notify_changes
+from .lanes import LANES_NAMESPACE
+from .timeseries import TIMESERIES_NAMESPACE
+from .models import Message, Shipment
+from .search import add_to_city_index
+from .stats import channel_namespace, dashboard_namespace
+from .subscriptions import notify_new_shipments
+from .utils import parse_shipment_text
+
+
+def save_message(channel_obj, *, message_id, sender_id=None, sender_name=None, text=None, date=None):
+    """Xabarni saqlaydi (yoki mavjudini qaytaradi) va yuklarini yangilaydi."""
+    msg_obj = Message.objects.filter(channel=channel_obj, message_id=message_id).first()
+    created = False
+
+    if msg_obj is None:
+        fingerprint = fingerprint_fields(text or "")
+        msg_obj, created = Message.objects.get_or_create(
+            channel=channel_obj,
+            message_id=message_id,
+            defaults={
+                'sender_id': sender_id,
+                'sender_name': sender_name,
+                'text': text,
+                'date': date,
+                'duplicate_of_id': find_original_id(Message.objects.all(), fingerprint),
+                **fingerprint,
+            },
+        )
+
+    save_shipments(msg_obj, parse_shipment_text(text or ""))
+    return msg_obj, created
+
+
+def save_shipments(msg_obj, parsed_shipments):
+    """Har bir topilgan yukni alohida Shipment sifatida saqlash."""
+    shipments = []
+    created_shipments = []
+    any_updated = False
+    for parsed in parsed_shipments:
+        defaults = {
+            'cargo_type': parsed.get('cargo_type'),
+            'truck_type': parsed.get('truck_type'),
+            'payment_type': parsed.get('payment_type'),
+            'contact_kind': classify_contact(parsed.get('phone')),
+        }
+        shipment, created = Shipment.objects.get_or_create(
+            message=msg_obj,
+            origin=parsed.get('origin'),
+            destination=parsed.get('destination'),
+            phone=parsed.get('phone'),
+            defaults=defaults,
+        )
+        if created:
+            created_shipments.append(shipment)
+            record_shipment(shipment, msg_obj)
+        else:
+            # Faqat haqiqatan o'zgargan yuk qayta yoziladi (updated_at - feed.py)
+            changed = [field for field, value in defaults.items() if getattr(shipment, field) != value]
+            if changed:
+                for field in changed:
+                    setattr(shipment, field, defaults[field])
+                shipment.save(update_fields=[*changed, 'updated_at'])
+                any_updated = True
+        shipments.append(shipment)
+
+    if created_shipments:
+        # Yangi yuk yozildi - statistika, dashboard, lane va vaqt qatorlari keshlari
+        # eskiradi (bitta UPDATE)
+        bump_version(
+            channel_namespace(msg_obj.channel.channel_id),
+            dashboard_namespace(timezone.localdate(msg_obj.date) if msg_obj.date else timezone.localdate()),
+            LANES_NAMESPACE,
+            TIMESERIES_NAMESPACE,
+        )
+        add_to_city_index(created_shipments)
+    if created_shipments or any_updated:
+        notify_changes()
+    # Mos obunachilarga xabar (teskari indeks orqali, bot navbatiga)
+    notify_new_shipments(created_shipments, msg_obj)
+    return shipments
@@ -0,0 +1,274 @@
+"""
+Fon export vazifalari: bazadagi navbat + jarayon ichidagi worker thread.
+
+- `submit_export()` vazifani navbatga qo'yadi (bir xil tugamagan vazifa bo'lsa
+  o'shani qaytaradi) va worker threadni ishga tushiradi.
+- Worker vazifani atomik `UPDATE ... WHERE status='pending'` bilan oladi,
+  shuning uchun bir nechta jarayon (gunicorn workerlari yoki
+  `manage.py run_export_worker`) bir vazifani ikki marta bajarmaydi.
+- Heartbeat alohida threadda progressdan mustaqil yoziladi; heartbeati
+  eskirgan "running" vazifalar navbatga qaytariladi.
+- Har bir olish yangi `lease` tokeni beradi: progress va yakuniy natija faqat
+  token mos kelsa yoziladi, navbatga qaytarilgan vazifaning eski bajaruvchisi
+  to'xtaydi va natijani ustidan yozmaydi.
+- Natija fayllari `EXPORT_JOBS_DIR` da saqlanadi (artifacts LRU si ularni
+  o'chirmaydi) va `EXPORT_JOB_FILE_TTL_HOURS` dan keyin tozalanadi.
+- Vazifa tugaganda unga teng kutayotgan vazifalar ham shu natija bilan yopiladi.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 30
+STALE_AFTER = timedelta(minutes=5)
+IDLE_EXIT = 30
+CLEANUP_EVERY = 600
+
+Status = ExportJob.Status
+
+_worker = {'thread': None}
+_worker_guard = threading.Lock()
+_cleanup = {'at': None}
+
+
+class LeaseLost(Exception):
+    """Vazifa navbatga qaytarilgan va boshqa worker olgan."""
+
+
+def jobs_dir() -> Path:
+    path = Path(settings.EXPORT_JOBS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def dedup_key(kind, fmt, params, deliver) -> str:
+    raw = json.dumps([kind, fmt, params, deliver], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def submit_export(*, kind='shipments', fmt='xlsx', params=None, deliver=ExportJob.Deliver.DOWNLOAD, start_worker=True):
+    """Vazifani navbatga qo'yish. Qaytaradi: ExportJob (yangi yoki mavjud teng vazifa)."""
+    params = params or {}
+    key = dedup_key(kind, fmt, params, deliver)
+    job = (
+        ExportJob.objects
+        .filter(dedup_key=key, status__in=[Status.PENDING, Status.RUNNING])
+        .order_by('id')
+        .first()
+    )
+    if job is None:
+        job = ExportJob.objects.create(kind=kind, fmt=fmt, params=params, deliver=deliver, dedup_key=key)
+    if start_worker:
+        ensure_worker()
+    return job
+
+
+def requeue_stale():
+    """Jarayoni o'lib qolgan (heartbeat eskirgan) vazifalarni navbatga qaytarish."""
+    return ExportJob.objects.filter(
+        status=Status.RUNNING, heartbeat_at__lt=timezone.now() - STALE_AFTER
+    ).update(status=Status.PENDING, processed_rows=0)
+
+
+def claim_next():
+    """Navbatdagi birinchi vazifani atomik olish (yoki None)."""
+    for job_id in ExportJob.objects.filter(status=Status.PENDING).order_by('id').values_list('id', flat=True)[:5]:
+        now = timezone.now()
+        claimed = ExportJob.objects.filter(id=job_id, status=Status.PENDING).update(
+            status=Status.RUNNING, started_at=now, heartbeat_at=now, processed_rows=0, lease=uuid.uuid4().hex
+        )
+        if claimed:
+            return ExportJob.objects.get(id=job_id)
+    return None
+
+
+def _owned(job):
+    """Vazifa hali shu bajaruvchida bo'lsagina yangilanadigan queryset."""
+    return ExportJob.objects.filter(id=job.id, status=Status.RUNNING, lease=job.lease)
+
+
+def _heartbeat(job, stop):
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            if not _owned(job).update(heartbeat_at=timezone.now()):
+                return
+    finally:
+        connection.close()
+
+
+def _progress_writer(job):
+    last = {'at': 0.0}
+
+    def progress(rows):
+        now = time.monotonic()
+        if now - last['at'] < PROGRESS_INTERVAL:
+            return
+        last['at'] = now
+        if not _owned(job).update(processed_rows=rows, heartbeat_at=timezone.now()):
+            raise LeaseLost(job.id)
+
+    return progress
+
+
+def _keep(path, name):
+    """Kesh faylini vazifalar papkasiga bog'lash (kesh uni o'chirsa ham qoladi)."""
+    target = jobs_dir() / name
+    target.unlink(missing_ok=True)
+    try:
+        os.link(path, target)
+    except OSError:
+        shutil.copyfile(path, target)
+    return target
+
+
+def _run_shipments(job, progress):
+    from .exports import _shipments_for_days, shipments_export_artifact
+
+    days = int(job.params.get('days', 1))
+    _owned(job).update(total_rows=_shipments_for_days(days).count())
+    artifact = shipments_export_artifact(days, job.fmt, progress=progress)
+
+    if job.deliver == ExportJob.Deliver.BOT:
+        from .bot_service import enqueue_export
+
+        # Fayl endi keshda - runbot jarayoni uni qayta yaratmasdan yuboradi
+        enqueue_export(days=days, fmt=job.fmt)
+    return _keep(artifact.path, f"job_{job.id}_{job.lease}{artifact.path.suffix}"), artifact.filename
+
+
+def _run_messages_json(job, progress):
+    from .models import TelegramMessage
+    from .utils import save_messages_json
+
+    _owned(job).update(total_rows=TelegramMessage.objects.count())
+    compress = job.fmt == 'jsonl.gz'
+    filename = f"telegram_messages.{job.fmt}"
+    path = jobs_dir() / f"messages_job_{job.id}_{job.lease}.{job.fmt}"
+    save_messages_json(str(path), compress=compress, progress=progress)
+    return path, filename
+
+
+RUNNERS = {
+    'shipments': _run_shipments,
+    'messages_json': _run_messages_json,
+}
+
+
+def run_job(job):
+    """Bitta vazifani bajarish va natijani (teng kutayotganlar bilan birga) yozish."""
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job, stop), name=f'export-heartbeat-{job.id}', daemon=True)
+    heartbeat.start()
+    try:
+        path, filename = RUNNERS[job.kind](job, _progress_writer(job))
+    except LeaseLost:
+        logger.warning("Export job %s was requeued, dropping this run", job.id)
+        return
+    except Exception as exc:
+        logger.exception("Export job %s failed", job.id)
+        _owned(job).update(status=Status.FAILED, error=str(exc), finished_at=timezone.now())
+        return
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    done = {
+        'status': Status.DONE,
+        'file_path': str(path),
+        'filename': filename,
+        'finished_at': timezone.now(),
+    }
+    total = ExportJob.objects.values_list('total_rows', flat=True).get(id=job.id)
+    if not _owned(job).update(processed_rows=total, **done):
+        logger.warning("Export job %s was requeued, dropping this run", job.id)
+        Path(path).unlink(missing_ok=True)
+        return
+    # Shu orada qo'shilgan teng vazifalar qayta bajarilmaydi
+    ExportJob.objects.filter(dedup_key=job.dedup_key, status=Status.PENDING).update(
+        total_rows=total, processed_rows=total, **done
+    )
+
+
+def cleanup_files(max_age=None):
+    """Muddati o'tgan tayyor vazifalarning fayllarini o'chirish."""
+    if max_age is None:
+        max_age = timedelta(hours=settings.EXPORT_JOB_FILE_TTL_HOURS)
+    expired = (
+        ExportJob.objects
+        .filter(status=Status.DONE, finished_at__lt=timezone.now() - max_age)
+        .exclude(file_path='')
+    )
+    removed = 0
+    for path in set(expired.values_list('file_path', flat=True)):
+        try:
+            Path(path).unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    # Yuklab olish bo'sh yo'lni ko'rib vazifani qayta navbatga qo'yadi
+    expired.update(file_path='')
+    return removed
+
+
+def _maybe_cleanup():
+    now = time.monotonic()
+    if _cleanup['at'] is not None and now - _cleanup['at'] < CLEANUP_EVERY:
+        return
+    _cleanup['at'] = now
+    cleanup_files()
+
+
+def work(*, once=False, idle_exit=None, poll=1.0):
+    """Navbatni bo'shatish. `idle_exit` soniya bo'sh turgandan keyin to'xtaydi."""
+    idle_since = time.monotonic()
+    while True:
+        close_old_connections()
+        requeue_stale()
+        _maybe_cleanup()
+        job = claim_next()
+        if job is not None:
+            run_job(job)
+            idle_since = time.monotonic()
+            continue
+        if once or (idle_exit is not None and time.monotonic() - idle_since >= idle_exit):
+            return
+        time.sleep(poll)
+
+
+def _worker_main():
+    while True:
+        work(idle_exit=IDLE_EXIT)
+        # To'xtash paytida qo'shilgan vazifa qolib ketmasin
+        with _worker_guard:
+            if not ExportJob.objects.filter(status=Status.PENDING).exists():
+                _worker['thread'] = None
+                close_old_connections()
+                return
+
+
+def ensure_worker():
+    """Jarayon ichidagi worker thread (bo'sh qolsa o'zi to'xtaydi)."""
+    with _worker_guard:
+        thread = _worker['thread']
+        if thread is not None and thread.is_alive():
+            return thread
+        thread = threading.Thread(target=_worker_main, name='export-worker', daemon=True)
+        _worker['thread'] = thread
+        thread.start()
+        return thread
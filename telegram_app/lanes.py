@@ -0,0 +1,133 @@
+"""
+Yo'nalishlar matritsasi (origin × destination) - NumPy bilan.
+
+Baza faqat (origin, destination, soni) bo'yicha guruhlaydi, qolgan ish
+vektorlashtirilgan: shahar nomlari search.city_key bo'yicha lug'at bilan
+kodlanadi (np.unique; city_key faqat noyob yozilishlarga qo'llanadi), bir xil
+bo'lib qolgan yo'nalishlar np.bincount bilan qo'shiladi. Natija: top-K yo'nalishlar, sparse matritsa (COO) va heatmap
+uchun eng faol shaharlar bo'yicha zich kesma.
+"""
+import time
+
+import numpy as np
+from django.db.models import Count
+
+from .caching import get_or_compute, make_key
+from .models import Shipment
+from .search import city_key
+
+LANES_CACHE_TTL = 120
+# Kesh namespace: ingest yangi yuk yozganda versiyasi oshiriladi
+LANES_NAMESPACE = 'lanes'
+HEATMAP_SIZE = 15
+
+
+def _encode(values, totals):
+    """
+    Shahar nomlarini city_key bo'yicha kodlash ("Farg'ona", "FARGʻONA" - bitta kod).
+    Yorliq - shu kalitdagi eng ko'p yuk bilan uchragan asl yozilish.
+    Qaytaradi: (labels, codes)
+    """
+    spellings, spelling_idx = np.unique(np.array([(v or '').strip() for v in values], dtype=str), return_inverse=True)
+    keys = np.array([city_key(s) or '-' for s in spellings], dtype=str)
+    _, spelling_key = np.unique(keys, return_inverse=True)
+
+    # Har bir kalit ichida yozilishlar yuk soni bo'yicha kamayish tartibida, birinchisi - yorliq
+    spelling_totals = np.bincount(spelling_idx, weights=totals, minlength=len(spellings))
+    order = np.lexsort((-spelling_totals, spelling_key))
+    first = np.r_[True, spelling_key[order][1:] != spelling_key[order][:-1]]
+    labels = spellings[order[first]]
+    labels[labels == ''] = '-'
+    return labels, spelling_key[spelling_idx]
+
+
+def compute_lane_matrix(start, end, channel_ids=None, *, top_k=20, heatmap_size=HEATMAP_SIZE):
+    started = time.perf_counter()
+
+    shipments = Shipment.objects.filter(message__date__gte=start, message__date__lt=end)
+    if channel_ids:
+        shipments = shipments.filter(message__channel__channel_id__in=channel_ids)
+
+    rows = list(
+        shipments
+        .order_by()
+        .values_list('origin', 'destination')
+        .annotate(total=Count('id'))
+    )
+    if not rows:
+        return {
+            'origins': [], 'destinations': [], 'total': 0, 'top_lanes': [],
+            'matrix': {'shape': [0, 0], 'rows': [], 'cols': [], 'values': []},
+            'heatmap': {'origins': [], 'destinations': [], 'cells': [], 'max': 0},
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    origins_raw, destinations_raw, totals = zip(*rows)
+    totals = np.asarray(totals, dtype=np.int64)
+
+    # Lug'at bilan kodlash
+    origin_labels, origin_idx = _encode(origins_raw, totals)
+    dest_labels, dest_idx = _encode(destinations_raw, totals)
+    n_dest = len(dest_labels)
+
+    # Normallashtirishdan keyin bir xil bo'lgan yo'nalishlarni qo'shish
+    lane_keys = origin_idx.astype(np.int64) * n_dest + dest_idx
+    lane_ids, lane_inverse = np.unique(lane_keys, return_inverse=True)
+    lane_counts = np.bincount(lane_inverse, weights=totals).astype(np.int64)
+    lane_rows, lane_cols = lane_ids // n_dest, lane_ids % n_dest
+
+    # Top-K yo'nalishlar
+    k = min(top_k, len(lane_counts))
+    top = np.argpartition(-lane_counts, k - 1)[:k]
+    top = top[np.argsort(-lane_counts[top], kind='stable')]
+    top_lanes = [
+        {
+            'origin': str(origin_labels[lane_rows[i]]),
+            'destination': str(dest_labels[lane_cols[i]]),
+            'total': int(lane_counts[i]),
+        }
+        for i in top
+    ]
+
+    # Heatmap: eng faol origin va destinationlar kesmasi
+    origin_totals = np.bincount(lane_rows, weights=lane_counts, minlength=len(origin_labels))
+    dest_totals = np.bincount(lane_cols, weights=lane_counts, minlength=n_dest)
+    hot_origins = np.argsort(-origin_totals, kind='stable')[:heatmap_size]
+    hot_dests = np.argsort(-dest_totals, kind='stable')[:heatmap_size]
+
+    origin_pos = np.full(len(origin_labels), -1)
+    origin_pos[hot_origins] = np.arange(len(hot_origins))
+    dest_pos = np.full(n_dest, -1)
+    dest_pos[hot_dests] = np.arange(len(hot_dests))
+    r, c = origin_pos[lane_rows], dest_pos[lane_cols]
+    inside = (r >= 0) & (c >= 0)
+    dense = np.zeros((len(hot_origins), len(hot_dests)), dtype=np.int64)
+    dense[r[inside], c[inside]] = lane_counts[inside]
+
+    return {
+        'origins': origin_labels.tolist(),
+        'destinations': dest_labels.tolist(),
+        'total': int(lane_counts.sum()),
+        'top_lanes': top_lanes,
+        'matrix': {
+            'shape': [len(origin_labels), n_dest],
+            'rows': lane_rows.tolist(),
+            'cols': lane_cols.tolist(),
+            'values': lane_counts.tolist(),
+        },
+        'heatmap': {
+            'origins': origin_labels[hot_origins].tolist(),
+            'destinations': dest_labels[hot_dests].tolist(),
+            'cells': dense.tolist(),
+            'max': int(dense.max()) if dense.size else 0,
+        },
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def get_lane_matrix(start, end, channel_ids=None, *, top_k=20):
+    """Keshlangan lane matrix. Qaytaradi: (natija, hit)"""
+    key = make_key(LANES_NAMESPACE, start.isoformat(), end.isoformat(), sorted(channel_ids or []), top_k)
+    return get_or_compute(
+        'lanes', key, lambda: compute_lane_matrix(start, end, channel_ids, top_k=top_k), LANES_CACHE_TTL
+    )
@@ -0,0 +1,134 @@
+"""
+Xabar matnlarini zstd lug'ati bilan siqish / lug'atni qayta o'qitish.
+
+    python manage.py compress_messages --train               # lug'at o'qitish + siqish
+    python manage.py compress_messages --older-than 90       # faqat 90 kundan eski xabarlar
+    python manage.py compress_messages --train --recompress  # yangi lug'at bilan qayta siqish
+    python manage.py compress_messages --decompress          # hammasini oddiy matnga qaytarish
+
+Eslatma: siqilgan xabarlar `text` ustunida bo'lmagani uchun saved_messages
+sahifasidagi so'z bo'yicha qidiruv ularni topmaydi, shuning uchun standart
+holatda faqat MESSAGE_TEXT_COMPRESSION_AFTER_DAYS dan eski xabarlar siqiladi
+(`--older-than 0` - hammasi).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from telegram_app import compression
+from telegram_app.models import CompressionDictionary, Message
+
+UPDATE_FIELDS = ['text', 'text_zstd', 'text_dictionary', 'text_length']
+
+
+class Command(BaseCommand):
+    help = "Xabar matnlarini o'qitilgan zstd lug'ati bilan siqish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--train', action='store_true', help="Yangi lug'at o'qitish")
+        parser.add_argument('--samples', type=int, default=5000)
+        parser.add_argument('--dict-size', type=int, default=compression.DICT_SIZE)
+        parser.add_argument('--recompress', action='store_true',
+                            help="Eski lug'at bilan siqilganlarni ham qayta siqish")
+        parser.add_argument('--older-than', type=int, default=settings.MESSAGE_TEXT_COMPRESSION_AFTER_DAYS,
+                            metavar='DAYS', help="Faqat shundan eski xabarlar (0 - hammasi)")
+        parser.add_argument('--decompress', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        if not compression.is_available():
+            raise CommandError("zstandard o'rnatilmagan: pip install zstandard")
+
+        if opts['decompress']:
+            qs = Message.objects.filter(text_zstd__isnull=False)
+            done = self._rewrite(qs, None, opts['chunk_size'], compress=False)
+            self.stdout.write(self.style.SUCCESS(f"{done} ta xabar ochildi"))
+            return
+
+        if opts['train']:
+            dictionary = self._train(opts['samples'], opts['dict_size'])
+        else:
+            dictionary = CompressionDictionary.objects.order_by('-id').first()
+            if dictionary is None:
+                raise CommandError("Lug'at yo'q, avval --train bilan ishga tushiring")
+
+        qs = Message.objects.filter(text__isnull=False).exclude(text='')
+        if opts['recompress']:
+            qs = Message.objects.filter(
+                Q(text__isnull=False) & ~Q(text='') |
+                Q(text_zstd__isnull=False) & ~Q(text_dictionary=dictionary)
+            )
+        if opts['older_than']:
+            qs = qs.filter(date__lt=timezone.now() - timedelta(days=opts['older_than']))
+
+        done = self._rewrite(qs, dictionary.pk, opts['chunk_size'], compress=True)
+        self.stdout.write(f"{done} ta xabar siqildi (lug'at #{dictionary.pk})")
+        self._report(dictionary)
+
+    def _train(self, sample_count, dict_size):
+        ids = list(
+            Message.objects.exclude(text__isnull=True, text_zstd__isnull=True)
+            .order_by('-id').values_list('id', flat=True)[:sample_count]
+        )
+        samples = [m.text for m in Message.objects.filter(id__in=ids).only(
+            'id', 'text', 'text_zstd', 'text_dictionary'
+        )]
+        if len(samples) < 10:
+            raise CommandError("Lug'at o'qitish uchun xabarlar yetarli emas")
+
+        dictionary = compression.train_dictionary(samples, size=dict_size)
+        self.stdout.write(
+            f"Lug'at #{dictionary.pk}: {len(dictionary.data)} bayt, {len(samples)} ta namuna"
+        )
+        return dictionary
+
+    def _rewrite(self, qs, dictionary_id, chunk_size, *, compress):
+        ids = list(qs.order_by('id').values_list('id', flat=True))
+        done = 0
+        for start in range(0, len(ids), chunk_size):
+            chunk = list(Message.objects.filter(id__in=ids[start:start + chunk_size]).only(
+                'id', 'text', 'text_zstd', 'text_dictionary'
+            ))
+            for msg in chunk:
+                raw = msg.text or ""
+                if compress:
+                    msg.text_zstd = compression.compress_text(raw, dictionary_id)
+                    msg.text_dictionary_id = dictionary_id
+                    msg.text_length = len(raw.encode('utf-8'))
+                    msg.text = None
+                else:
+                    msg.text_zstd = None
+                    msg.text_dictionary_id = None
+                    msg.text_length = None
+            with transaction.atomic():
+                Message.objects.bulk_update(chunk, UPDATE_FIELDS)
+            done += len(chunk)
+            self.stdout.write(f"  {done}/{len(ids)}")
+        return done
+
+    def _report(self, dictionary):
+        stats = Message.objects.filter(text_zstd__isnull=False).aggregate(
+            count=Count('id'),
+            raw=Sum('text_length'),
+            compressed=Sum(Length('text_zstd')),
+        )
+        dictionary.message_count = stats['count'] or 0
+        dictionary.raw_bytes = stats['raw'] or 0
+        dictionary.compressed_bytes = stats['compressed'] or 0
+        dictionary.save(update_fields=['message_count', 'raw_bytes', 'compressed_bytes'])
+
+        # O'qish narxi: 1000 ta siqilgan xabarni ochish vaqti
+        sample = list(Message.objects.filter(text_zstd__isnull=False).order_by('-id')[:1000])
+        per_message = sum(m.decompress_seconds for m in sample) / len(sample) if sample else 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Siqilgan: {dictionary.message_count} ta xabar, "
+            f"{dictionary.raw_bytes / 1024:.1f} KB → {dictionary.compressed_bytes / 1024:.1f} KB "
+            f"(tejaldi {dictionary.saved_bytes / 1024:.1f} KB, {dictionary.ratio:.2f}x), "
+            f"ochish ~{per_message * 1e6:.1f} µs/xabar"
+        ))
@@ -0,0 +1,19 @@
+"""
+Kontaktlar katalogini (Contact, ContactChannelStat) noldan qayta hisoblash.
+
+    python manage.py rebuild_contacts
+"""
+from django.core.management.base import BaseCommand
+
+from telegram_app.contacts import rebuild_contacts
+
+
+class Command(BaseCommand):
+    help = "Shipment jadvalidan kontaktlar katalogini qayta qurish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        total = rebuild_contacts(chunk_size=opts['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Tayyor: {total} ta kontakt"))
@@ -0,0 +1,51 @@
+"""
+Mavjud xabarlar uchun SimHash fingerprint va duplicate_of ni qayta hisoblash.
+
+    python manage.py rebuild_fingerprints
+    python manage.py rebuild_fingerprints --only-missing
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from telegram_app.dedup import FINGERPRINT_FIELDS, fingerprint_fields, find_original_id
+from telegram_app.models import Message
+
+
+class Command(BaseCommand):
+    help = "Xabarlar uchun SimHash fingerprint va dublikat bog'lanishini qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--only-missing', action='store_true',
+                            help="Faqat simhash hisoblanmagan xabarlar")
+
+    def handle(self, *args, **opts):
+        qs = Message.objects.order_by('date', 'id')
+        if opts['only_missing']:
+            qs = qs.filter(simhash__isnull=True)
+
+        processed = 0
+        chunk_size = opts['chunk_size']
+        ids = list(qs.values_list('id', flat=True))
+
+        # Sana tartibida ishlaymiz: avvalgi xabarlar asl nusxa bo'lib qoladi
+        for start in range(0, len(ids), chunk_size):
+            chunk = Message.objects.filter(id__in=ids[start:start + chunk_size]).order_by('date', 'id')
+            with transaction.atomic():
+                for msg in chunk:
+                    fields = fingerprint_fields(msg.text or "")
+                    for name in FINGERPRINT_FIELDS:
+                        setattr(msg, name, fields[name])
+
+                    earlier = Message.objects.filter(pk__lt=msg.pk)
+                    if msg.date:
+                        earlier = Message.objects.filter(
+                            Q(date__lt=msg.date) | Q(date=msg.date, pk__lt=msg.pk)
+                        )
+                    msg.duplicate_of_id = find_original_id(earlier, fields)
+                    msg.save(update_fields=FINGERPRINT_FIELDS + ['duplicate_of'])
+                    processed += 1
+            self.stdout.write(f"{processed}/{len(ids)} xabar qayta ishlandi")
+
+        self.stdout.write(self.style.SUCCESS(f"Tayyor: {processed} ta xabar"))
@@ -0,0 +1,22 @@
+"""
+Fon export vazifalarini alohida jarayonda bajarish (web jarayonidan tashqari).
+
+    python manage.py run_export_worker          # doimiy ishlaydi
+    python manage.py run_export_worker --once   # navbatni bo'shatib chiqadi
+"""
+from django.core.management.base import BaseCommand
+
+from telegram_app import jobs
+
+
+class Command(BaseCommand):
+    help = "Navbatdagi export vazifalarini bajarish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Navbat bo'shagach chiqish")
+        parser.add_argument('--poll', type=float, default=1.0, help="Navbatni tekshirish oralig'i (soniya)")
+
+    def handle(self, *args, **opts):
+        self.stdout.write("Export worker ishga tushdi")
+        jobs.work(once=opts['once'], poll=opts['poll'])
+        self.stdout.write(self.style.SUCCESS("Navbat bo'sh"))
@@ -0,0 +1,23 @@
+"""
+Telegram botni doimiy ishga tushirish: bitta Application (polling), buyruqlar,
+kunlik avtomatik export, web/worker qo'ygan bot navbati (bot_queue.py) va
+xabarlar navbati (outbox.py).
+
+    python manage.py runbot
+    python manage.py runbot --no-daily   # kunlik exportsiz
+"""
+from django.core.management.base import BaseCommand
+
+from telegram_app.bot_service import BOT_TASK_POLL, run_bot
+
+
+class Command(BaseCommand):
+    help = "Telegram botni polling rejimida ishga tushirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=BOT_TASK_POLL, help="Bot navbatini tekshirish oralig'i (soniya)")
+        parser.add_argument('--no-daily', action='store_true', help="Kunlik avtomatik exportni o'chirish")
+
+    def handle(self, *args, **opts):
+        self.stdout.write("Bot ishga tushdi (to'xtatish: Ctrl+C)")
+        run_bot(poll=opts['poll'], daily=not opts['no_daily'])
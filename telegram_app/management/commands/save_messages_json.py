@@ -0,0 +1,30 @@
+"""
+TelegramMessage jadvalidagi xabarlarni tahlil qilib JSON Lines faylga yozish.
+
+    python manage.py save_messages_json                              # telegram_messages.jsonl
+    python manage.py save_messages_json --gzip -o /tmp/messages.jsonl.gz
+"""
+from django.core.management.base import BaseCommand
+
+from telegram_app.utils import MESSAGES_JSON_CHUNK, save_messages_json
+
+
+class Command(BaseCommand):
+    help = "Xabarlarni JSON Lines (ixtiyoriy gzip) faylga oqim bilan yozish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', default=None, help="Fayl yo'li")
+        parser.add_argument('--gzip', action='store_true', help="gzip bilan siqish")
+        parser.add_argument('--chunk-size', type=int, default=MESSAGES_JSON_CHUNK)
+
+    def handle(self, *args, **opts):
+        path = opts['output'] or ('telegram_messages.jsonl.gz' if opts['gzip'] else 'telegram_messages.jsonl')
+
+        def progress(count):
+            self.stdout.write(f"  {count} ta xabar", ending='\r')
+
+        messages, shipments = save_messages_json(
+            path, compress=opts['gzip'], chunk_size=opts['chunk_size'], progress=progress
+        )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"{messages} ta xabardan {shipments} ta yuk yozildi: {path}"))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0004_alter_shipment_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='near_duplicates', to='telegram_app.message'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='simhash_band0',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='simhash_band1',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='simhash_band2',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='simhash_band3',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
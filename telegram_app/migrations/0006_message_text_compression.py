@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0005_message_simhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompressionDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('sample_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('message_count', models.IntegerField(default=0)),
+                ('raw_bytes', models.BigIntegerField(default=0)),
+                ('compressed_bytes', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='text_length',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='text_zstd',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='text_dictionary',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='telegram_app.compressiondictionary'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0006_message_text_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(max_length=64, unique=True)),
+                ('display_phone', models.CharField(blank=True, max_length=64, null=True)),
+                ('first_seen', models.DateTimeField(blank=True, null=True)),
+                ('last_seen', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('total_loads', models.PositiveIntegerField(default=0)),
+                ('channel_count', models.PositiveIntegerField(default=0)),
+                ('route_counts', models.JSONField(blank=True, default=dict)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='contact',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shipments', to='telegram_app.contact'),
+        ),
+        migrations.CreateModel(
+            name='ContactChannelStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('last_seen', models.DateTimeField(blank=True, null=True)),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contact_stats', to='telegram_app.channel')),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='channel_stats', to='telegram_app.contact')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['channel', '-total'], name='contact_stat_channel_top')],
+                'unique_together': {('contact', 'channel')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0007_contact_directory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['-date', '-id'], name='message_date_id_desc'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+def _classify(phone):
+    phone = (phone or '').strip()
+    if not phone:
+        return None
+    if phone.startswith('@'):
+        return 'username'
+    digits_only = ''.join(ch for ch in phone if ch.isdigit())
+    if phone.startswith('+') or len(digits_only) >= 9:
+        return 'phone'
+    return 'other'
+
+
+def backfill_contact_kind(apps, schema_editor):
+    Shipment = apps.get_model('telegram_app', 'Shipment')
+    Contact = apps.get_model('telegram_app', 'Contact')
+    ContactChannelStat = apps.get_model('telegram_app', 'ContactChannelStat')
+
+    by_kind = {}
+    rows = Shipment.objects.exclude(phone__isnull=True).values_list('id', 'phone')
+    for pk, phone in rows.iterator(chunk_size=5000):
+        kind = _classify(phone)
+        if kind:
+            by_kind.setdefault(kind, []).append(pk)
+    for kind, ids in by_kind.items():
+        for start in range(0, len(ids), 500):
+            Shipment.objects.filter(pk__in=ids[start:start + 500]).update(contact_kind=kind)
+
+    for contact in Contact.objects.only('id', 'display_phone', 'phone').iterator(chunk_size=2000):
+        kind = _classify(contact.display_phone or contact.phone) or 'other'
+        if kind != 'phone':
+            Contact.objects.filter(pk=contact.pk).update(kind=kind)
+            ContactChannelStat.objects.filter(contact_id=contact.pk).update(kind=kind)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0008_message_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='kind',
+            field=models.CharField(choices=[('phone', 'Telefon'), ('username', 'Telegram @username'), ('other', 'Boshqa')], default='phone', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='contactchannelstat',
+            name='kind',
+            field=models.CharField(choices=[('phone', 'Telefon'), ('username', 'Telegram @username'), ('other', 'Boshqa')], default='phone', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='contact_kind',
+            field=models.CharField(blank=True, choices=[('phone', 'Telefon'), ('username', 'Telegram @username'), ('other', 'Boshqa')], db_index=True, max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='contactchannelstat',
+            index=models.Index(fields=['channel', 'kind', '-total'], name='contact_stat_channel_kind_top'),
+        ),
+        migrations.RunPython(backfill_contact_kind, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0009_contact_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['updated_at', 'id'], name='shipment_updated_id'),
+        ),
+    ]
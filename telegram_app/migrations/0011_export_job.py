@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0010_shipment_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(default='shipments', max_length=32)),
+                ('fmt', models.CharField(default='xlsx', max_length=16)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('deliver', models.CharField(choices=[('download', 'Yuklab olish'), ('bot', 'Telegram bot')], default='download', max_length=16)),
+                ('dedup_key', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('running', 'Bajarilmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], db_index=True, default='pending', max_length=16)),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('processed_rows', models.PositiveIntegerField(default=0)),
+                ('file_path', models.CharField(blank=True, default='', max_length=512)),
+                ('filename', models.CharField(blank=True, default='', max_length=255)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:16
+
+from django.db import migrations, models
+
+_APOSTROPHES = str.maketrans('', '', "'`ʻʼ‘’")
+
+
+def _city_key(name):
+    if not name:
+        return None
+    key = ' '.join(name.translate(_APOSTROPHES).casefold().split())
+    return key[:255] or None
+
+
+def backfill_city_keys(apps, schema_editor):
+    Shipment = apps.get_model('telegram_app', 'Shipment')
+
+    # Har bir alohida shahar nomi uchun bitta UPDATE
+    for field in ('origin', 'destination'):
+        names = Shipment.objects.exclude(**{f'{field}__isnull': True}).order_by().values_list(field, flat=True).distinct()
+        for name in names.iterator(chunk_size=2000):
+            Shipment.objects.filter(**{field: name}).update(**{f'{field}_key': _city_key(name)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0012_bot_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='destination_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='origin_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['origin_key', 'destination_key', '-id'], name='shipment_route_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['origin_key', '-id'], name='shipment_origin_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['destination_key', '-id'], name='shipment_dest_recent'),
+        ),
+        migrations.RunPython(backfill_city_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0013_shipment_search_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.BigIntegerField(db_index=True)),
+                ('origin_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('destination_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('truck_category', models.CharField(blank=True, max_length=32, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'unique_together': {('chat_id', 'origin_key', 'destination_key', 'truck_category')},
+            },
+        ),
+    ]
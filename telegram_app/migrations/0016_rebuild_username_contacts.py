@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def rebuild(apps, schema_editor):
+    # @username kontaktlari avval raqamlarigacha qisqartirilgan (@ali_99 va @bob_99 -> "99")
+    from telegram_app.contacts import rebuild_contacts
+
+    rebuild_contacts(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0015_outbound_message'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
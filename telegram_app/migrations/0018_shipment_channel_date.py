@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_channel_date(apps, schema_editor):
+    Shipment = apps.get_model('telegram_app', 'Shipment')
+    Message = apps.get_model('telegram_app', 'Message')
+
+    message = Message.objects.filter(pk=OuterRef('message_id'))
+    Shipment.objects.update(
+        channel_id=Subquery(message.values('channel_id')[:1]),
+        date=Subquery(message.values('date')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0017_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='channel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='shipments', to='telegram_app.channel'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['channel', '-date', '-id'], name='shipment_channel_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['-date', '-id'], name='shipment_date_id_desc'),
+        ),
+        migrations.RunPython(backfill_channel_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0018_shipment_channel_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['contact', '-date', '-id'], name='shipment_contact_date_id'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:56
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def backfill_change_seq(apps, schema_editor):
+    # Mavjud yuklar id tartibida; hisoblagich eng katta id dan davom etadi
+    Shipment = apps.get_model('telegram_app', 'Shipment')
+    ChangeSequence = apps.get_model('telegram_app', 'ChangeSequence')
+
+    Shipment.objects.update(change_seq=F('id'))
+    last = Shipment.objects.aggregate(last=Max('id'))['last'] or 0
+    ChangeSequence.objects.update_or_create(name='shipments', defaults={'value': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0019_shipment_contact_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_change_seq, migrations.RunPython.noop),
+    ]
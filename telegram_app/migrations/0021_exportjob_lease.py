@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_app', '0020_shipment_change_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='lease',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+import time
+
+from django.db import models, transaction
+from django.utils import timezone
 
 
 class TelegramSession(models.Model):
@@ -19,6 +22,28 @@ class Channel(models.Model):
         return f"{self.title} ({self.channel_id})"
 
 
+# Message.text ni siqish uchun o'qitilgan zstd lug'atlari (compression.py)
+class CompressionDictionary(models.Model):
+    data = models.BinaryField()
+    sample_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Oxirgi `compress_messages` ishga tushganidagi holat
+    message_count = models.IntegerField(default=0)
+    raw_bytes = models.BigIntegerField(default=0)
+    compressed_bytes = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Dictionary {self.id} ({len(self.data)} bytes)"
+
+    @property
+    def saved_bytes(self):
+        return self.raw_bytes - self.compressed_bytes
+
+    @property
+    def ratio(self):
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0
+
+
 class Message(models.Model):
     channel = models.ForeignKey('Channel', on_delete=models.CASCADE)
     message_id = models.BigIntegerField()
@@ -27,8 +52,68 @@ class Message(models.Model):
     text = models.TextField(null=True, blank=True)
     date = models.DateTimeField(null=True, blank=True)
 
+    # Yaqin-dublikatlar uchun SimHash (dedup.py) va uning 16-bitlik bandlari
+    simhash = models.BigIntegerField(null=True, blank=True)
+    simhash_band0 = models.IntegerField(null=True, blank=True, db_index=True)
+    simhash_band1 = models.IntegerField(null=True, blank=True, db_index=True)
+    simhash_band2 = models.IntegerField(null=True, blank=True, db_index=True)
+    simhash_band3 = models.IntegerField(null=True, blank=True, db_index=True)
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='near_duplicates'
+    )
+
+    # Siqilgan matn: bu holatda `text` ustuni NULL, o'qishda avtomatik ochiladi
+    text_zstd = models.BinaryField(null=True, blank=True)
+    text_dictionary = models.ForeignKey(
+        'CompressionDictionary', on_delete=models.PROTECT, null=True, blank=True
+    )
+    text_length = models.PositiveIntegerField(null=True, blank=True)
+
     class Meta:
         unique_together = ('channel', 'message_id')
+        indexes = [
+            # Keyset pagination (pagination.py) uchun (date, id) indeksi
+            models.Index(fields=['-date', '-id'], name='message_date_id_desc'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.decompress_seconds = 0.0
+        loaded = instance.__dict__
+        if 'text' in loaded and loaded['text'] is None and loaded.get('text_zstd') is not None:
+            from .compression import decompress_text
+
+            started = time.perf_counter()
+            instance.text = decompress_text(instance.text_zstd, instance.text_dictionary_id)
+            instance.decompress_seconds = time.perf_counter() - started
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .compression import active_dictionary_id, compress_text, should_compress
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' not in update_fields:
+            return super().save(*args, **kwargs)
+
+        if self.text and should_compress(self.date):
+            dictionary_id = active_dictionary_id()
+            self.text_zstd = compress_text(self.text, dictionary_id)
+            self.text_dictionary_id = dictionary_id
+            self.text_length = len(self.text.encode('utf-8'))
+            raw_text, self.text = self.text, None
+        else:
+            raw_text = self.text
+            self.text_zstd = None
+            self.text_dictionary_id = None
+            self.text_length = None
+
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'text_zstd', 'text_dictionary', 'text_length'}
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self.text = raw_text
 
 
 # Xom xabarlarni alohida jadvalda saqlash (oldingi loyiha uchun)
@@ -46,6 +131,12 @@ class TelegramMessage(models.Model):
         return f"{self.channel_id}-{self.message_id}"
 
 
+class ContactKind(models.TextChoices):
+    PHONE = 'phone', 'Telefon'
+    USERNAME = 'username', 'Telegram @username'
+    OTHER = 'other', 'Boshqa'
+
+
 # Yuk eʼlonlaridan parsed maʼlumotlar
 class Shipment(models.Model):
     message = models.ForeignKey('Message', on_delete=models.CASCADE, related_name='shipment')
@@ -55,8 +146,244 @@ class Shipment(models.Model):
     truck_type = models.CharField(max_length=100, null=True, blank=True)
     payment_type = models.CharField(max_length=100, null=True, blank=True)
     phone = models.CharField(max_length=64, null=True, blank=True)
+    contact = models.ForeignKey(
+        'Contact', on_delete=models.SET_NULL, null=True, blank=True, related_name='shipments'
+    )
+    # Ingest paytida aniqlanadi (contacts.classify_contact)
+    contact_kind = models.CharField(
+        max_length=16, choices=ContactKind.choices, null=True, blank=True, db_index=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # O'zgarishlar lentasi (feed.py): har bir yozishda feed.next_change_seq() dan,
+    # raqamlar commit tartibida o'sadi - kursor shu ustun bo'yicha
+    change_seq = models.PositiveBigIntegerField(default=0, db_index=True)
+    # Qidiruv uchun normallashtirilgan shahar nomlari (search.city_key), save() da to'ldiriladi
+    origin_key = models.CharField(max_length=255, null=True, blank=True)
+    destination_key = models.CharField(max_length=255, null=True, blank=True)
+    # Xabardan nusxa (save() da): ro'yxatlar JOIN siz (channel, date, id) indeksi bo'yicha varaqlanadi
+    channel = models.ForeignKey('Channel', on_delete=models.CASCADE, null=True, blank=True, related_name='shipments')
+    date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='shipment_updated_id'),
+            # Keyset pagination (pagination.py): kanal bo'yicha va umumiy ro'yxatlar
+            models.Index(fields=['channel', '-date', '-id'], name='shipment_channel_date_id'),
+            models.Index(fields=['-date', '-id'], name='shipment_date_id_desc'),
+            # Kontakt sahifasi: oxirgi yuklar (contact, date, id) bo'yicha LIMIT bilan
+            models.Index(fields=['contact', '-date', '-id'], name='shipment_contact_date_id'),
+            # Inline qidiruv (search.py): shahar / yo'nalish bo'yicha eng yangilari LIMIT bilan
+            models.Index(fields=['origin_key', 'destination_key', '-id'], name='shipment_route_recent'),
+            models.Index(fields=['origin_key', '-id'], name='shipment_origin_recent'),
+            models.Index(fields=['destination_key', '-id'], name='shipment_dest_recent'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .feed import next_change_seq
+        from .search import city_key
+
+        self.origin_key = city_key(self.origin)
+        self.destination_key = city_key(self.destination)
+        if self.channel_id is None and self.message_id is not None:
+            self.channel_id = self.message.channel_id
+            self.date = self.message.date
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'change_seq'}
+            if {'origin', 'destination'} & update_fields:
+                update_fields |= {'origin_key', 'destination_key'}
+            kwargs['update_fields'] = update_fields
+        # Raqam va yozuv bitta tranzaksiyada: hisoblagich qatori commit gacha qulflangan
+        with transaction.atomic():
+            self.change_seq = next_change_seq()
+            super().save(*args, **kwargs)
 
     def __str__(self):
         if self.origin or self.destination:
             return f"{self.origin} → {self.destination} ({self.phone})"
         return f"Shipment for message {self.message.message_id}"
+
+
+# Telefon bo'yicha kontaktlar katalogi: ingest paytida yangilanadi (contacts.py)
+class Contact(models.Model):
+    phone = models.CharField(max_length=64, unique=True)  # normallashtirilgan
+    display_phone = models.CharField(max_length=64, null=True, blank=True)
+    kind = models.CharField(max_length=16, choices=ContactKind.choices, default=ContactKind.PHONE)
+    first_seen = models.DateTimeField(null=True, blank=True)
+    last_seen = models.DateTimeField(null=True, blank=True, db_index=True)
+    total_loads = models.PositiveIntegerField(default=0)
+    channel_count = models.PositiveIntegerField(default=0)
+    route_counts = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return self.display_phone or self.phone
+
+    def top_routes(self, limit=5):
+        return sorted(self.route_counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class ContactChannelStat(models.Model):
+    contact = models.ForeignKey('Contact', on_delete=models.CASCADE, related_name='channel_stats')
+    channel = models.ForeignKey('Channel', on_delete=models.CASCADE, related_name='contact_stats')
+    kind = models.CharField(max_length=16, choices=ContactKind.choices, default=ContactKind.PHONE)
+    total = models.PositiveIntegerField(default=0)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('contact', 'channel')
+        indexes = [
+            # Kanal bo'yicha top-N kontaktlar: indeks bo'ylab LIMIT bilan o'qiladi
+            models.Index(fields=['channel', '-total'], name='contact_stat_channel_top'),
+            models.Index(fields=['channel', 'kind', '-total'], name='contact_stat_channel_kind_top'),
+        ]
+
+
+# Fon export vazifalari (jobs.py): bazadagi navbat, tashqi broker kerak emas
+class ExportJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Navbatda'
+        RUNNING = 'running', 'Bajarilmoqda'
+        DONE = 'done', 'Tayyor'
+        FAILED = 'failed', 'Xatolik'
+
+    class Deliver(models.TextChoices):
+        DOWNLOAD = 'download', 'Yuklab olish'
+        BOT = 'bot', 'Telegram bot'
+
+    kind = models.CharField(max_length=32, default='shipments')
+    fmt = models.CharField(max_length=16, default='xlsx')
+    params = models.JSONField(default=dict, blank=True)
+    deliver = models.CharField(max_length=16, choices=Deliver.choices, default=Deliver.DOWNLOAD)
+    # Bir xil (tugamagan) vazifalar bitta bo'lib bajariladi
+    dedup_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING, db_index=True)
+    # Vazifani olgan workerning tokeni: navbatga qaytarilgandan keyin eski worker natija yozolmaydi
+    lease = models.CharField(max_length=32, blank=True, default='')
+
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=512, blank=True, default='')
+    filename = models.CharField(max_length=255, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"ExportJob {self.id} ({self.kind}, {self.fmt}, {self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.Status.DONE:
+            return 100
+        return min(99, self.processed_rows * 100 // self.total_rows) if self.total_rows else 0
+
+    @property
+    def eta_seconds(self):
+        """Shu paytgacha tezlik bo'yicha qolgan vaqt (soniya)."""
+        if self.status != self.Status.RUNNING or not self.started_at or not self.processed_rows:
+            return None
+        from django.utils import timezone
+
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining = max(0, self.total_rows - self.processed_rows)
+        return round(elapsed / self.processed_rows * remaining)
+
+
+# Bot jarayoni (manage.py runbot) bajaradigan vazifalar navbati (bot_queue.py)
+class BotTask(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Navbatda'
+        RUNNING = 'running', 'Bajarilmoqda'
+        DONE = 'done', 'Bajarildi'
+        FAILED = 'failed', 'Xatolik'
+
+    kind = models.CharField(max_length=32)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='bottask_status_id'),
+        ]
+
+    def __str__(self):
+        return f"BotTask {self.id} ({self.kind}, {self.status})"
+
+
+# Yo'nalish obunalari (subscriptions.py): mos yangi yuk chiqqanda botdan xabar
+class RouteSubscription(models.Model):
+    chat_id = models.BigIntegerField(db_index=True)
+    # None - istalgan (search.city_key / subscriptions.truck_category qiymatlari)
+    origin_key = models.CharField(max_length=255, null=True, blank=True)
+    destination_key = models.CharField(max_length=255, null=True, blank=True)
+    truck_category = models.CharField(max_length=32, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Indeks jarayonlarda shu ustun bo'yicha bosqichma-bosqich yangilanadi
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = ('chat_id', 'origin_key', 'destination_key', 'truck_category')
+
+    def __str__(self):
+        return f"{self.origin_key or '*'} → {self.destination_key or '*'} ({self.truck_category or '*'})"
+
+
+# Bot xabarlari navbati (outbox.py): tezlik limitlari bilan yuboriladi, qayta ishga tushishda yo'qolmaydi
+class OutboundMessage(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Navbatda'
+        SENT = 'sent', 'Yuborildi'
+        FAILED = 'failed', 'Xatolik'
+
+    chat_id = models.BigIntegerField()
+    text = models.TextField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Retry-After yoki qayta urinish vaqti kelguncha olinmaydi
+    available_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbound_due'),
+            models.Index(fields=['status', 'sent_at'], name='outbound_sent'),
+        ]
+
+    def __str__(self):
+        return f"OutboundMessage {self.id} → {self.chat_id} ({self.status})"
+
+
+# Kesh kalitlari versiyasi (caching.py): barcha jarayonlar uchun bitta hisoblagich
+class CacheVersion(models.Model):
+    namespace = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.namespace}: {self.version}"
+
+
+# O'zgarishlar lentasi hisoblagichi (feed.next_change_seq)
+class ChangeSequence(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
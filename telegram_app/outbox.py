@@ -0,0 +1,284 @@
+"""
+Bot xabarlari navbati (outbox): Telegram tezlik limitlariga mos yuborish.
+
+- Xabarlar bazaga yoziladi (`OutboundMessage`), bot jarayoni qayta ishga
+  tushsa ham navbat yo'qolmaydi. Yuborilgani `sent_at` bilan belgilanadi;
+  yuborish vaqtida jarayon o'lsa xabar qayta yuborilishi mumkin.
+- Token bucket: har bir chat (shaxsiy ~1/s, guruh 20/daqiqa) va umumiy
+  (~25/s) limit. Limiti tugagan chat kutmaydi - xabarlari yig'ilib, keyingi
+  safar bitta jamlangan (digest) xabar bo'lib ketadi (4096 belgigacha).
+- 429 (RetryAfter) da chat shu muddatga to'xtatiladi, xabarlar urinish
+  hisoblanmasdan keyinga suriladi. Tarmoq xatolarida MAX_ATTEMPTS gacha
+  qayta urinish, bot bloklangan / chat topilmasa - xatolik.
+- `stats()` - navbat chuqurligi va yuborish kechikishi (api/outbox/stats/).
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from .models import OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+# Telegram limitlari (xabar/soniya) va bir zumda ruxsat etilgan to'plam
+CHAT_RATE, CHAT_BURST = 1.0, 3
+GROUP_RATE, GROUP_BURST = 20 / 60, 3
+GLOBAL_RATE, GLOBAL_BURST = 25.0, 30
+
+MAX_TEXT = 4096
+DIGEST_SEPARATOR = '\n\n' + '─' * 12 + '\n\n'
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=5)
+# Bir o'qishda olinadigan xabarlar soni
+DUE_LIMIT = 500
+OUTBOX_POLL = 1.0
+PRUNE_AFTER = timedelta(days=7)
+PRUNE_INTERVAL = 3600
+STATS_WINDOW = timedelta(hours=1)
+STATS_SAMPLE = 1000
+
+Status = OutboundMessage.Status
+
+
+# ==================== TEZLIK LIMITI ====================
+
+class TokenBucket:
+    """`rate` token/soniya, ko'pi bilan `capacity` token yig'iladi (bitta event loop ichida)."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def wait_time(self):
+        """Keyingi token uchun kutish, soniya (0 - hozir bor)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def take(self):
+        while (delay := self.wait_time()) > 0:
+            await asyncio.sleep(delay)
+        self.tokens -= 1
+
+
+class RateLimiter:
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chats = {}
+        self._paused = {}
+
+    def _bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Manfiy id - guruh yoki kanal
+            rate, burst = (GROUP_RATE, GROUP_BURST) if chat_id < 0 else (CHAT_RATE, CHAT_BURST)
+            bucket = self._chats[chat_id] = TokenBucket(rate, burst)
+        return bucket
+
+    def pause(self, chat_id, seconds):
+        until = time.monotonic() + seconds
+        self._paused[chat_id] = max(until, self._paused.get(chat_id, 0))
+
+    def paused_for(self, chat_id):
+        return max(0.0, self._paused.get(chat_id, 0) - time.monotonic())
+
+    def ready(self, chat_id):
+        """Chatga hozir kutmasdan yuborish mumkinmi (umumiy limit hisobga olinmaydi)."""
+        return not self.paused_for(chat_id) and not self._bucket(chat_id).wait_time()
+
+    async def acquire(self, chat_id):
+        while (delay := self.paused_for(chat_id)) > 0:
+            await asyncio.sleep(delay)
+        await self._bucket(chat_id).take()
+        await self.global_bucket.take()
+
+
+limiter = RateLimiter()
+
+
+def retry_after_seconds(exc):
+    # PTB versiyasiga qarab int yoki timedelta
+    value = exc.retry_after
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+
+async def send_with_limits(chat_id, send, *, retries=1):
+    """Navbatdan tashqari yuboriladigan so'rovlar (fayllar) uchun: limit + RetryAfter da qayta urinish."""
+    for attempt in range(retries + 1):
+        await limiter.acquire(chat_id)
+        try:
+            return await send()
+        except RetryAfter as exc:
+            limiter.pause(chat_id, retry_after_seconds(exc))
+            if attempt == retries:
+                raise
+
+
+# ==================== NAVBAT (BAZA) ====================
+
+def enqueue(chat_id, text):
+    return OutboundMessage.objects.create(chat_id=chat_id, text=text)
+
+
+def enqueue_many(items):
+    """items: (chat_id, matn) juftliklari - bitta INSERT."""
+    return OutboundMessage.objects.bulk_create(
+        [OutboundMessage(chat_id=chat_id, text=text) for chat_id, text in items]
+    )
+
+
+def due_by_chat(limit=DUE_LIMIT):
+    """Yuborish vaqti kelgan xabarlar, chat bo'yicha guruhlangan: {chat_id: [(id, matn), ...]}"""
+    close_old_connections()
+    rows = (
+        OutboundMessage.objects
+        .filter(status=Status.PENDING, available_at__lte=timezone.now())
+        .order_by('id')
+        .values_list('id', 'chat_id', 'text')[:limit]
+    )
+    grouped = defaultdict(list)
+    for pk, chat_id, text in rows:
+        grouped[chat_id].append((pk, text))
+    return grouped
+
+
+def coalesce(messages):
+    """[(id, matn), ...] -> [(idlar, matn), ...]: ketma-ket xabarlar MAX_TEXT gacha bittaga."""
+    chunks = []
+    ids, parts, size = [], [], 0
+    for pk, text in messages:
+        if len(text) > MAX_TEXT:
+            text = text[:MAX_TEXT - 1] + '…'
+        if parts and size + len(DIGEST_SEPARATOR) + len(text) > MAX_TEXT:
+            chunks.append((ids, DIGEST_SEPARATOR.join(parts)))
+            ids, parts, size = [], [], 0
+        size += len(text) + (len(DIGEST_SEPARATOR) if parts else 0)
+        ids.append(pk)
+        parts.append(text)
+    if parts:
+        chunks.append((ids, DIGEST_SEPARATOR.join(parts)))
+    return chunks
+
+
+def mark_sent(ids):
+    OutboundMessage.objects.filter(id__in=ids).update(status=Status.SENT, sent_at=timezone.now(), error='')
+
+
+def defer(ids, seconds):
+    """RetryAfter: urinish hisoblanmaydi."""
+    OutboundMessage.objects.filter(id__in=ids, status=Status.PENDING).update(
+        available_at=timezone.now() + timedelta(seconds=seconds)
+    )
+
+
+def retry(ids, error):
+    rows = OutboundMessage.objects.filter(id__in=ids)
+    rows.update(attempts=F('attempts') + 1, error=str(error))
+    rows.filter(attempts__gte=MAX_ATTEMPTS).update(status=Status.FAILED)
+    attempts = rows.filter(status=Status.PENDING).aggregate(attempts=Max('attempts'))['attempts']
+    if attempts:
+        rows.filter(status=Status.PENDING).update(available_at=timezone.now() + RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def fail(ids, error):
+    OutboundMessage.objects.filter(id__in=ids, status=Status.PENDING).update(status=Status.FAILED, error=str(error))
+
+
+def prune(older_than=PRUNE_AFTER):
+    return OutboundMessage.objects.filter(status=Status.SENT, sent_at__lt=timezone.now() - older_than).delete()[0]
+
+
+def stats():
+    """Navbat chuqurligi va STATS_WINDOW dagi yuborish kechikishi (navbatga qo'yilgandan yuborilguncha)."""
+    now = timezone.now()
+    queue = OutboundMessage.objects.filter(status=Status.PENDING).aggregate(
+        depth=Count('id'),
+        deferred=Count('id', filter=Q(available_at__gt=now)),
+        oldest=Min('created_at'),
+    )
+    latencies = sorted(
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in OutboundMessage.objects
+        .filter(status=Status.SENT, sent_at__gte=now - STATS_WINDOW)
+        .order_by('-sent_at')
+        .values_list('created_at', 'sent_at')[:STATS_SAMPLE]
+    )
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3) if latencies else None
+
+    return {
+        'depth': queue['depth'],
+        'deferred': queue['deferred'],
+        'oldest_pending_seconds': round((now - queue['oldest']).total_seconds(), 3) if queue['oldest'] else None,
+        'sent_last_hour': len(latencies),
+        'latency_avg': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'latency_p50': percentile(0.5),
+        'latency_p95': percentile(0.95),
+    }
+
+
+# ==================== YUBORISH ====================
+
+async def deliver(bot, chat_id, messages):
+    """Bitta chatning navbatdagi xabarlari: jamlab, limit ruxsat bergancha yuborish."""
+    from asgiref.sync import sync_to_async
+
+    sent = 0
+    for ids, text in coalesce(messages):
+        if not limiter.ready(chat_id):
+            # Qolgani navbatda qoladi va keyingi safar boshqa xabarlar bilan jamlanadi
+            break
+        await limiter.acquire(chat_id)
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+        except RetryAfter as exc:
+            seconds = retry_after_seconds(exc)
+            limiter.pause(chat_id, seconds)
+            await sync_to_async(defer)([pk for pk, _ in messages], seconds)
+            break
+        except Forbidden as exc:
+            # Bot bloklangan yoki chatdan chiqarilgan - qolgan xabarlar ham yetib bormaydi
+            await sync_to_async(fail)([pk for pk, _ in messages], exc)
+            break
+        except BadRequest as exc:
+            await sync_to_async(fail)(ids, exc)
+        except Exception as exc:
+            logger.warning("Xabar yuborilmadi (chat %s): %s", chat_id, exc)
+            await sync_to_async(retry)(ids, exc)
+            break
+        else:
+            await sync_to_async(mark_sent)(ids)
+            sent += len(ids)
+    return sent
+
+
+async def outbox_loop(application, *, poll=OUTBOX_POLL):
+    """manage.py runbot: navbatdagi xabarlarni limitlar bo'yicha yuborish"""
+    from asgiref.sync import sync_to_async
+
+    pruned_at = 0.0
+    while True:
+        if time.monotonic() - pruned_at > PRUNE_INTERVAL:
+            await sync_to_async(prune)()
+            pruned_at = time.monotonic()
+
+        due = await sync_to_async(due_by_chat)()
+        ready = [chat_id for chat_id in due if limiter.ready(chat_id)]
+        for chat_id in ready:
+            try:
+                await deliver(application.bot, chat_id, due[chat_id])
+            except Exception:
+                logger.exception("Outbox: chat %s", chat_id)
+        if not ready:
+            await asyncio.sleep(poll)
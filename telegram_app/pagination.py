@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination: (date, id) bo'yicha, OFFSET va COUNT(*) siz.
+
+Ro'yxatlar eng yangisidan boshlab (date DESC, id DESC) tartiblanadi.
+Kursor oxirgi ko'rsatilgan qatorning (date, id) qiymati, shuning uchun
+chuqur sahifalar ham indeks bo'ylab bir xil tezlikda ochiladi. Sanasiz
+qatorlar ro'yxatga kirmaydi: NULL tartibi bazalarda har xil (PostgreSQL da
+DESC indeks NULLS FIRST), filtrsiz esa (-date, -id) indeksi tartibni to'g'ridan
+to'g'ri beradi.
+Jami soni taxminiy: PostgreSQL da EXPLAIN bahosi, boshqa bazalarda
+APPROX_COUNT_CAP gacha cheklangan COUNT.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+
+PER_PAGE = 20
+APPROX_COUNT_CAP = 10000
+
+
+def encode_cursor(date, pk) -> str:
+    raw = json.dumps([date.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_raw, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        date = parse_datetime(date_raw)
+        if date is None:
+            return None
+        return date, int(pk)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def approx_count(queryset):
+    """Taxminiy jami soni. Qaytaradi: (son, aniqmi)"""
+    if connection.vendor == 'postgresql':
+        try:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            return int(plan[0]['Plan']['Plan Rows']), False
+        except Exception:
+            pass
+    count = queryset.order_by()[:APPROX_COUNT_CAP + 1].count()
+    if count > APPROX_COUNT_CAP:
+        return APPROX_COUNT_CAP, False
+    return count, True
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+    approx_total: int = 0
+    total_is_exact: bool = True
+    params: dict = field(default_factory=dict)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def _url(self, key, cursor):
+        query = QueryDict(mutable=True)
+        for name, values in self.params.items():
+            if name not in ('after', 'before', 'page'):
+                query.setlist(name, values)
+        query[key] = cursor
+        return '?' + query.urlencode()
+
+    @property
+    def next_url(self):
+        return self._url('after', self.next_cursor) if self.next_cursor else None
+
+    @property
+    def prev_url(self):
+        return self._url('before', self.prev_cursor) if self.prev_cursor else None
+
+
+def _after_q(date_field, date, pk):
+    """Tartib bo'yicha kursordan keyingi qatorlar (date DESC, id DESC)."""
+    # Tashqi `<=` indeksda diapazon chegarasi bo'ladi, ichki OR esa aniq kursor
+    return Q(**{f'{date_field}__lte': date}) & (
+        Q(**{f'{date_field}__lt': date}) | Q(**{date_field: date, 'pk__lt': pk})
+    )
+
+
+def _before_q(date_field, date, pk):
+    return Q(**{f'{date_field}__gte': date}) & (
+        Q(**{f'{date_field}__gt': date}) | Q(**{date_field: date, 'pk__gt': pk})
+    )
+
+
+def _key(obj, date_field):
+    value = obj
+    for part in date_field.split('__'):
+        value = getattr(value, part) if value is not None else None
+    return value, obj.pk
+
+
+def keyset_paginate(request, queryset, *, date_field='date', per_page=PER_PAGE, with_total=True):
+    """`after`/`before` GET parametrlari bo'yicha bitta sahifa."""
+    after = decode_cursor(request.GET.get('after'))
+    before = None if after else decode_cursor(request.GET.get('before'))
+
+    queryset = queryset.filter(**{f'{date_field}__isnull': False})
+    desc = (f'-{date_field}', '-pk')
+    asc = (date_field, 'pk')
+
+    if before:
+        rows = list(queryset.filter(_before_q(date_field, *before)).order_by(*asc)[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_prev, has_next = has_more, True
+    else:
+        qs = queryset.filter(_after_q(date_field, *after)) if after else queryset
+        rows = list(qs.order_by(*desc)[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    page = KeysetPage(object_list=rows, params=dict(request.GET.lists()))
+    if rows and has_next:
+        page.next_cursor = encode_cursor(*_key(rows[-1], date_field))
+    if rows and has_prev:
+        page.prev_cursor = encode_cursor(*_key(rows[0], date_field))
+    if with_total:
+        page.approx_total, page.total_is_exact = approx_count(queryset)
+    return page
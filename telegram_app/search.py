@@ -0,0 +1,177 @@
+"""
+Yuklarni tezkor qidirish (bot inline rejimi uchun).
+
+Shahar nomlari saqlashda normallashtirilgan kalitga aylantiriladi
+(Shipment.origin_key / destination_key): registr, apostrof va ortiqcha bo'sh
+joy farqi yo'qoladi. Qidiruv faqat indeks bo'ylab, LIMIT bilan o'qiydi:
+
+- "Toshkent Moskva", "Toshkent - Moskva" - (origin_key, destination_key, -id)
+- "Tosh" - prefiks keshlangan shaharlar lug'atidan aniq kalitlarga aylanadi,
+  har biri (origin_key, -id) va (destination_key, -id) bo'yicha. Lug'atni
+  runbot fon vazifasi quradi, ingest yangi shaharlarni qo'shadi - qidiruv
+  uni faqat o'qiydi (GROUP BY so'rov ichida bajarilmaydi)
+- "90 123", "+7 912...", "@user" - Contact.phone prefiksi: raqamlar yozilganicha
+  va (998 bilan boshlanmasa) 998 qo'shilgan holda
+
+Natijalar yangiligi bo'yicha (id kamayishi - ingest tartibi) saralanadi va
+so'rov satri bo'yicha qisqa muddat keshlanadi.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .caching import get_or_compute, make_key, record
+
+SEARCH_LIMIT = 20
+SEARCH_CACHE_TTL = 30
+CITY_INDEX_KEY = 'search:city_index'
+# runbot lug'atni shu oraliqda to'liq qayta quradi (sanoqlar yangilanadi)
+CITY_INDEX_REFRESH = 24 * 60 * 60
+# Bitta prefiks nechta shaharga yoyiladi
+CITY_CANDIDATES = 3
+
+RESULT_FIELDS = (
+    'id', 'origin', 'destination', 'cargo_type', 'truck_type', 'payment_type', 'phone',
+    'message__date', 'message__channel__title',
+)
+
+_APOSTROPHES = str.maketrans('', '', "'`ʻʼ‘’")
+_ROUTE_SEPARATOR = re.compile(r'\s*(?:→|->|—|–|>|\s-\s|/)\s*')
+_PHONE_QUERY = re.compile(r'\+?[\d\s()-]{5,}')
+
+
+def city_key(name):
+    """"Farg'ona ", "FARGʻONA" -> "fargona" """
+    if not name:
+        return None
+    key = ' '.join(name.translate(_APOSTROPHES).casefold().split())
+    return key[:255] or None
+
+
+def parse_query(text):
+    """Qaytaradi: ('phone', prefikslar) | ('route', (origin, destination)) | ('city', nom) | (None, None)"""
+    text = (text or '').strip()
+    if not text:
+        return None, None
+    if text.startswith('@'):
+        return 'phone', (text.lower(),)
+    if _PHONE_QUERY.fullmatch(text):
+        digits = re.sub(r'\D', '', text)
+        # Xorijiy raqam yozilganicha, mahalliy qisqa yozuv 998 bilan topiladi
+        return 'phone', (digits,) if digits.startswith('998') else (digits, '998' + digits)
+
+    parts = [part for part in _ROUTE_SEPARATOR.split(text) if part.strip()]
+    if len(parts) == 1:
+        parts = parts[0].split(maxsplit=1)
+    if len(parts) >= 2:
+        return 'route', (city_key(parts[0]), city_key(' '.join(parts[1:])))
+    return 'city', city_key(parts[0])
+
+
+# ==================== SHAHARLAR LUG'ATI ====================
+
+def _compute_city_index():
+    from .models import Shipment
+
+    counts = Counter()
+    for field in ('origin_key', 'destination_key'):
+        counts.update(dict(
+            Shipment.objects
+            .exclude(**{f'{field}__isnull': True})
+            .order_by()
+            .values_list(field)
+            .annotate(total=Count('id'))
+        ))
+    keys = sorted(counts)
+    return {'keys': keys, 'totals': [counts[key] for key in keys]}
+
+
+def rebuild_city_index():
+    """Lug'atni to'liq qayta qurish (runbot fon vazifasi). Qaytaradi: shaharlar soni."""
+    index = _compute_city_index()
+    cache.set(CITY_INDEX_KEY, index, None)
+    return len(index['keys'])
+
+
+def add_to_city_index(shipments):
+    """Ingest: lug'atda yo'q shahar kalitlarini qo'shish (sanoqlar qayta qurishda yangilanadi)."""
+    index = cache.get(CITY_INDEX_KEY)
+    if index is None:
+        # Hali qurilmagan - runbot quradi
+        return
+    keys, totals = index['keys'], index['totals']
+    added = False
+    for shipment in shipments:
+        for key in (shipment.origin_key, shipment.destination_key):
+            position = bisect_left(keys, key) if key else None
+            if position is None or (position < len(keys) and keys[position] == key):
+                continue
+            keys.insert(position, key)
+            totals.insert(position, 1)
+            added = True
+    if added:
+        cache.set(CITY_INDEX_KEY, index, None)
+
+
+def resolve_city(prefix, limit=CITY_CANDIDATES):
+    """Prefiksga mos eng ko'p uchraydigan shahar kalitlari (to'liq mos kelgani birinchi)."""
+    if not prefix:
+        return []
+    index = cache.get(CITY_INDEX_KEY)
+    record('city_index', index is not None)
+    keys, totals = (index['keys'], index['totals']) if index is not None else ([], [])
+
+    matches = []
+    position = bisect_left(keys, prefix)
+    while position < len(keys) and keys[position].startswith(prefix):
+        matches.append((keys[position] != prefix, -totals[position], keys[position]))
+        position += 1
+    candidates = [key for _, _, key in sorted(matches)[:limit]]
+    # Lug'at hali qurilmagan yoki shahar unga tushmagan bo'lsa ham aniq nom bilan topiladi
+    if prefix not in candidates:
+        candidates.append(prefix)
+    return candidates
+
+
+# ==================== QIDIRUV ====================
+
+def _latest(shipments, limit):
+    return list(shipments.order_by('-id').values(*RESULT_FIELDS)[:limit])
+
+
+def _search(kind, terms, limit):
+    from .models import Contact, Shipment
+
+    batches = []
+    if kind == 'phone':
+        prefixes = Q()
+        for prefix in terms:
+            prefixes |= Q(phone__startswith=prefix)
+        contact_ids = Contact.objects.filter(prefixes).order_by('-last_seen').values_list('id', flat=True)[:5]
+        batches = [_latest(Shipment.objects.filter(contact_id=pk), limit) for pk in contact_ids]
+    elif kind == 'route':
+        origin, destination = terms
+        batches = [
+            _latest(Shipment.objects.filter(origin_key=o, destination_key=d), limit)
+            for o in resolve_city(origin)
+            for d in resolve_city(destination)
+        ]
+    elif kind == 'city':
+        for key in resolve_city(terms):
+            batches.append(_latest(Shipment.objects.filter(origin_key=key), limit))
+            batches.append(_latest(Shipment.objects.filter(destination_key=key), limit))
+
+    rows = {row['id']: row for batch in batches for row in batch}
+    return [rows[pk] for pk in sorted(rows, reverse=True)[:limit]]
+
+
+def search_shipments(text, limit=SEARCH_LIMIT):
+    """Keshlangan qidiruv. Qaytaradi: (qatorlar, hit)"""
+    kind, terms = parse_query(text)
+    if kind is None:
+        return [], False
+    key = make_key('inline_search', kind, terms, limit)
+    return get_or_compute('inline_search', key, lambda: _search(kind, terms, limit), SEARCH_CACHE_TTL)
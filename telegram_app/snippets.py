@@ -0,0 +1,76 @@
+"""
+Qidiruv natijalari uchun qisqa snippetlar.
+
+Kalit so'zlar bitta alternation regexga bir marta kompilyatsiya qilinadi
+(so'rov bo'yicha keshlanadi), matn bitta o'tishda skanerlanadi va faqat
+topilgan joylar atrofidagi qisqa, HTML-escape qilingan bo'laklar
+<mark> bilan qaytariladi.
+"""
+import re
+from functools import lru_cache
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+CONTEXT_CHARS = 60
+MAX_SNIPPETS = 3
+SEPARATOR = ' … '
+MARK_OPEN = '<mark style="background-color: yellow;">'
+MARK_CLOSE = '</mark>'
+
+
+@lru_cache(maxsize=256)
+def _compile(keywords: tuple):
+    # Uzunroq so'zlar oldin: "toshkent" "tosh" dan ustun bo'lsin
+    alternation = '|'.join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    return re.compile(alternation, re.IGNORECASE)
+
+
+def get_matcher(keywords):
+    """Kalit so'zlar to'plami uchun kompilyatsiya qilingan regex (yoki None)."""
+    normalized = tuple(sorted({kw.strip().lower() for kw in keywords if kw and kw.strip()}))
+    if not normalized:
+        return None
+    return _compile(normalized)
+
+
+def _windows(spans, length, context):
+    """Topilgan joylar atrofidagi oynalarni birlashtirish."""
+    windows = []
+    for start, end in spans:
+        w_start, w_end = max(0, start - context), min(length, end + context)
+        if windows and w_start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], w_end)
+            windows[-1][2].append((start, end))
+        else:
+            windows.append([w_start, w_end, [(start, end)]])
+    return windows
+
+
+def build_snippet(text, matcher, *, context=CONTEXT_CHARS, max_snippets=MAX_SNIPPETS):
+    """Escape qilingan, <mark> bilan belgilangan qisqa snippet (SafeString)."""
+    if not text:
+        return ''
+    if matcher is None:
+        return escape(text[:context * 2])
+
+    spans = [m.span() for m in matcher.finditer(text)]
+    if not spans:
+        head = text[:context * 2]
+        return mark_safe(escape(head) + (SEPARATOR.strip() if len(text) > len(head) else ''))
+
+    windows = _windows(spans, len(text), context)[:max_snippets]
+    parts = []
+    for w_start, w_end, hits in windows:
+        chunk = []
+        pos = w_start
+        for start, end in hits:
+            chunk.append(escape(text[pos:start]))
+            chunk.append(MARK_OPEN + escape(text[start:end]) + MARK_CLOSE)
+            pos = end
+        chunk.append(escape(text[pos:w_end]))
+        parts.append(''.join(chunk).replace('\n', ' '))
+
+    prefix = SEPARATOR.lstrip() if windows[0][0] > 0 else ''
+    suffix = SEPARATOR.rstrip() if windows[-1][1] < len(text) else ''
+    return mark_safe(prefix + SEPARATOR.join(parts) + suffix)
@@ -0,0 +1,213 @@
+"""
+Kanal statistikasi bitta so'rovda.
+
+channel_stats_view uchun barcha o'lchovlar (yo'nalish, yuk, transport,
+to'lov, jami soni va sana oralig'i) bir martada hisoblanadi:
+PostgreSQL da GROUPING SETS bilan, boshqa bazalarda bitta scan va
+xotirada guruhlash bilan. Natija filtr imzosi bo'yicha keshlanadi, shuning
+uchun sahifalar (route_page, cargo_page, ...) keshdagi ro'yxatni varaqlaydi.
+"""
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count, F, Q
+
+from .caching import get_or_compute, make_key
+
+STATS_CACHE_TTL = 300
+DASHBOARD_CACHE_TTL = 600
+BOT_STATS_CACHE_TTL = 60
+BOT_STATS_TOP = 5
+
+# o'lchov nomi -> guruhlanadigan ustunlar
+DIMENSIONS = {
+    'route': ('origin', 'destination'),
+    'cargo': ('cargo_type',),
+    'truck': ('truck_type',),
+    'payment': ('payment_type',),
+}
+COLUMNS = ('origin', 'destination', 'cargo_type', 'truck_type', 'payment_type')
+
+
+def channel_namespace(channel_id):
+    """Kanal statistikasi keshi; ingest yangi yuk yozganda versiyasi oshiriladi."""
+    return f"channel_stats:{channel_id}"
+
+
+def _sorted_rows(counter, fields):
+    rows = [dict(zip(fields, key), total=total) for key, total in counter.items()]
+    rows.sort(key=lambda row: row['total'], reverse=True)
+    return rows
+
+
+def _grouping_bitmask(fields):
+    # GROUPING(origin, destination, ...) da guruhlanmagan ustun biti 1 bo'ladi
+    mask = 0
+    for idx, column in enumerate(COLUMNS):
+        if column not in fields:
+            mask |= 1 << (len(COLUMNS) - 1 - idx)
+    return mask
+
+
+def _compute_postgres(shipments):
+    inner_sql, params = (
+        shipments
+        .order_by()
+        .annotate(msg_date=F('message__date'))
+        .values(*COLUMNS, 'msg_date')
+        .query.sql_with_params()
+    )
+    grouping_sets = ", ".join(f"({', '.join(fields)})" for fields in DIMENSIONS.values())
+    cols = ", ".join(COLUMNS)
+    sql = (
+        f"SELECT {cols}, GROUPING({cols}) AS g, COUNT(*), MIN(s.msg_date), MAX(s.msg_date) "
+        f"FROM ({inner_sql}) s "
+        f"GROUP BY GROUPING SETS ({grouping_sets}, ())"
+    )
+
+    masks = {_grouping_bitmask(fields): name for name, fields in DIMENSIONS.items()}
+    counters = {name: Counter() for name in DIMENSIONS}
+    result = {'total': 0, 'oldest': None, 'newest': None}
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            values, g, total, oldest, newest = row[:len(COLUMNS)], row[-4], row[-3], row[-2], row[-1]
+            name = masks.get(g)
+            if name is None:
+                # () - umumiy qator
+                result.update(total=total, oldest=oldest, newest=newest)
+                continue
+            row_values = dict(zip(COLUMNS, values))
+            counters[name][tuple(row_values[f] for f in DIMENSIONS[name])] = total
+
+    for name, fields in DIMENSIONS.items():
+        result[name] = _sorted_rows(counters[name], fields)
+    return result
+
+
+def _compute_scan(shipments, chunk_size=5000):
+    counters = {name: Counter() for name in DIMENSIONS}
+    result = {'total': 0, 'oldest': None, 'newest': None}
+    positions = {name: [COLUMNS.index(f) for f in fields] for name, fields in DIMENSIONS.items()}
+
+    rows = shipments.order_by().values_list(*COLUMNS, 'message__date')
+    for row in rows.iterator(chunk_size=chunk_size):
+        result['total'] += 1
+        date = row[-1]
+        if date is not None:
+            if result['oldest'] is None or date < result['oldest']:
+                result['oldest'] = date
+            if result['newest'] is None or date > result['newest']:
+                result['newest'] = date
+        for name, idxs in positions.items():
+            counters[name][tuple(row[i] for i in idxs)] += 1
+
+    for name, fields in DIMENSIONS.items():
+        result[name] = _sorted_rows(counters[name], fields)
+    return result
+
+
+def compute_channel_stats(shipments):
+    if connection.vendor == 'postgresql':
+        return _compute_postgres(shipments)
+    return _compute_scan(shipments)
+
+
+def get_channel_stats(channel_id, shipments, filters: dict):
+    """Filtr imzosi bo'yicha keshlangan kanal statistikasi."""
+    key = make_key(channel_namespace(channel_id), *(f"{k}={filters[k]}" for k in sorted(filters)))
+    stats, _ = get_or_compute('channel_stats', key, lambda: compute_channel_stats(shipments), STATS_CACHE_TTL)
+    return stats
+
+
+# ==================== DASHBOARD ====================
+
+def dashboard_namespace(day):
+    """Kunlik dashboard keshi; shu kunga yangi yuk yozilganda versiyasi oshiriladi."""
+    return f"dashboard:{day.isoformat()}"
+
+
+def compute_dashboard_stats(day):
+    from .models import Shipment
+
+    shipments = Shipment.objects.filter(message__date__date=day)
+
+    def top(field):
+        return list(
+            shipments
+            .values(field)
+            .annotate(total=Count('id'))
+            .order_by('-total')[:10]
+        )
+
+    return {
+        'total_today': shipments.count(),
+        'top_origins': top('origin'),
+        'top_destinations': top('destination'),
+        'top_payments': top('payment_type'),
+        'top_cargo': top('cargo_type'),
+    }
+
+
+def get_dashboard_stats(day):
+    """Kunlik dashboard agregatlari (keshlangan). Qaytaradi: (stats, hit)"""
+    key = make_key(dashboard_namespace(day))
+    return get_or_compute('dashboard', key, lambda: compute_dashboard_stats(day), DASHBOARD_CACHE_TTL)
+
+
+# ==================== BOT ====================
+
+def compute_bot_stats(today):
+    """
+    Bot "Statistika" tugmasi: bugun / 7 kun / 30 kun bitta so'rovda (shartli Count,
+    message__date indeksi bo'yicha oraliq), oxirgi 7 kunning top yo'nalishlari va kanallari.
+    """
+    from .models import Shipment
+    from .utils import resolve_date_range
+
+    def since(days):
+        # `days` kun oldingi kun boshidan ertangi kun boshigacha (mahalliy vaqt)
+        start, end, _, _ = resolve_date_range(None, today.isoformat(), default_days=days + 1)
+        return start, end
+
+    month_start, end = since(30)
+    week_start, _ = since(7)
+    today_start, _ = since(0)
+
+    month = Shipment.objects.filter(message__date__gte=month_start, message__date__lt=end)
+    totals = month.aggregate(
+        today=Count('id', filter=Q(message__date__gte=today_start)),
+        week=Count('id', filter=Q(message__date__gte=week_start)),
+        month=Count('id'),
+    )
+
+    week = month.filter(message__date__gte=week_start).order_by()
+    lanes = (
+        week
+        .exclude(origin__isnull=True)
+        .exclude(destination__isnull=True)
+        .values('origin', 'destination')
+        .annotate(total=Count('id'))
+        .order_by('-total')[:BOT_STATS_TOP]
+    )
+    channels = (
+        week
+        .values('message__channel__title')
+        .annotate(total=Count('id'))
+        .order_by('-total')[:BOT_STATS_TOP]
+    )
+    return {
+        **totals,
+        'lanes': list(lanes),
+        'channels': [
+            {'title': row['message__channel__title'] or "Noma'lum", 'total': row['total']} for row in channels
+        ],
+    }
+
+
+def get_bot_stats(today):
+    """Qisqa muddat keshlangan bot statistikasi. Qaytaradi: (stats, hit)"""
+    return get_or_compute(
+        'bot_stats', make_key('bot_stats', today.isoformat()), lambda: compute_bot_stats(today), BOT_STATS_CACHE_TTL
+    )
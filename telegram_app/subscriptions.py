@@ -0,0 +1,201 @@
+"""
+Yo'nalish obunalari: "Farg'ona → istalgan, ref" kabi obunaga mos yangi yuk
+chiqqanda bot orqali xabar yuboriladi.
+
+Har bir yukni barcha obunalar bilan solishtirilmaydi: xotiradagi teskari
+indeks (origin, destination, transport turi) -> obunachilar, None - istalgan.
+Bitta yuk uchun ko'pi bilan 8 ta kalit tekshiriladi (har o'lchov: aniq qiymat
+yoki istalgan), obunalar soniga bog'liq emas.
+
+Indeks obuna o'zgarganda shu jarayonda darhol, boshqa jarayonlarda esa
+SYNC_INTERVAL da bir marta `updated_at` bo'yicha faqat o'zgarganlarini o'qib
+yangilanadi. Xabarlar outbox navbatiga (outbox.py) qo'yiladi.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import product
+
+from django.utils import timezone
+
+from .models import RouteSubscription
+from .search import city_key
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = 5.0
+# Tarixni qayta yuklashda eski xabarlar uchun ogohlantirish yuborilmaydi
+NOTIFY_MAX_AGE = timedelta(hours=2)
+MAX_ALERT_ITEMS = 10
+
+WILDCARDS = {'*', 'any', 'istalgan', 'hammasi', '-'}
+
+# Transport turi matnidagi kalit so'zlar bo'yicha toifa
+TRUCK_CATEGORIES = {
+    'ref': ('реф', 'ref', 'холод', 'изотерм'),
+    'tent': ('тент', 'tent', 'фура', 'штор'),
+    'bort': ('борт', 'площадка', 'трал', 'bort'),
+    'konteyner': ('контейнер', 'konteyner', 'container'),
+    'isuzu': ('isuzu', 'исузу', 'газел', 'gazel'),
+}
+
+
+def truck_category(truck_type):
+    if not truck_type:
+        return None
+    text = truck_type.casefold()
+    for category, words in TRUCK_CATEGORIES.items():
+        if any(word in text for word in words):
+            return category
+    return None
+
+
+def _wildcard(value):
+    return None if value is None or value.casefold() in WILDCARDS else value
+
+
+def parse_subscription(args):
+    """
+    ["Farg'ona", "*", "ref"] -> ("fargona", None, "ref").
+    Oxirgi so'z transport toifasi bo'lsa ajratib olinadi. Noto'g'ri bo'lsa ValueError.
+    """
+    tokens = [token for token in args if token not in ('→', '->')]
+    truck = None
+    if len(tokens) >= 2 and (len(tokens) == 3 or tokens[-1].casefold() in TRUCK_CATEGORIES):
+        truck = _wildcard(tokens.pop())
+        if truck is not None and truck.casefold() not in TRUCK_CATEGORIES:
+            raise ValueError(f"Noma'lum transport turi: {truck}. Mavjud: {', '.join(TRUCK_CATEGORIES)}")
+    if not tokens or len(tokens) > 2:
+        raise ValueError("Format: /subscribe <qayerdan> [qayerga] [transport]")
+
+    origin = _wildcard(tokens[0])
+    destination = _wildcard(tokens[1]) if len(tokens) > 1 else None
+    truck = truck.casefold() if truck else None
+    if origin is None and destination is None and truck is None:
+        raise ValueError("Kamida bitta shart kerak (shahar yoki transport turi)")
+    return city_key(origin), city_key(destination), truck
+
+
+# ==================== TESKARI INDEKS ====================
+
+class SubscriptionIndex:
+    """(origin_key, destination_key, truck_category) -> {obuna id: chat_id}"""
+
+    def __init__(self):
+        self._buckets = defaultdict(dict)
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._synced_at = None
+        self._checked = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def apply(self, pk, chat_id, key, active):
+        with self._lock:
+            old = self._keys.pop(pk, None)
+            if old is not None:
+                bucket = self._buckets[old]
+                bucket.pop(pk, None)
+                if not bucket:
+                    del self._buckets[old]
+            if active:
+                self._buckets[key][pk] = chat_id
+                self._keys[pk] = key
+
+    def sync(self, force=False):
+        """Oxirgi sinxronlashdan keyin o'zgargan obunalarni o'qish (SYNC_INTERVAL da bir marta)."""
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < SYNC_INTERVAL:
+            return
+        self._checked = now
+
+        rows = RouteSubscription.objects.order_by('updated_at')
+        if self._synced_at is None:
+            rows = rows.filter(is_active=True)
+        else:
+            # Bir xil vaqtdagi yozuvlar qayta o'qiladi - apply() takrorlansa ham natija o'zgarmaydi
+            rows = rows.filter(updated_at__gte=self._synced_at)
+        for pk, chat_id, origin, destination, truck, active, updated_at in rows.values_list(
+            'id', 'chat_id', 'origin_key', 'destination_key', 'truck_category', 'is_active', 'updated_at'
+        ):
+            self.apply(pk, chat_id, (origin, destination, truck), active)
+            self._synced_at = updated_at
+
+    def match(self, origin_key, destination_key, category):
+        """Yukka mos obunachilar (chat_id lar)."""
+        chats = set()
+        for key in product({origin_key, None}, {destination_key, None}, {category, None}):
+            bucket = self._buckets.get(key)
+            if bucket:
+                chats.update(bucket.values())
+        return chats
+
+
+index = SubscriptionIndex()
+
+
+def subscribe(chat_id, origin_key, destination_key, truck):
+    subscription, created = RouteSubscription.objects.get_or_create(
+        chat_id=chat_id, origin_key=origin_key, destination_key=destination_key, truck_category=truck,
+    )
+    if not created and not subscription.is_active:
+        subscription.is_active = True
+        subscription.save(update_fields=['is_active', 'updated_at'])
+    index.apply(subscription.id, chat_id, (origin_key, destination_key, truck), True)
+    return subscription
+
+
+def unsubscribe(chat_id, subscription_id):
+    # O'chirilmaydi: boshqa jarayonlar indeksi updated_at orqali bilib oladi
+    subscription = RouteSubscription.objects.filter(id=subscription_id, chat_id=chat_id, is_active=True).first()
+    if subscription is None:
+        return False
+    subscription.is_active = False
+    subscription.save(update_fields=['is_active', 'updated_at'])
+    index.apply(subscription.id, chat_id, None, False)
+    return True
+
+
+def chat_subscriptions(chat_id):
+    return list(RouteSubscription.objects.filter(chat_id=chat_id, is_active=True).order_by('id'))
+
+
+# ==================== INGEST ====================
+
+def format_alert(shipments, message):
+    lines = ["🔔 Yangi yuk"]
+    for shipment in shipments[:MAX_ALERT_ITEMS]:
+        details = " · ".join(v for v in (shipment.cargo_type, shipment.truck_type, shipment.payment_type) if v)
+        lines.append(f"\n🚛 {shipment.origin or '-'} → {shipment.destination or '-'}")
+        if details:
+            lines.append(details)
+        lines.append(f"📞 {shipment.phone or '-'}")
+    lines.append(f"\n📡 {message.channel.title or ''}")
+    return "\n".join(lines)
+
+
+def notify_new_shipments(shipments, message):
+    """Yangi yuklarni obunalar bilan solishtirib, xabarlarni outbox navbatiga qo'yish."""
+    from . import outbox
+
+    if not shipments or (message.date and message.date < timezone.now() - NOTIFY_MAX_AGE):
+        return 0
+    index.sync()
+    if not len(index):
+        return 0
+
+    per_chat = defaultdict(list)
+    for shipment in shipments:
+        category = truck_category(shipment.truck_type)
+        for chat_id in index.match(shipment.origin_key, shipment.destination_key, category):
+            per_chat[chat_id].append(shipment)
+
+    # Ogohlantirish yuborilmasa ham ingest to'xtamasligi kerak
+    try:
+        outbox.enqueue_many((chat_id, format_alert(matched, message)) for chat_id, matched in per_chat.items())
+    except Exception:
+        logger.exception("Obuna xabarlari navbatga qo'yilmadi")
+    return len(per_chat)
@@ -0,0 +1,87 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel, Shipment
+
+CITIES = ['Moskva', 'Qozon', 'Samara', 'Omsk', 'Tver']
+
+
+def load_text(origin, destination):
+    return f"{origin} - {destination}\nГРУЗ: мебель\nТЕНТ 120\nНАХТ\nTel: +998 90 123 45 67"
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        self.now = timezone.now()
+        for i in range(5):
+            save_message(
+                self.channel, message_id=i, text=load_text('Toshkent', CITIES[i]),
+                date=self.now - timedelta(minutes=i),
+            )
+
+    def get(self, url, params=None, **headers):
+        return self.client.get(url, params or {}, **headers)
+
+    def test_field_selection(self):
+        response = self.get('/api/v1/shipments/', {'fields': 'origin,destination,channel_id', 'limit': 2})
+        body = response.json()
+        self.assertEqual(body['results'][0], {'origin': 'Toshkent', 'destination': 'Moskva', 'channel_id': 1})
+        self.assertEqual(len(body['results']), 2)
+        self.assertIn('after=', body['next'])
+
+        rest = self.client.get(body['next']).json()
+        self.assertEqual([row['destination'] for row in rest['results']], ['Samara', 'Omsk'])
+
+    def test_unknown_field_and_bad_limit_are_400(self):
+        response = self.get('/api/v1/shipments/', {'fields': 'origin,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+        self.assertEqual(self.get('/api/v1/messages/', {'fields': 'text,origin'}).status_code, 400)
+        self.assertEqual(self.get('/api/v1/shipments/', {'limit': 'ko'}).status_code, 400)
+
+    def test_conditional_get_returns_304_without_main_query(self):
+        response = self.get('/api/v1/shipments/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Faqat ETag uchun holat (Max id, Max updated_at) o'qiladi
+        with self.assertNumQueries(2):
+            again = self.get('/api/v1/shipments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        since = self.get('/api/v1/shipments/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+        # Yangi yuk - ETag o'zgaradi
+        save_message(self.channel, message_id=99, text=load_text('Buxoro', 'Qozon'), date=self.now)
+        changed = self.get('/api/v1/shipments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_etag_depends_on_query(self):
+        first = self.get('/api/v1/shipments/', {'fields': 'id'})['ETag']
+        self.assertNotEqual(self.get('/api/v1/shipments/', {'fields': 'origin'})['ETag'], first)
+        old = http_date((self.now - timedelta(days=1)).timestamp())
+        self.assertEqual(self.get('/api/v1/shipments/', HTTP_IF_MODIFIED_SINCE=old).status_code, 200)
+
+    def test_gzip_and_filters(self):
+        response = self.get('/api/v1/shipments/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 5)
+
+        results = self.get('/api/v1/shipments/', {'destination': 'qozon', 'phone': '90 123 45 67'}).json()['results']
+        self.assertEqual([row['id'] for row in results], [Shipment.objects.get(destination='Qozon').id])
+
+    def test_channel_stats(self):
+        body = self.get('/api/v1/channels/1/stats/', {'limit': 2}).json()
+        self.assertEqual(body['total'], 5)
+        self.assertEqual(len(body['routes']), 2)
+        self.assertEqual(self.get('/api/v1/channels/1/stats/', {'limit': 'x'}).status_code, 400)
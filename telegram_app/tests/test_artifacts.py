@@ -0,0 +1,60 @@
+import io
+import os
+import tempfile
+import zipfile
+
+from django.test import SimpleTestCase, override_settings
+
+from telegram_app import artifacts
+
+
+class ArtifactCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(EXPORT_CACHE_DIR=tmp.name, EXPORT_CACHE_MAX_BYTES=1000)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.builds = []
+
+    def build(self, size, name='a'):
+        def build():
+            self.builds.append(name)
+            return io.BytesIO(b'x' * size)
+        return artifacts.get_or_build(artifacts.artifact_key(name=name), 'csv', f'{name}.csv', build)
+
+    def test_same_key_is_built_once(self):
+        first = self.build(100)
+        second = self.build(100)
+        self.assertEqual((first.hit, second.hit), (False, True))
+        self.assertEqual(self.builds, ['a'])
+        self.assertEqual(second.meta, {'filename': 'a.csv'})
+        self.assertNotEqual(artifacts.artifact_key(name='a', days=1), artifacts.artifact_key(name='a', days=2))
+
+    def test_least_recently_used_is_evicted(self):
+        old, used = self.build(400, 'old'), self.build(400, 'used')
+        os.utime(old.path, (1, 1))
+        os.utime(used.path, (2, 2))
+        # Keshdan olish mtime ni yangilaydi: 'used' endi eng yangi
+        self.assertTrue(self.build(400, 'used').hit)
+
+        new = self.build(400, 'new')
+        self.assertFalse(old.path.exists())
+        self.assertFalse(artifacts._meta_path(old.path).exists())
+        self.assertTrue(used.path.exists())
+        self.assertTrue(new.path.exists())
+        self.assertEqual(artifacts.evict(max_bytes=0), 2)
+        self.assertEqual(list(artifacts.cache_dir().iterdir()), [])
+
+    def test_zip_and_file_id_are_cached(self):
+        artifact = self.build(300)
+        archive = artifacts.zipped(artifact)
+        self.assertTrue(archive.path.name.endswith('.csv.zip'))
+        with zipfile.ZipFile(archive.path) as zf:
+            self.assertEqual(zf.read('a.csv'), b'x' * 300)
+        self.assertTrue(artifacts.zipped(artifact).hit)
+
+        artifacts.remember_file_id(artifact, 'FILE123')
+        self.assertEqual(self.build(300).file_id, 'FILE123')
+        artifacts.forget_file_id(artifact)
+        self.assertIsNone(self.build(300).file_id)
@@ -0,0 +1,88 @@
+import tempfile
+from datetime import date, datetime
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from telegram_app import bot_service
+from telegram_app.exports import ExportPart, build_export_part, days_range, plan_export_parts
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel
+
+# Dushanbadan boshlanadigan uch hafta; o'rtadagi hafta bo'sh
+DATE_FROM, DATE_TO = date(2024, 3, 4), date(2024, 3, 24)
+
+
+def load_text(origin, destination):
+    return (
+        f"{origin} - {destination}\nГРУЗ: mebel, maishiy texnika va qurilish mollari\n"
+        f"ТЕНТ 120\nНАХТ\nTel: +998 90 123 45 67"
+    )
+
+
+class PlanExportPartsTests(TestCase):
+    def setUp(self):
+        first = Channel.objects.create(channel_id=1, title='Birinchi')
+        second = Channel.objects.create(channel_id=2, title='Ikkinchi')
+        loads = [(first, 4), (first, 5), (second, 6), (first, 19), (second, 20)]
+        for i, (channel, day) in enumerate(loads):
+            when = timezone.make_aware(datetime(2024, 3, day, 12))
+            save_message(channel, message_id=i, text=load_text('Toshkent', 'Moskva'), date=when)
+
+    def plan(self, limit):
+        return plan_export_parts(DATE_FROM, DATE_TO, 'csv.gz', limit=limit)
+
+    def test_whole_period_fits_one_part(self):
+        self.assertEqual(self.plan(10_000), [ExportPart(DATE_FROM, DATE_TO, label='2024-03-04 → 2024-03-24', rows=5)])
+
+    def test_split_by_week_skips_empty_weeks(self):
+        # csv.gz ~50 bayt/qator, zaxira 80%: 160 baytga 3 qator sig'adi, 5 tasi emas
+        parts = self.plan(200)
+        self.assertEqual(
+            [(p.date_from, p.date_to, p.channel_id, p.rows) for p in parts],
+            [(date(2024, 3, 4), date(2024, 3, 10), None, 3), (date(2024, 3, 18), date(2024, 3, 24), None, 2)],
+        )
+
+    def test_oversized_week_is_split_by_channel(self):
+        parts = self.plan(100)
+        self.assertEqual([(p.channel_id, p.rows) for p in parts], [(1, 2), (2, 1), (1, 1), (2, 1)])
+        self.assertEqual(parts[0].label, '2024-03-04 → 2024-03-10 · Birinchi')
+
+    def test_part_is_zipped_or_rejected_when_too_big(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(EXPORT_CACHE_DIR=tmp):
+            part = self.plan(10_000)[0]
+            plain = build_export_part(part, 'csv')
+            self.assertEqual(plain.path.suffix, '.csv')
+
+            packed = build_export_part(part, 'csv', limit=plain.size - 1)
+            self.assertEqual(packed.path.suffix, '.zip')
+            self.assertLess(packed.size, plain.size)
+            with self.assertRaisesMessage(ValueError, part.label):
+                build_export_part(part, 'csv', limit=10)
+
+
+class SendExportTests(TestCase):
+    def test_progress_message_is_edited_per_part(self):
+        parts = [ExportPart(DATE_FROM, DATE_FROM, label='a'), ExportPart(DATE_TO, DATE_TO, label='b')]
+        edit = mock.AsyncMock()
+        application = mock.Mock()
+        application.bot.send_message = mock.AsyncMock(return_value=mock.Mock(edit_text=edit))
+        config = mock.Mock(admin_chat_id=42)
+
+        with mock.patch.object(bot_service, 'get_bot_config', return_value=config), \
+                mock.patch.object(bot_service, 'plan_export_parts', return_value=parts) as plan, \
+                mock.patch.object(bot_service, 'build_export_part', side_effect=lambda part, fmt: part.label), \
+                mock.patch.object(bot_service, '_send_artifact', new_callable=mock.AsyncMock) as send:
+            sent = async_to_sync(bot_service._send_export)(application, days=90, fmt='csv')
+
+        self.assertEqual(sent, 2)
+        # 60 kundan ortig'i kesiladi
+        plan.assert_called_once_with(*days_range(60), 'csv')
+        self.assertEqual([call.args[2] for call in send.await_args_list], ['a', 'b'])
+        self.assertIn('2/2', send.await_args_list[1].args[3])
+        statuses = [call.args[0] for call in edit.await_args_list]
+        self.assertEqual(len(statuses), 3)
+        self.assertIn('1/2', statuses[0])
+        self.assertTrue(statuses[-1].startswith('✅'))
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from telegram_app.caching import bump_version, cache_stats, get_or_compute, get_version, make_key
+from telegram_app.ingest import save_message
+from telegram_app.lanes import LANES_NAMESPACE
+from telegram_app.models import CacheVersion, Channel, Shipment
+from telegram_app.stats import channel_namespace, dashboard_namespace, get_channel_stats, get_dashboard_stats
+from telegram_app.timeseries import TIMESERIES_NAMESPACE
+
+
+def load_text(origin, destination):
+    return f"{origin} - {destination}\nГРУЗ: мебель\nТЕНТ 120\nНАХТ\nTel: +998 90 123 45 67"
+
+
+class VersionTests(TestCase):
+    def test_existing_namespaces_bumped_in_one_update(self):
+        bump_version('a', 'b', 'c')
+        self.assertEqual([get_version(n) for n in 'abc'], [1, 1, 1])
+
+        with self.assertNumQueries(1):
+            bump_version('a', 'b', 'c')
+        self.assertEqual([get_version(n) for n in 'abc'], [2, 2, 2])
+
+    def test_new_namespace_is_created_without_losing_bumps(self):
+        bump_version('a')
+        bump_version('a', 'new')
+        self.assertGreaterEqual(get_version('a'), 2)
+        self.assertEqual(get_version('new'), 1)
+        self.assertEqual(get_version('missing'), 0)
+
+    def test_key_changes_with_version(self):
+        key = make_key('a', 'x', 1)
+        self.assertEqual(make_key('a', 'x', 1), key)
+        bump_version('a')
+        self.assertNotEqual(make_key('a', 'x', 1), key)
+
+
+class GetOrComputeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_computes_once_and_counts_hits(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'total': 5}
+
+        self.assertEqual(get_or_compute('test', 'k', compute, 60), ({'total': 5}, False))
+        self.assertEqual(get_or_compute('test', 'k', compute, 60), ({'total': 5}, True))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache_stats('test'), {'hits': 1, 'misses': 1, 'hit_rate': 50.0})
+
+
+class IngestInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+
+    def ingest(self, message_id, text, date=None):
+        return save_message(self.channel, message_id=message_id, text=text, date=date or self.now)
+
+    def channel_stats(self):
+        return get_channel_stats(1, Shipment.objects.filter(message__channel=self.channel), {})
+
+    def test_new_shipment_invalidates_stats_and_dashboard(self):
+        self.ingest(1, load_text('Toshkent', 'Moskva'))
+        self.assertEqual(self.channel_stats()['total'], 1)
+        self.assertFalse(get_dashboard_stats(self.today)[1])
+        self.assertTrue(get_dashboard_stats(self.today)[1])
+
+        self.ingest(2, load_text('Buxoro', 'Qozon'))
+        self.assertEqual(self.channel_stats()['total'], 2)
+        stats, hit = get_dashboard_stats(self.today)
+        self.assertFalse(hit)
+        self.assertEqual(stats['total_today'], 2)
+
+    def test_one_update_bumps_every_namespace(self):
+        self.ingest(1, load_text('Toshkent', 'Moskva'))
+        namespaces = [
+            channel_namespace(1), dashboard_namespace(self.today), LANES_NAMESPACE, TIMESERIES_NAMESPACE,
+        ]
+        before = dict(CacheVersion.objects.values_list('namespace', 'version'))
+        self.assertEqual(set(before), set(namespaces))
+
+        with self.assertNumQueries(1):
+            bump_version(*namespaces)
+        self.ingest(2, load_text('Buxoro', 'Qozon'))
+        after = dict(CacheVersion.objects.values_list('namespace', 'version'))
+        self.assertEqual(after, {namespace: before[namespace] + 2 for namespace in namespaces})
+
+    def test_other_days_and_reingest_keep_cache(self):
+        yesterday = self.today - timedelta(days=1)
+        get_dashboard_stats(yesterday)
+        self.ingest(1, load_text('Toshkent', 'Moskva'))
+        self.assertTrue(get_dashboard_stats(yesterday)[1])
+
+        self.channel_stats()
+        # Qayta ingest: yangi yuk yo'q - kesh eskirmaydi
+        self.ingest(1, load_text('Toshkent', 'Moskva'))
+        self.ingest(3, 'salom')
+        self.assertTrue(get_or_compute('channel_stats', make_key(channel_namespace(1)), dict, 60)[1])
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from telegram_app import compression
+from telegram_app.models import Channel, CompressionDictionary, Message
+
+CITIES = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Moskva', 'Qozon']
+
+
+def load_text(i):
+    return (
+        f"🚚 {CITIES[i % 6]} - {CITIES[(i + 1) % 6]}\n"
+        f"ГРУЗ: мебель {i % 20 + 1} т\nТЕНТ 120\nНАХТ\nTel: +998 90 {100 + i % 900} 45 67"
+    )
+
+
+@skipUnless(compression.is_available(), "zstandard o'rnatilmagan")
+@override_settings(MESSAGE_TEXT_COMPRESSION=True, MESSAGE_TEXT_COMPRESSION_AFTER_DAYS=30)
+class CompressionTests(TestCase):
+    def setUp(self):
+        # Lug'at va codec keshlari modul darajasida: testlar orasida id qayta ishlatiladi
+        compression._dicts.clear()
+        compression._local.__dict__.clear()
+        compression.reset_active_dictionary()
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        self.old = timezone.now() - timedelta(days=60)
+
+    def message(self, message_id, text, date):
+        return Message.objects.create(channel=self.channel, message_id=message_id, text=text, date=date)
+
+    def test_roundtrip_with_and_without_dictionary(self):
+        text = load_text(7)
+        self.assertEqual(compression.decompress_text(compression.compress_text(text)), text)
+
+        dictionary = compression.train_dictionary([load_text(i) for i in range(300)], size=4096)
+        data = compression.compress_text(text, dictionary.pk)
+        self.assertLess(len(data), len(text.encode('utf-8')))
+        self.assertEqual(compression.decompress_text(data, dictionary.pk), text)
+
+    def test_only_old_messages_are_compressed_on_save(self):
+        old = self.message(1, load_text(1), self.old)
+        new = self.message(2, load_text(2), timezone.now())
+
+        stored = dict(Message.objects.values_list('id', 'text'))
+        self.assertIsNone(stored[old.id])
+        self.assertEqual(stored[new.id], load_text(2))
+        self.assertEqual(old.text, load_text(1))
+        self.assertEqual(Message.objects.get(id=old.id).text, load_text(1))
+
+    def test_compress_messages_command(self):
+        # Tarix siqish yoqilmasdan oldin yuklangan
+        with self.settings(MESSAGE_TEXT_COMPRESSION=False):
+            for i in range(40):
+                self.message(i, load_text(i), self.old if i % 2 else timezone.now())
+        self.assertFalse(Message.objects.filter(text_zstd__isnull=False).exists())
+        out = StringIO()
+
+        call_command('compress_messages', '--train', '--dict-size', '4096', stdout=out)
+        dictionary = CompressionDictionary.objects.get()
+        compressed = Message.objects.filter(text_zstd__isnull=False)
+        self.assertEqual(compressed.count(), 20)
+        self.assertFalse(compressed.filter(date__gte=compression.compression_cutoff()).exists())
+        self.assertEqual(dictionary.message_count, 20)
+        self.assertGreater(dictionary.raw_bytes, dictionary.compressed_bytes)
+        self.assertEqual(sorted(m.text for m in Message.objects.all()), sorted(load_text(i) for i in range(40)))
+
+        call_command('compress_messages', '--decompress', stdout=out)
+        self.assertFalse(Message.objects.filter(text_zstd__isnull=False).exists())
+        self.assertEqual(Message.objects.filter(text__isnull=True).count(), 0)
+
+    def test_keyword_search_excludes_compressed_messages_explicitly(self):
+        self.message(1, 'Toshkent - Qozon eski', self.old)
+        recent = self.message(2, 'Toshkent - Qozon yangi', timezone.now())
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'a@b.c', 'pw'))
+
+        response = self.client.get('/messages/', {'search': 'qozon'})
+        self.assertEqual([msg.id for msg in response.context['messages']], [recent.id])
+        self.assertTrue(response.context['search_skips_compressed'])
+        self.assertContains(response, "faqat siqilmagan xabarlarda")
+
+        response = self.client.get('/messages/')
+        self.assertFalse(response.context['search_skips_compressed'])
+        self.assertEqual(len(response.context['messages']), 2)
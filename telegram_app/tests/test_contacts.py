@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from telegram_app.contacts import classify_contact, normalize_phone, rebuild_contacts
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel, Contact, ContactChannelStat, ContactKind, Shipment
+
+
+def load_text(origin, destination, phone='+998 90 123 45 67'):
+    return f"{origin} - {destination}\nГРУЗ: мебель\nТЕНТ 120\nНАХТ\nTel: {phone}"
+
+
+class ContactNormalizationTests(SimpleTestCase):
+    def test_phone_formats(self):
+        for raw in ('+998 90 123-45-67', '998901234567', '901234567', ' (90) 123 45 67 '):
+            self.assertEqual(normalize_phone(raw), '998901234567', raw)
+        self.assertEqual(normalize_phone('+7 916 123-45-67'), '79161234567')
+
+    def test_usernames_stay_distinct(self):
+        self.assertEqual(normalize_phone(' @Ali_Logist99 '), '@ali_logist99')
+        self.assertNotEqual(normalize_phone('@ali_99'), normalize_phone('@bob_99'))
+
+    def test_empty_and_non_digit(self):
+        self.assertIsNone(normalize_phone(None))
+        self.assertIsNone(normalize_phone('   '))
+        self.assertEqual(normalize_phone('Lichkaga'), 'lichkaga')
+
+    def test_classify(self):
+        self.assertEqual(classify_contact('+998901234567'), ContactKind.PHONE)
+        self.assertEqual(classify_contact('901234567'), ContactKind.PHONE)
+        self.assertEqual(classify_contact('@ali'), ContactKind.USERNAME)
+        self.assertEqual(classify_contact('ID 4521'), ContactKind.OTHER)
+        self.assertIsNone(classify_contact(''))
+
+
+class ContactDirectoryTests(TestCase):
+    def setUp(self):
+        self.first = Channel.objects.create(channel_id=1, title='birinchi')
+        self.second = Channel.objects.create(channel_id=2, title='ikkinchi')
+        self.now = timezone.now()
+
+    def ingest(self, channel, message_id, text, minutes=0):
+        save_message(channel, message_id=message_id, text=text, date=self.now + timedelta(minutes=minutes))
+
+    def test_ingest_maintains_aggregates(self):
+        self.ingest(self.first, 1, load_text('Toshkent', 'Moskva'), minutes=-10)
+        self.ingest(self.first, 2, load_text('Toshkent', 'Moskva', phone='90 123 45 67'))
+        self.ingest(self.second, 1, load_text('Buxoro', 'Qozon'), minutes=-20)
+
+        contact = Contact.objects.get()
+        self.assertEqual(contact.phone, '998901234567')
+        self.assertEqual((contact.total_loads, contact.channel_count), (3, 2))
+        self.assertEqual(contact.first_seen, self.now - timedelta(minutes=20))
+        self.assertEqual(contact.last_seen, self.now)
+        self.assertEqual(contact.top_routes()[0], ('Toshkent → Moskva', 2))
+        self.assertEqual(
+            dict(ContactChannelStat.objects.values_list('channel__channel_id', 'total')), {1: 2, 2: 1}
+        )
+
+    def test_rebuild_matches_incremental(self):
+        for i in range(6):
+            self.ingest(self.first if i % 2 else self.second, i, load_text('Toshkent', f'Shahar{i % 3}'), minutes=i)
+        fields = ('phone', 'total_loads', 'channel_count', 'first_seen', 'last_seen', 'route_counts')
+        incremental = list(Contact.objects.values_list(*fields))
+
+        rebuild_contacts()
+        self.assertEqual(list(Contact.objects.values_list(*fields)), incremental)
+
+    def test_detail_lists_latest_shipments_first(self):
+        self.ingest(self.first, 1, load_text('Toshkent', 'Moskva'), minutes=-5)
+        self.ingest(self.first, 2, load_text('Buxoro', 'Qozon'))
+        self.ingest(self.second, 1, load_text('Andijon', 'Olmaota'))
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'a@b.c', 'pw'))
+
+        response = self.client.get('/contacts/998901234567/')
+        shipments = list(response.context['shipments'])
+        # Bir xil sana: id bo'yicha kamayish tartibida
+        self.assertEqual([sh.origin for sh in shipments], ['Andijon', 'Buxoro', 'Toshkent'])
+        self.assertContains(response, 'ikkinchi')
+
+
+class ChannelPhonesTests(TestCase):
+    def setUp(self):
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        now = timezone.now()
+        texts = [
+            load_text('Toshkent', 'Moskva'), load_text('Buxoro', 'Qozon'),
+            load_text('Andijon', 'Qozon', phone='+998 91 765 43 21'), load_text('Toshkent', 'Olmaota', phone='@ali_logist'),
+        ]
+        for i, text in enumerate(texts):
+            save_message(self.channel, message_id=i, text=text, date=now)
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'a@b.c', 'pw'))
+
+    def test_kind_is_stored_at_ingest(self):
+        self.assertEqual(
+            sorted(Shipment.objects.values_list('phone', 'contact_kind')),
+            [('+998 90 123 45 67', ContactKind.PHONE)] * 2 + [
+                ('+998 91 765 43 21', ContactKind.PHONE), ('@ali_logist', ContactKind.USERNAME),
+            ],
+        )
+
+    def test_catalogue_and_filtered_paths_agree(self):
+        def totals(response, key):
+            return {row['phone']: row['total'] for row in response.context[key]}
+
+        catalogue = self.client.get('/stats/1/phones/')
+        filtered = self.client.get('/stats/1/phones/', {'search': '+'})
+        self.assertEqual(totals(catalogue, 'phone_stats'), {'+998 90 123 45 67': 2, '+998 91 765 43 21': 1})
+        self.assertEqual(totals(catalogue, 'id_stats'), {'@ali_logist': 1})
+        self.assertEqual(totals(filtered, 'phone_stats'), totals(catalogue, 'phone_stats'))
+        self.assertEqual(totals(filtered, 'id_stats'), {})
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from telegram_app.dedup import (
+    BAND_BITS, MAX_DISTANCE, bands, find_near_duplicates, find_original_id, fingerprint_fields, hamming_distance,
+    simhash, to_signed, to_unsigned,
+)
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel, Message
+
+LOAD_TEXT = (
+    'Toshkent - Moskva yuk bor, tent 20 tonna, mebel, tel +998901234567, '
+    'narxi kelishiladi, tez yuklash kerak ertaga ertalab soat 9 da'
+)
+
+
+class SimhashTests(SimpleTestCase):
+    def test_formatting_does_not_change_fingerprint(self):
+        self.assertEqual(simhash(LOAD_TEXT), simhash('🚚 ' + LOAD_TEXT.upper() + '!!!'))
+
+    def test_near_duplicate_within_distance(self):
+        self.assertLessEqual(hamming_distance(simhash(LOAD_TEXT), simhash(LOAD_TEXT + ' ok')), MAX_DISTANCE)
+        self.assertGreater(hamming_distance(simhash(LOAD_TEXT), simhash('Samarqand Qozon ref kerak')), MAX_DISTANCE)
+
+    def test_empty_text_has_no_fingerprint(self):
+        self.assertIsNone(simhash(''))
+        self.assertIsNone(fingerprint_fields('  ...  ')['simhash'])
+
+    def test_signed_roundtrip(self):
+        value = (1 << 63) | 12345
+        signed = to_signed(value)
+        self.assertLess(signed, 0)
+        self.assertEqual(to_unsigned(signed), value)
+        self.assertEqual(hamming_distance(signed, value), 0)
+
+    def test_close_fingerprints_share_a_band(self):
+        # MAX_DISTANCE bit 4 ta bandning ko'pi bilan 3 tasiga tushadi
+        value = simhash(LOAD_TEXT)
+        for offsets in [(0, 1, 2), (0, BAND_BITS, 2 * BAND_BITS), (BAND_BITS + 1, 2 * BAND_BITS + 1, 3 * BAND_BITS + 1)]:
+            other = value
+            for bit in offsets:
+                other ^= 1 << bit
+            self.assertTrue(any(a == b for a, b in zip(bands(value), bands(other))))
+
+
+class NearDuplicateLookupTests(TestCase):
+    def setUp(self):
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        self.now = timezone.now()
+
+    def message(self, message_id, text, minutes=0, **extra):
+        return Message.objects.create(
+            channel=self.channel, message_id=message_id, text=text,
+            date=self.now + timedelta(minutes=minutes), **fingerprint_fields(text), **extra,
+        )
+
+    def test_finds_near_duplicates_only(self):
+        original = self.message(1, LOAD_TEXT)
+        copy = self.message(2, LOAD_TEXT + ' ok', minutes=1)
+        self.message(3, 'Samarqand Qozon ref kerak', minutes=2)
+
+        found = find_near_duplicates(Message.objects.all(), fingerprint_fields(LOAD_TEXT))
+        self.assertEqual([msg.id for msg in found], [original.id, copy.id])
+
+    def test_original_is_earliest_and_chains_collapse(self):
+        original = self.message(1, LOAD_TEXT)
+        self.message(2, LOAD_TEXT + ' ok', minutes=-5, duplicate_of=original)
+
+        # Eng erta nomzod dublikat bo'lsa ham, uning asl nusxasi qaytadi
+        self.assertEqual(find_original_id(Message.objects.all(), fingerprint_fields(LOAD_TEXT)), original.id)
+        self.assertIsNone(find_original_id(Message.objects.all(), fingerprint_fields('Buxoro Andijon bort')))
+
+    def test_ingest_links_reposts_to_original(self):
+        original, _ = save_message(self.channel, message_id=1, text=LOAD_TEXT, date=self.now)
+        repost, _ = save_message(Channel.objects.create(channel_id=2), message_id=1, text=LOAD_TEXT + ' ok', date=self.now)
+
+        self.assertIsNone(original.duplicate_of_id)
+        self.assertEqual(repost.duplicate_of_id, original.id)
+        self.assertEqual(repost.simhash_band0, fingerprint_fields(LOAD_TEXT + ' ok')['simhash_band0'])
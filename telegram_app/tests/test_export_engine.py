@@ -0,0 +1,121 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import timedelta
+
+import openpyxl
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from telegram_app.export_engine import FORMATS, ROW_NUMBER, Column, ExportSpec, default, parquet_available, write_export
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel
+
+
+def load_text(origin, destination):
+    return f"{origin} - {destination}\nГРУЗ: мебель\nТЕНТ 120\nНАХТ\nTel: +998 90 123 45 67"
+
+
+class ExportWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.date = timezone.now().replace(microsecond=0)
+        self.spec = ExportSpec('Test', [
+            Column('№', (ROW_NUMBER,), type='int'),
+            Column('Qayerdan', ('origin',), format=default('-')),
+            Column('Sana', ('date',), type='timestamp'),
+        ])
+        self.rows = [('Toshkent', self.date), (None, self.date - timedelta(days=1))]
+        self.expected = [
+            [1, 'Toshkent', self.date.isoformat()],
+            [2, '-', (self.date - timedelta(days=1)).isoformat()],
+        ]
+
+    def export(self, fmt):
+        return write_export(self.spec, self.rows, fmt).read()
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv').decode('utf-8'))))
+        self.assertEqual(rows[0], ['№', 'Qayerdan', 'Sana'])
+        self.assertEqual(rows[1:], [[str(v) for v in row] for row in self.expected])
+
+    def test_csv_gzip(self):
+        self.assertEqual(gzip.decompress(self.export('csv.gz')), self.export('csv'))
+
+    def test_json(self):
+        data = json.loads(self.export('json'))
+        self.assertEqual(data, [dict(zip(self.spec.headers, row)) for row in self.expected])
+
+    def test_jsonl(self):
+        lines = self.export('jsonl').decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [dict(zip(self.spec.headers, row)) for row in self.expected])
+
+    def test_parquet(self):
+        if not parquet_available():
+            self.skipTest("pyarrow o'rnatilmagan")
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(self.export('parquet'))).to_pylist()
+        self.assertEqual([row['Qayerdan'] for row in table], ['Toshkent', '-'])
+        self.assertEqual(table[0]['Sana'], self.date)
+
+    def test_xlsx(self):
+        sheet = openpyxl.load_workbook(io.BytesIO(self.export('xlsx'))).active
+        self.assertEqual(sheet.title, 'Test')
+        self.assertEqual([list(row) for row in sheet.iter_rows(values_only=True)], [self.spec.headers] + self.expected)
+
+    def test_every_format_is_covered(self):
+        self.assertEqual(set(FORMATS), {'xlsx', 'csv', 'csv.gz', 'json', 'jsonl', 'parquet'})
+
+    def test_batches_report_progress(self):
+        done = []
+        list(self.spec.batches(self.rows * 3, batch_size=4, progress=done.append))
+        self.assertEqual(done, [4, 6])
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        channel = Channel.objects.create(channel_id=1, title='test')
+        now = timezone.now()
+        for i, city in enumerate(['Moskva', 'Qozon', 'Samara']):
+            save_message(channel, message_id=i, text=load_text('Toshkent', city), date=now - timedelta(minutes=i))
+
+    def test_channel_export_xlsx(self):
+        response = self.client.get('/stats/1/export-excel/')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="channel_1.xlsx"')
+        sheet = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:2], ('channel_id', 'channel_title'))
+        self.assertEqual(sorted(row[5] for row in rows[1:]), ['Moskva', 'Qozon', 'Samara'])
+
+    def test_channel_export_csv_streams(self):
+        response = self.client.get('/stats/1/export-excel/', {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual([row['destination'] for row in rows], ['Moskva', 'Qozon', 'Samara'])
+
+        response = self.client.get('/stats/1/export-excel/', {'format': 'csv.gz'})
+        content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertEqual(len(list(csv.reader(io.StringIO(content)))), 4)
+
+    def test_phone_exports_share_columns(self):
+        def rows(**params):
+            response = self.client.get('/stats/1/phones/export-excel/', {'format': 'csv', **params})
+            return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+
+        # Katalogdan va filtrlangan so'rovdan bir xil ustunlar va jami
+        catalogue, filtered = rows(), rows(search='90')
+        self.assertEqual(catalogue[0], ['phone', 'total_shipments'])
+        self.assertEqual(filtered[0], catalogue[0])
+        self.assertEqual([row[1] for row in catalogue[1:]], ['3'])
+        self.assertEqual([row[1] for row in filtered[1:]], ['3'])
+
+    def test_global_export_csv(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(EXPORT_CACHE_DIR=tmp):
+            response = self.client.get('/export-excel/', {'format': 'csv'})
+            self.assertEqual(response['X-Cache'], 'MISS')
+            rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+            self.assertEqual(self.client.get('/export-excel/', {'format': 'csv'})['X-Cache'], 'HIT')
+        self.assertEqual(sorted(row['destination'] for row in rows), ['Moskva', 'Qozon', 'Samara'])
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from telegram_app import feed
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel, Message, Shipment
+
+
+def load_text(origin, destination, truck='ТЕНТ 120'):
+    return f"{origin} - {destination}\nГРУЗ: мебель\n{truck}\nНАХТ\nTel: +998 90 123 45 67"
+
+
+def read_feed(client, **params):
+    response = client.get('/api/shipments/changes/', params)
+    lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+    return lines[:-1], lines[-1]
+
+
+class FeedCursorTests(TestCase):
+    def setUp(self):
+        feed.notify_changes()
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        self.now = timezone.now()
+        for i, city in enumerate(['Moskva', 'Qozon', 'Samara', 'Omsk', 'Tver']):
+            save_message(self.channel, message_id=i, text=load_text('Toshkent', city), date=self.now)
+
+    def test_walk_with_cursor_covers_every_row_once(self):
+        seen, since = [], ''
+        while True:
+            rows, tail = read_feed(self.client, since=since, limit=2)
+            seen.extend(row['destination'] for row in rows)
+            since = tail['cursor']
+            if not tail['has_more']:
+                break
+        self.assertEqual(seen, ['Moskva', 'Qozon', 'Samara', 'Omsk', 'Tver'])
+        self.assertEqual(read_feed(self.client, since=since)[0], [])
+
+    def test_updated_row_comes_back_after_cursor(self):
+        _, tail = read_feed(self.client)
+        save_message(self.channel, message_id=1, text=load_text('Toshkent', 'Qozon', truck='РЕФ 96'), date=self.now)
+        # O'zgarmagan qayta ingest lentaga tushmaydi
+        save_message(self.channel, message_id=2, text=load_text('Toshkent', 'Samara'), date=self.now)
+
+        rows, new_tail = read_feed(self.client, since=tail['cursor'])
+        self.assertEqual([(row['destination'], row['truck_type']) for row in rows], [('Qozon', 'РЕФ 96')])
+        self.assertGreater(int(new_tail['cursor']), int(tail['cursor']))
+
+    def test_late_commit_is_not_skipped(self):
+        # Oldinroq boshlanib keyinroq commit bo'lgan tranzaksiya: updated_at kursordagidan eski
+        _, tail = read_feed(self.client)
+        message = Message.objects.create(channel=self.channel, message_id=99, text='x', date=self.now)
+        with mock.patch('django.utils.timezone.now', return_value=self.now - timedelta(minutes=5)):
+            late = Shipment.objects.create(message=message, origin='Buxoro', destination='Qozon')
+        self.assertLess(late.updated_at, Shipment.objects.order_by('-updated_at').first().updated_at)
+
+        rows, _ = read_feed(self.client, since=tail['cursor'])
+        self.assertEqual([row['id'] for row in rows], [late.id])
+
+    def test_seq_follows_write_order(self):
+        seqs = list(Shipment.objects.order_by('id').values_list('change_seq', flat=True))
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(len(set(seqs)), len(seqs))
+
+    def test_bad_parameters_are_400(self):
+        for params in ({'since': 'abc'}, {'since': '-1'}, {'since': 'WzEsMl0'}, {'limit': 'x'}, {'wait': 'soon'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/shipments/changes/', params).status_code, 400)
+
+
+class LongPollTests(TransactionTestCase):
+    def setUp(self):
+        feed.notify_changes()
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        save_message(self.channel, message_id=1, text=load_text('Toshkent', 'Moskva'), date=timezone.now())
+        self.cursor = Shipment.objects.get().change_seq
+
+    def test_wait_times_out_without_changes(self):
+        started = time.monotonic()
+        self.assertFalse(feed.wait_for_changes(self.cursor, 0.3))
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertTrue(feed.wait_for_changes(None, 5))
+
+    def test_ingest_wakes_waiter(self):
+        def ingest_later():
+            time.sleep(0.2)
+            try:
+                save_message(self.channel, message_id=2, text=load_text('Buxoro', 'Qozon'), date=timezone.now())
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=ingest_later)
+        started = time.monotonic()
+        writer.start()
+        self.assertTrue(feed.wait_for_changes(self.cursor, 10))
+        writer.join()
+        # notify_changes darhol uyg'otadi (HEAD_TTL kutilmaydi)
+        self.assertLess(time.monotonic() - started, 0.2 + feed.HEAD_TTL / 2)
+
+        rows, tail = read_feed(self.client, since=self.cursor, wait=5)
+        self.assertEqual([row['destination'] for row in rows], ['Qozon'])
+        self.assertEqual(tail['count'], 1)
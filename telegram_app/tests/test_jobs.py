@@ -0,0 +1,140 @@
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from telegram_app import artifacts, jobs
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel, ExportJob
+
+Status = ExportJob.Status
+
+
+def load_text(origin, destination):
+    return f"{origin} - {destination}\nГРУЗ: мебель\nТЕНТ 120\nНАХТ\nTel: +998 90 123 45 67"
+
+
+class TempDirsMixin:
+    def setUp(self):
+        cache_dir, jobs_dir = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.addCleanup(jobs_dir.cleanup)
+        settings = override_settings(EXPORT_CACHE_DIR=cache_dir.name, EXPORT_JOBS_DIR=jobs_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.jobs_dir = Path(jobs_dir.name)
+
+
+class JobLifecycleTests(TempDirsMixin, TestCase):
+    def submit(self, **kwargs):
+        return jobs.submit_export(start_worker=False, **kwargs)
+
+    def fake_runner(self, name='out.csv'):
+        def run(job, progress):
+            path = jobs.jobs_dir() / f"{job.id}_{job.lease}_{name}"
+            path.write_bytes(b'data')
+            return path, name
+        return run
+
+    def test_submit_deduplicates_unfinished_jobs(self):
+        first = self.submit(fmt='csv', params={'days': 1})
+        self.assertEqual(self.submit(fmt='csv', params={'days': 1}).id, first.id)
+        self.assertNotEqual(self.submit(fmt='csv', params={'days': 2}).id, first.id)
+
+    def test_shipments_job_file_survives_cache_eviction(self):
+        channel = Channel.objects.create(channel_id=1, title='test')
+        for i, city in enumerate(['Moskva', 'Qozon']):
+            save_message(channel, message_id=i, text=load_text('Toshkent', city), date=timezone.now())
+        job = self.submit(fmt='csv', params={'days': 1})
+        claimed = jobs.claim_next()
+        self.assertEqual((claimed.id, claimed.status), (job.id, Status.RUNNING))
+        self.assertTrue(claimed.lease)
+        # Ishlayotgan paytda qo'shilgan teng vazifa ham shu natija bilan yopiladi
+        twin = ExportJob.objects.create(kind=job.kind, fmt=job.fmt, params=job.params, dedup_key=job.dedup_key)
+
+        jobs.run_job(claimed)
+        job.refresh_from_db()
+        twin.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows, job.total_rows), (Status.DONE, 2, 2))
+        self.assertEqual((twin.status, twin.file_path), (Status.DONE, job.file_path))
+        self.assertEqual(Path(job.file_path).parent, self.jobs_dir)
+
+        artifacts.evict(max_bytes=0)
+        self.assertEqual(list(artifacts.cache_dir().iterdir()), [])
+        self.assertEqual(len(Path(job.file_path).read_text(encoding='utf-8').splitlines()), 3)
+
+    def test_failed_runner_marks_job_failed(self):
+        job = self.submit(kind='broken')
+        with mock.patch.dict(jobs.RUNNERS, broken=mock.Mock(side_effect=RuntimeError('disk full'))), \
+                self.assertLogs('telegram_app.jobs', 'ERROR'):
+            jobs.run_job(jobs.claim_next())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Status.FAILED, 'disk full'))
+
+    def test_requeued_job_cannot_be_finished_by_old_runner(self):
+        job = self.submit(kind='fake')
+        old = jobs.claim_next()
+        ExportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - jobs.STALE_AFTER * 2)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        new = jobs.claim_next()
+        self.assertNotEqual(new.lease, old.lease)
+
+        with mock.patch.dict(jobs.RUNNERS, fake=self.fake_runner()):
+            with self.assertLogs('telegram_app.jobs', 'WARNING'):
+                jobs.run_job(old)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.lease, job.file_path), (Status.RUNNING, new.lease, ''))
+            self.assertEqual(list(self.jobs_dir.iterdir()), [])
+            with self.assertRaises(jobs.LeaseLost):
+                jobs._progress_writer(old)(10)
+
+            jobs.run_job(new)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Status.DONE)
+        self.assertTrue(Path(job.file_path).exists())
+
+    def test_fresh_heartbeat_is_not_requeued(self):
+        self.submit(kind='fake')
+        jobs.claim_next()
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+    def test_cleanup_removes_expired_files(self):
+        self.submit(kind='fake')
+        with mock.patch.dict(jobs.RUNNERS, fake=self.fake_runner()):
+            jobs.run_job(jobs.claim_next())
+        job = ExportJob.objects.get()
+        self.assertEqual(jobs.cleanup_files(), 0)
+
+        ExportJob.objects.update(finished_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(jobs.cleanup_files(), 1)
+        self.assertFalse(Path(job.file_path).exists())
+        self.assertEqual(ExportJob.objects.get().file_path, '')
+
+        # Fayli o'chirilgan vazifani yuklash uni qayta navbatga qo'yadi
+        with mock.patch('telegram_app.views.submit_export', wraps=self.submit) as submit:
+            response = self.client.get(f'/exports/jobs/{job.id}/download/')
+        self.assertEqual(response.status_code, 302)
+        submit.assert_called_once()
+
+
+class HeartbeatTests(TempDirsMixin, TransactionTestCase):
+    def test_heartbeat_advances_without_progress(self):
+        beats = []
+
+        def slow(job, progress):
+            start = ExportJob.objects.get(id=job.id).heartbeat_at
+            time.sleep(0.5)
+            beats.append(ExportJob.objects.get(id=job.id).heartbeat_at > start)
+            path = jobs.jobs_dir() / 'slow.csv'
+            path.write_bytes(b'')
+            return path, 'slow.csv'
+
+        jobs.submit_export(kind='slow', start_worker=False)
+        with mock.patch.object(jobs, 'HEARTBEAT_INTERVAL', 0.05), mock.patch.dict(jobs.RUNNERS, slow=slow):
+            jobs.run_job(jobs.claim_next())
+        self.assertEqual(beats, [True])
+        self.assertEqual(ExportJob.objects.get().status, Status.DONE)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from telegram_app.lanes import _encode, compute_lane_matrix
+from telegram_app.models import Channel, Message, Shipment
+
+
+class EncodeTests(SimpleTestCase):
+    def test_spellings_share_a_code_and_most_frequent_is_label(self):
+        values = ["Farg'ona", 'fargʻona ', "FARG'ONA", 'Toshkent', None, '', "Farg'ona"]
+        totals = np.array([1, 5, 1, 2, 3, 1, 1])
+        labels, codes = _encode(values, totals)
+
+        self.assertEqual(sorted(labels.tolist()), ['-', 'Toshkent', 'fargʻona'])
+        self.assertEqual(len(set(codes[[0, 1, 2, 6]])), 1)
+        self.assertEqual(codes[4], codes[5])
+        self.assertEqual(labels[codes[3]], 'Toshkent')
+
+    def test_apostrophes_are_not_title_cased(self):
+        labels, _ = _encode(["farg'ona", "farg'ona", "Farg'ona"], np.array([1, 1, 1]))
+        self.assertEqual(labels.tolist(), ["farg'ona"])
+
+
+class LaneMatrixTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.first = Channel.objects.create(channel_id=1, title='birinchi')
+        self.second = Channel.objects.create(channel_id=2, title='ikkinchi')
+        lanes = [
+            (self.first, "Farg'ona", 'Moskva', 3),
+            (self.first, "FARGʻONA", 'moskva', 1),
+            (self.first, 'Toshkent', 'Qozon', 2),
+            (self.second, 'Toshkent', 'Moskva', 1),
+            (self.second, None, 'Qozon', 1),
+        ]
+        i = 0
+        for channel, origin, destination, count in lanes:
+            for _ in range(count):
+                i += 1
+                message = Message.objects.create(channel=channel, message_id=i, text='x', date=self.now)
+                Shipment.objects.create(message=message, origin=origin, destination=destination)
+        old = Message.objects.create(channel=self.first, message_id=999, text='x', date=self.now - timedelta(days=90))
+        Shipment.objects.create(message=old, origin='Buxoro', destination='Qozon')
+        self.start, self.end = self.now - timedelta(days=1), self.now + timedelta(days=1)
+
+    def test_matrix_merges_spellings(self):
+        matrix = compute_lane_matrix(self.start, self.end)
+
+        self.assertEqual(matrix['total'], 8)
+        self.assertEqual(matrix['origins'], ['-', "Farg'ona", 'Toshkent'])
+        self.assertEqual(matrix['destinations'], ['Moskva', 'Qozon'])
+        self.assertEqual(matrix['top_lanes'][0], {'origin': "Farg'ona", 'destination': 'Moskva', 'total': 4})
+        cells = {
+            (matrix['origins'][r], matrix['destinations'][c]): v
+            for r, c, v in zip(matrix['matrix']['rows'], matrix['matrix']['cols'], matrix['matrix']['values'])
+        }
+        self.assertEqual(cells, {
+            ("Farg'ona", 'Moskva'): 4, ('Toshkent', 'Qozon'): 2, ('Toshkent', 'Moskva'): 1, ('-', 'Qozon'): 1,
+        })
+        self.assertEqual(sum(map(sum, matrix['heatmap']['cells'])), 8)
+        self.assertEqual(matrix['heatmap']['max'], 4)
+
+    def test_channel_filter_and_top_k(self):
+        matrix = compute_lane_matrix(self.start, self.end, [2], top_k=1)
+        self.assertEqual(matrix['total'], 2)
+        self.assertEqual(len(matrix['top_lanes']), 1)
+
+        empty = compute_lane_matrix(self.start, self.end, [3])
+        self.assertEqual((empty['total'], empty['top_lanes'], empty['matrix']['shape']), (0, [], [0, 0]))
+
+    def test_api_uses_cache(self):
+        params = {'date_from': timezone.localdate(self.now).isoformat(), 'channels': '1,x', 'top': '5'}
+        response = self.client.get('/api/lanes/matrix/', params)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['channels'], [1])
+        self.assertEqual(response.json()['total'], 6)
+        self.assertEqual(self.client.get('/api/lanes/matrix/', params)['X-Cache'], 'HIT')
@@ -0,0 +1,67 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from telegram_app import jobs
+from telegram_app.models import TelegramMessage
+from telegram_app.utils import save_messages_json
+
+CITIES = ['Moskva', 'Qozon', 'Samara', 'Omsk', 'Tver']
+
+
+def load_text(origin, destination):
+    return f"{origin} - {destination}\nГРУЗ: мебель\nТЕНТ 120\nНАХТ\nTel: +998 90 123 45 67"
+
+
+class MessagesJsonTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        for i, city in enumerate(CITIES):
+            TelegramMessage.objects.create(
+                message_id=i, text=load_text('Toshkent', city), date=timezone.now(), user_id=7, channel_id=1,
+            )
+
+    def test_lines_are_written_in_chunks(self):
+        path, done = os.path.join(self.tmp, 'out.jsonl'), []
+        self.assertEqual(save_messages_json(path, chunk_size=2, progress=done.append), (5, 5))
+        self.assertEqual(done, [2, 4, 5])
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row['destination'] for row in rows], CITIES)
+        self.assertEqual((rows[0]['channel_id'], rows[0]['user_id']), (1, 7))
+        self.assertEqual(os.listdir(self.tmp), ['out.jsonl'])
+
+    def test_gzip_matches_plain(self):
+        plain, packed = os.path.join(self.tmp, 'a.jsonl'), os.path.join(self.tmp, 'a.jsonl.gz')
+        save_messages_json(plain)
+        save_messages_json(packed, compress=True)
+        with open(plain, 'rb') as f, gzip.open(packed) as g:
+            self.assertEqual(g.read(), f.read())
+
+    def test_endpoint_queues_job_and_reports_status(self):
+        with override_settings(EXPORT_JOBS_DIR=self.tmp), mock.patch.object(jobs, 'ensure_worker') as worker:
+            response = self.client.post('/export-json/', {'gzip': '1'})
+            self.assertEqual(response.status_code, 202)
+            body = response.json()
+            self.assertEqual((body['status'], body['total']), ('pending', 0))
+            worker.assert_called_once()
+            # Takroriy so'rov yangi vazifa yaratmaydi
+            self.assertEqual(self.client.post('/export-json/', {'gzip': '1'}).json()['id'], body['id'])
+
+            jobs.work(once=True)
+            done = self.client.get(body['status_url']).json()
+            self.assertEqual((done['status'], done['current'], done['total']), ('done', 5, 5))
+            download = self.client.get(done['download_url'])
+        lines = gzip.decompress(b''.join(download.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 5)
+
+    def test_status_without_job_is_400(self):
+        self.assertEqual(self.client.get('/export-json/').status_code, 400)
+        self.assertEqual(self.client.get('/export-json/', {'job': '999'}).status_code, 404)
@@ -0,0 +1,133 @@
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from telegram_app import outbox
+from telegram_app.models import OutboundMessage
+
+
+class FakeBot:
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        if self.error:
+            raise self.error
+        self.sent.append((chat_id, text))
+
+
+class OutboxCoalesceTests(SimpleTestCase):
+    def test_small_messages_are_joined(self):
+        chunks = outbox.coalesce([(1, 'a'), (2, 'b'), (3, 'c')])
+        self.assertEqual(chunks, [([1, 2, 3], outbox.DIGEST_SEPARATOR.join('abc'))])
+
+    def test_chunks_stay_within_limit(self):
+        messages = [(pk, 'x' * 1500) for pk in range(10)]
+        chunks = outbox.coalesce(messages)
+        self.assertTrue(all(len(text) <= outbox.MAX_TEXT for _, text in chunks))
+        self.assertEqual([pk for ids, _ in chunks for pk in ids], list(range(10)))
+
+    def test_long_message_is_truncated(self):
+        [(ids, text)] = outbox.coalesce([(1, 'y' * (outbox.MAX_TEXT + 100))])
+        self.assertEqual(len(text), outbox.MAX_TEXT)
+        self.assertTrue(text.endswith('…'))
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_token_bucket_refills(self):
+        bucket = outbox.TokenBucket(rate=2, capacity=1)
+        self.assertEqual(bucket.wait_time(), 0)
+        bucket.tokens -= 1
+        self.assertAlmostEqual(bucket.wait_time(), 0.5, places=1)
+
+    def test_groups_use_group_limit_and_pause_is_per_chat(self):
+        limiter = outbox.RateLimiter()
+        self.assertEqual(limiter._bucket(-20).rate, outbox.GROUP_RATE)
+        self.assertEqual(limiter._bucket(10).rate, outbox.CHAT_RATE)
+        limiter.pause(10, 30)
+        self.assertFalse(limiter.ready(10))
+        self.assertTrue(limiter.ready(11))
+
+
+class OutboxQueueTests(TestCase):
+    def setUp(self):
+        # Har test o'z limitlari bilan: RetryAfter pauzasi boshqa testga o'tmaydi
+        patcher = mock.patch.object(outbox, 'limiter', outbox.RateLimiter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queued(self, chat_id=10, count=2):
+        return [outbox.enqueue(chat_id, f'xabar {i}').id for i in range(count)]
+
+    def statuses(self, ids):
+        return set(OutboundMessage.objects.filter(id__in=ids).values_list('status', flat=True))
+
+    def test_retry_backs_off_then_fails(self):
+        ids = self.queued()
+        outbox.retry(ids, 'timeout')
+        rows = OutboundMessage.objects.filter(id__in=ids)
+        self.assertTrue(all(row.attempts == 1 and row.error == 'timeout' for row in rows))
+        self.assertTrue(all(row.available_at > timezone.now() for row in rows))
+        self.assertEqual(outbox.due_by_chat(), {})
+
+        for _ in range(outbox.MAX_ATTEMPTS - 1):
+            outbox.retry(ids, 'timeout')
+        self.assertEqual(self.statuses(ids), {outbox.Status.FAILED})
+
+    def test_defer_does_not_count_attempt(self):
+        ids = self.queued()
+        outbox.defer(ids, 30)
+        row = OutboundMessage.objects.get(id=ids[0])
+        self.assertEqual(row.attempts, 0)
+        self.assertGreater(row.available_at, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(outbox.due_by_chat(), {})
+
+    def test_due_by_chat_groups_pending(self):
+        first = self.queued(chat_id=10)
+        second = self.queued(chat_id=-20, count=1)
+        due = outbox.due_by_chat()
+        self.assertEqual({chat: [pk for pk, _ in items] for chat, items in due.items()}, {10: first, -20: second})
+
+    def test_deliver_sends_one_digest(self):
+        ids = self.queued(chat_id=1001, count=3)
+        bot = FakeBot()
+        sent = async_to_sync(outbox.deliver)(bot, 1001, outbox.due_by_chat()[1001])
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(bot.sent), 1)
+        self.assertEqual(self.statuses(ids), {outbox.Status.SENT})
+
+    def test_deliver_defers_on_retry_after(self):
+        ids = self.queued(chat_id=1002)
+        sent = async_to_sync(outbox.deliver)(FakeBot(error=RetryAfter(30)), 1002, outbox.due_by_chat()[1002])
+        self.assertEqual(sent, 0)
+        self.assertGreater(outbox.limiter.paused_for(1002), 0)
+        rows = OutboundMessage.objects.filter(id__in=ids)
+        self.assertEqual(set(rows.values_list('status', 'attempts')), {(outbox.Status.PENDING, 0)})
+        self.assertEqual(outbox.due_by_chat(), {})
+
+    def test_forbidden_fails_whole_chat(self):
+        ids = self.queued(chat_id=1003)
+        async_to_sync(outbox.deliver)(FakeBot(error=Forbidden('bot was blocked')), 1003, outbox.due_by_chat()[1003])
+        self.assertEqual(self.statuses(ids), {outbox.Status.FAILED})
+
+    def test_bad_request_fails_without_retry(self):
+        ids = self.queued(chat_id=1004, count=1)
+        async_to_sync(outbox.deliver)(FakeBot(error=BadRequest('chat not found')), 1004, outbox.due_by_chat()[1004])
+        self.assertEqual(self.statuses(ids), {outbox.Status.FAILED})
+        self.assertEqual(OutboundMessage.objects.get(id=ids[0]).attempts, 0)
+
+    def test_stats_and_prune(self):
+        ids = self.queued(count=3)
+        outbox.mark_sent(ids[:2])
+        OutboundMessage.objects.filter(id=ids[0]).update(sent_at=timezone.now() - outbox.PRUNE_AFTER * 2)
+        stats = outbox.stats()
+        self.assertEqual((stats['depth'], stats['sent_last_hour']), (1, 1))
+        self.assertIsNotNone(stats['latency_p95'])
+
+        self.assertEqual(outbox.prune(), 1)
+        self.assertFalse(OutboundMessage.objects.filter(id=ids[0]).exists())
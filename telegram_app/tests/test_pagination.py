@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from telegram_app.models import Channel, Message
+from telegram_app.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        channel = Channel.objects.create(channel_id=1, title='test')
+        base = timezone.now().replace(microsecond=0)
+        # Har ikki xabar bir xil sanada: tartib id bo'yicha davom etishi kerak
+        for i in range(25):
+            Message.objects.create(channel=channel, message_id=i, text='x', date=base - timedelta(minutes=i // 2))
+        Message.objects.create(channel=channel, message_id=100, text='sanasiz', date=None)
+        self.expected = list(
+            Message.objects.filter(date__isnull=False).order_by('-date', '-id').values_list('id', flat=True)
+        )
+        self.factory = RequestFactory()
+
+    def page(self, **params):
+        request = self.factory.get('/messages/', params)
+        return keyset_paginate(request, Message.objects.all(), per_page=10)
+
+    def test_forward_walk_covers_all_rows_once(self):
+        seen, page = [], self.page()
+        while True:
+            seen.extend(msg.id for msg in page.object_list)
+            if not page.has_next:
+                break
+            page = self.page(after=page.next_cursor)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(page.approx_total, 25)
+
+    def test_before_cursor_returns_previous_page(self):
+        first = self.page()
+        second = self.page(after=first.next_cursor)
+        back = self.page(before=second.prev_cursor)
+        self.assertEqual([msg.id for msg in back.object_list], self.expected[:10])
+        self.assertFalse(back.has_previous)
+        self.assertTrue(back.has_next)
+
+    def test_cursor_roundtrip_and_garbage(self):
+        date = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(date, 42)), (date, 42))
+        for garbage in ('', 'abc', encode_cursor(date, 1)[:-3], 'WzEsMl0'):
+            self.assertIsNone(decode_cursor(garbage))
+
+    def test_next_url_keeps_filters(self):
+        page = self.page(search='tosh')
+        self.assertIn('search=tosh', page.next_url)
+        self.assertIn('after=', page.next_url)
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel
+from telegram_app.search import parse_query, rebuild_city_index, resolve_city, search_shipments
+
+
+def load_text(origin, destination, phone='+998 90 123 45 67'):
+    return f"{origin} - {destination}\nГРУЗ: мебель\nТЕНТ 120\nНАХТ\nTel: {phone}"
+
+
+class ParseQueryTests(SimpleTestCase):
+    def test_phone_queries(self):
+        self.assertEqual(parse_query('90 123 45'), ('phone', ('9012345', '9989012345')))
+        self.assertEqual(parse_query('+998 90 12'), ('phone', ('9989012',)))
+        self.assertEqual(parse_query('+7 912 345'), ('phone', ('7912345', '9987912345')))
+        self.assertEqual(parse_query('@Ali_Logist'), ('phone', ('@ali_logist',)))
+
+    def test_route_and_city_queries(self):
+        self.assertEqual(parse_query('Toshkent - Moskva'), ('route', ('toshkent', 'moskva')))
+        self.assertEqual(parse_query("FARGʻONA"), ('city', 'fargona'))
+        self.assertEqual(parse_query('  '), (None, None))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        self.loads = [('Toshkent', 'Moskva', '+998 90 123 45 67'), ('Toshkent', 'Qozon', '+7 912 345 67 89')]
+        for i, (origin, destination, phone) in enumerate(self.loads):
+            self.ingest(i, origin, destination, phone)
+
+    def ingest(self, message_id, origin, destination, phone='+998 90 123 45 67'):
+        save_message(
+            self.channel, message_id=message_id, text=load_text(origin, destination, phone), date=timezone.now(),
+        )
+
+    def search(self, text):
+        return [row['destination'] for row in search_shipments(text)[0]]
+
+    def test_foreign_and_local_numbers_are_found(self):
+        self.assertEqual(self.search('+7 912 345'), ['Qozon'])
+        self.assertEqual(self.search('90 123 45'), ['Moskva'])
+        self.assertEqual(self.search('998901'), ['Moskva'])
+
+    def test_city_index_is_read_only_on_query(self):
+        # Lug'at hali qurilmagan: so'rov uni hisoblamaydi, faqat aniq kalit ishlatiladi
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_city('tosh'), ['tosh'])
+        self.assertEqual(self.search('Toshkent'), ['Qozon', 'Moskva'])
+
+        self.assertEqual(rebuild_city_index(), 3)
+        self.assertEqual(resolve_city('tosh'), ['toshkent', 'tosh'])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search('Tosh'), ['Qozon', 'Moskva'])
+        self.assertFalse([q['sql'] for q in queries if 'GROUP BY' in q['sql']])
+
+    def test_ingest_adds_new_cities(self):
+        rebuild_city_index()
+        self.ingest(10, 'Samarqand', 'Moskva')
+        self.assertEqual(resolve_city('sam'), ['samarqand', 'sam'])
+        self.assertEqual(self.search('Sam'), ['Moskva'])
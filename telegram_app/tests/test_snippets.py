@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from telegram_app.snippets import MARK_CLOSE, MARK_OPEN, build_snippet, get_matcher
+
+
+class SnippetTests(SimpleTestCase):
+    def test_text_is_escaped_and_keywords_marked(self):
+        snippet = build_snippet('<b>Toshkent</b> -> Moskva & "Qozon"', get_matcher(['toshkent']))
+        self.assertIn(MARK_OPEN + 'Toshkent' + MARK_CLOSE, snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+        self.assertIn('&amp;', snippet)
+        self.assertNotIn('<b>', snippet)
+
+    def test_keyword_html_is_escaped(self):
+        snippet = build_snippet('yuk <script>', get_matcher(['<script>']))
+        self.assertIn(MARK_OPEN + '&lt;script&gt;' + MARK_CLOSE, snippet)
+
+    def test_regex_characters_are_literal(self):
+        self.assertIsNone(get_matcher(['', '  ']))
+        snippet = build_snippet('narx 1+1 yoki 11', get_matcher(['1+1']))
+        self.assertEqual(snippet.count(MARK_OPEN), 1)
+
+    def test_longer_keyword_wins(self):
+        snippet = build_snippet('Toshkentdan', get_matcher(['tosh', 'toshkent']))
+        self.assertIn(MARK_OPEN + 'Toshkent' + MARK_CLOSE, snippet)
+
+    def test_without_matcher_or_match(self):
+        self.assertEqual(build_snippet('<i>yuk</i>', None), '&lt;i&gt;yuk&lt;/i&gt;')
+        self.assertEqual(build_snippet('a' * 200, get_matcher(['zzz'])), 'a' * 120 + '…')
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.db.models import Count, Max, Min
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from telegram_app import stats
+from telegram_app.models import Channel, Message, Shipment
+
+ROUTES = [('Toshkent', 'Moskva'), ('Buxoro', 'Qozon'), ('Toshkent', None), (None, None)]
+CARGO = ['mebel', 'un', None]
+TRUCKS = ['tent', 'ref']
+PAYMENTS = ['naqd', 'perechisleniya', None, 'naqd']
+
+
+def reference_stats(shipments):
+    """Eski usul: har bir o'lchov uchun alohida GROUP BY."""
+    result = {'total': shipments.count()}
+    dates = shipments.aggregate(oldest=Min('message__date'), newest=Max('message__date'))
+    result.update(dates)
+    for name, fields in stats.DIMENSIONS.items():
+        rows = shipments.order_by().values(*fields).annotate(total=Count('id'))
+        result[name] = sorted(rows, key=lambda row: (row['total'], *map(str, row.values())), reverse=True)
+    return result
+
+
+def canonical(result):
+    # Teng `total` li qatorlar tartibi belgilanmagan
+    return {
+        key: sorted(value, key=lambda row: sorted(map(str, row.items()))) if isinstance(value, list) else value
+        for key, value in result.items()
+    }
+
+
+class GroupingBitmaskTests(SimpleTestCase):
+    def test_ungrouped_columns_are_set(self):
+        # COLUMNS = origin, destination, cargo_type, truck_type, payment_type
+        self.assertEqual(stats._grouping_bitmask(('origin', 'destination')), 0b00111)
+        self.assertEqual(stats._grouping_bitmask(('payment_type',)), 0b11110)
+        masks = {stats._grouping_bitmask(fields) for fields in stats.DIMENSIONS.values()}
+        self.assertEqual(len(masks), len(stats.DIMENSIONS))
+        self.assertNotIn(0b11111, masks)
+
+
+class ChannelStatsTests(TestCase):
+    def setUp(self):
+        self.channel = Channel.objects.create(channel_id=1, title='test')
+        other = Channel.objects.create(channel_id=2, title='boshqa')
+        now = timezone.now()
+        for i in range(40):
+            channel = other if i % 10 == 0 else self.channel
+            message = Message.objects.create(
+                channel=channel, message_id=i, text=f'yuk {i}', date=now - timedelta(hours=i),
+            )
+            origin, destination = ROUTES[i % len(ROUTES)]
+            Shipment.objects.create(
+                message=message, origin=origin, destination=destination, cargo_type=CARGO[i % 3],
+                truck_type=TRUCKS[i % 2], payment_type=PAYMENTS[i % 4],
+            )
+        self.shipments = Shipment.objects.filter(message__channel=self.channel)
+
+    def test_scan_matches_separate_aggregations(self):
+        with self.assertNumQueries(1):
+            result = stats._compute_scan(self.shipments, chunk_size=7)
+        self.assertEqual(result['total'], 36)
+        self.assertEqual(canonical(result), canonical(reference_stats(self.shipments)))
+        totals = [row['total'] for row in result['route']]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+
+    def test_empty_queryset(self):
+        result = stats.compute_channel_stats(Shipment.objects.none())
+        self.assertEqual((result['total'], result['oldest'], result['newest']), (0, None, None))
+        self.assertEqual(result['cargo'], [])
+
+    def test_grouping_sets_rows_are_decoded(self):
+        # PostgreSQL javobini mos GROUPING bitmask lari bilan taqlid qilamiz
+        reference = reference_stats(self.shipments)
+        rows = [(None,) * len(stats.COLUMNS) + (0b11111, reference['total'], reference['oldest'], reference['newest'])]
+        for name, fields in stats.DIMENSIONS.items():
+            for row in reference[name]:
+                values = tuple(row.get(column) for column in stats.COLUMNS)
+                rows.append(values + (stats._grouping_bitmask(fields), row['total'], None, None))
+
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchall.return_value = rows
+        with mock.patch.object(stats.connection, 'cursor', return_value=cursor):
+            result = stats._compute_postgres(self.shipments)
+
+        sql = cursor.__enter__.return_value.execute.call_args.args[0]
+        self.assertIn('GROUPING SETS ((origin, destination), (cargo_type), (truck_type), (payment_type), ())', sql)
+        self.assertEqual(canonical(result), canonical(stats._compute_scan(self.shipments)))
+
+    @skipUnless(connection.vendor == 'postgresql', 'GROUPING SETS faqat PostgreSQL da')
+    def test_grouping_sets_match_scan(self):
+        with self.assertNumQueries(1):
+            result = stats._compute_postgres(self.shipments)
+        self.assertEqual(canonical(result), canonical(stats._compute_scan(self.shipments)))
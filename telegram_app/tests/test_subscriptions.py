@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from telegram_app import subscriptions
+from telegram_app.ingest import save_message
+from telegram_app.models import Channel, OutboundMessage
+from telegram_app.subscriptions import SubscriptionIndex, parse_subscription, truck_category
+
+
+def load_text(origin, destination, truck='ТЕНТ 120'):
+    return f"{origin} - {destination}\nГРУЗ: мебель\n{truck}\nНАХТ\nTel: +998 90 123 45 67"
+
+
+class SubscriptionParseTests(SimpleTestCase):
+    def test_route_with_truck(self):
+        self.assertEqual(parse_subscription(["Farg'ona", '*', 'ref']), ('fargona', None, 'ref'))
+        self.assertEqual(parse_subscription(['Toshkent', '→', 'Moskva']), ('toshkent', 'moskva', None))
+        self.assertEqual(parse_subscription(['istalgan', 'Qozon', 'TENT']), (None, 'qozon', 'tent'))
+
+    def test_origin_only(self):
+        self.assertEqual(parse_subscription(['Buxoro']), ('buxoro', None, None))
+        self.assertEqual(parse_subscription(['Buxoro', 'ref']), ('buxoro', None, 'ref'))
+
+    def test_invalid(self):
+        for args in ([], ['*', '*'], ['*', '-', 'any'], ['A', 'B', 'samolyot'], ['A', 'B', 'C', 'D']):
+            with self.assertRaises(ValueError):
+                parse_subscription(args)
+
+    def test_truck_category(self):
+        self.assertEqual(truck_category('РЕФ 96'), 'ref')
+        self.assertEqual(truck_category('ФУРА тент'), 'tent')
+        self.assertIsNone(truck_category('velosiped'))
+        self.assertIsNone(truck_category(None))
+
+
+class SubscriptionIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SubscriptionIndex()
+        self.index.apply(1, 100, ('fargona', None, 'ref'), True)
+        self.index.apply(2, 200, ('fargona', 'moskva', None), True)
+        self.index.apply(3, 300, (None, None, 'tent'), True)
+
+    def test_match_uses_wildcards(self):
+        self.assertEqual(self.index.match('fargona', 'moskva', 'ref'), {100, 200})
+        self.assertEqual(self.index.match('fargona', 'qozon', 'tent'), {300})
+        self.assertEqual(self.index.match('toshkent', 'moskva', None), set())
+
+    def test_apply_moves_and_removes(self):
+        self.index.apply(2, 200, ('toshkent', 'moskva', None), True)
+        self.assertEqual(self.index.match('fargona', 'moskva', None), set())
+        self.assertEqual(self.index.match('toshkent', 'moskva', None), {200})
+
+        self.index.apply(3, 300, None, False)
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.match('andijon', 'qozon', 'tent'), set())
+
+
+
+
+class SubscriptionAlertTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(subscriptions, 'index', SubscriptionIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.channel = Channel.objects.create(channel_id=1, title='Yuklar')
+
+    def ingest(self, message_id, origin, destination, truck='ТЕНТ 120', date=None):
+        save_message(
+            self.channel, message_id=message_id, text=load_text(origin, destination, truck),
+            date=date or timezone.now(),
+        )
+
+    def alerts(self):
+        return list(OutboundMessage.objects.order_by('id').values_list('chat_id', 'text'))
+
+    def test_matching_shipment_is_queued_once_per_chat(self):
+        subscriptions.subscribe(100, 'toshkent', None, 'ref')
+        subscriptions.subscribe(200, None, 'moskva', None)
+        self.ingest(1, 'Toshkent', 'Moskva', truck='РЕФ 96')
+
+        alerts = dict(self.alerts())
+        self.assertEqual(sorted(alerts), [100, 200])
+        self.assertIn('Toshkent → Moskva', alerts[100])
+        self.assertIn('Yuklar', alerts[100])
+
+        self.ingest(2, 'Toshkent', 'Qozon')
+        self.assertEqual(len(self.alerts()), 2)
+
+    def test_old_messages_are_not_alerted(self):
+        subscriptions.subscribe(100, 'toshkent', None, None)
+        self.ingest(1, 'Toshkent', 'Moskva', date=timezone.now() - subscriptions.NOTIFY_MAX_AGE * 2)
+        self.assertEqual(self.alerts(), [])
+
+    def test_other_process_index_follows_updates(self):
+        other = SubscriptionIndex()
+        subscription = subscriptions.subscribe(100, 'toshkent', None, None)
+        other.sync(force=True)
+        self.assertEqual(other.match('toshkent', 'moskva', None), {100})
+
+        self.assertTrue(subscriptions.unsubscribe(100, subscription.id))
+        self.assertFalse(subscriptions.unsubscribe(100, subscription.id))
+        other.sync(force=True)
+        self.assertEqual(other.match('toshkent', 'moskva', None), set())
+        self.assertEqual(subscriptions.chat_subscriptions(100), [])
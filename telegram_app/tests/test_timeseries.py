@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from telegram_app.models import Channel, Message, Shipment
+from telegram_app.timeseries import (
+    MAX_BUCKETS, RangeTooLarge, bucket_count, check_range, compute_timeseries, downsample,
+)
+from telegram_app.utils import resolve_date_range
+
+
+class BucketLimitTests(SimpleTestCase):
+    def test_bucket_count_and_limit(self):
+        start, end, _, _ = resolve_date_range('2024-01-01', '2024-01-31')
+        self.assertEqual(bucket_count(start, end, 'day'), 31)
+        self.assertEqual(bucket_count(start, end, 'hour'), 31 * 24)
+        check_range(start, end, 'hour')
+
+        start, end, _, _ = resolve_date_range('2000-01-01', '2024-01-01')
+        self.assertGreater(bucket_count(start, end, 'hour'), MAX_BUCKETS)
+        with self.assertRaises(RangeTooLarge):
+            check_range(start, end, 'hour')
+        check_range(start, end, 'day')
+
+    def test_downsample_keeps_total(self):
+        buckets, counts = list(range(10)), [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        self.assertEqual(downsample(buckets, counts, 20), (buckets, counts, 1))
+        small_buckets, small_counts, step = downsample(buckets, counts, 4)
+        self.assertEqual((small_buckets, small_counts, step), ([0, 3, 6, 9], [6, 15, 24, 10], 3))
+
+
+class TimeseriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        channel = Channel.objects.create(channel_id=1, title='test')
+        self.start, self.end, _, _ = resolve_date_range('2024-03-01', '2024-03-10')
+        for day, count in [(0, 2), (3, 1), (9, 4)]:
+            for i in range(count):
+                message = Message.objects.create(
+                    channel=channel, message_id=day * 10 + i, text='x', date=self.start + timedelta(days=day, hours=i),
+                )
+                Shipment.objects.create(message=message, origin='Toshkent', destination='Moskva' if i else 'Qozon')
+
+    def test_empty_buckets_are_zero_filled(self):
+        series = compute_timeseries(self.start, self.end, 'day', {}, 200)
+        self.assertEqual([p['count'] for p in series['points']], [2, 0, 0, 1, 0, 0, 0, 0, 0, 4])
+        self.assertEqual(series['total'], 7)
+
+        filtered = compute_timeseries(self.start, self.end, 'day', {'destination': 'moskva'}, 5)
+        self.assertEqual(filtered['bucket_size'], 2)
+        self.assertEqual([p['count'] for p in filtered['points']], [1, 0, 0, 0, 3])
+
+    def test_too_many_buckets_is_400_without_query(self):
+        params = {'interval': 'hour', 'date_from': '2000-01-01', 'date_to': '2024-01-01'}
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/shipments/timeseries/', params)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(MAX_BUCKETS), response.json()['error'])
+
+    def test_etag_and_cache(self):
+        params = {'date_from': '2024-03-01', 'date_to': '2024-03-10'}
+        response = self.client.get('/api/shipments/timeseries/', params)
+        self.assertEqual((response.status_code, response['X-Cache'], response.json()['total']), (200, 'MISS', 7))
+
+        again = self.client.get('/api/shipments/timeseries/', params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from telegram_app.utils import InvalidDateRange, resolve_date_range
+
+BAD_DATES = ['2024-02-30', '2024-13-01', 'abc']
+
+
+class ResolveDateRangeTests(SimpleTestCase):
+    def test_defaults_and_exclusive_end(self):
+        start, end, date_from, date_to = resolve_date_range(None, '2024-03-10', default_days=7)
+        self.assertEqual((date_from, date_to), (date(2024, 3, 4), date(2024, 3, 10)))
+        self.assertEqual(end - start, timedelta(days=7))
+        self.assertEqual(resolve_date_range('', '')[3], timezone.localdate())
+
+    def test_invalid_dates_raise(self):
+        for value in BAD_DATES:
+            with self.subTest(value=value):
+                with self.assertRaisesMessage(InvalidDateRange, 'date_from'):
+                    resolve_date_range(value, None)
+                with self.assertRaisesMessage(InvalidDateRange, 'date_to'):
+                    resolve_date_range(None, value)
+        # Oxirgi kundan keyingi kun datetime chegarasidan tashqarida
+        with self.assertRaises(InvalidDateRange):
+            resolve_date_range(None, '9999-12-31')
+
+
+class DateParamEndpointTests(TestCase):
+    def test_bad_dates_are_400(self):
+        for url in ['/api/lanes/matrix/', '/lanes/', '/api/shipments/timeseries/', '/api/v1/shipments/', '/api/v1/messages/']:
+            params = [(param, value) for param in ('date_from', 'date_to') for value in BAD_DATES]
+            for param, value in params + [('date_to', '9999-12-31')]:
+                with self.subTest(url=url, param=param, value=value):
+                    self.assertEqual(self.client.get(url, {param: value}).status_code, 400)
+
+    def test_valid_dates_are_200(self):
+        for url in ['/api/lanes/matrix/', '/lanes/', '/api/shipments/timeseries/', '/api/v1/shipments/']:
+            response = self.client.get(url, {'date_from': '2024-02-01', 'date_to': '2024-02-29'})
+            self.assertEqual(response.status_code, 200, url)
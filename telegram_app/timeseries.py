@@ -0,0 +1,140 @@
+"""
+Yuklar soni vaqt bo'yicha (soat / kun / hafta) - grafiklar uchun.
+
+Bitta GROUP BY so'rovi: Trunc(message__date) bo'yicha Count. Bo'sh
+intervallar nol bilan to'ldiriladi (ko'pi bilan MAX_BUCKETS ta), nuqtalar soni `points` dan oshsa
+qo'shni intervallar yig'indisi bilan kichraytiriladi (jami saqlanadi).
+Natija versiyalangan kesh kalitida saqlanadi, ETag ham shu kalitdan
+olinadi - o'zgarmagan ma'lumotga 304 so'rovsiz qaytadi.
+"""
+import math
+import time
+from datetime import timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+
+from .caching import get_or_compute, make_key
+from .contacts import normalize_phone
+from .models import Shipment
+
+TIMESERIES_CACHE_TTL = 300
+# Kesh namespace: ingest yangi yuk yozganda versiyasi oshiriladi
+TIMESERIES_NAMESPACE = 'timeseries'
+DEFAULT_POINTS = 200
+MAX_POINTS = 2000
+# To'ldirish sikli va javob hajmi chegarasi (soatlik ~2 yil, kunlik ~50 yil)
+MAX_BUCKETS = 20000
+
+INTERVALS = {
+    'hour': (TruncHour, timedelta(hours=1)),
+    'day': (TruncDay, timedelta(days=1)),
+    'week': (TruncWeek, timedelta(weeks=1)),
+}
+
+# GET parametri -> Shipment filtri
+FILTERS = {
+    'origin': 'origin__iexact',
+    'destination': 'destination__iexact',
+    'channel': 'message__channel__channel_id',
+    'cargo_type': 'cargo_type',
+}
+
+
+class RangeTooLarge(ValueError):
+    pass
+
+
+def clean_filters(params) -> dict:
+    filters = {name: params.get(name).strip() for name in FILTERS if params.get(name, '').strip()}
+    if params.get('phone', '').strip():
+        filters['phone'] = normalize_phone(params['phone'])
+    return filters
+
+
+def _bucket_start(value, interval):
+    if interval == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == 'week':
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def bucket_count(start, end, interval):
+    return max(0, math.ceil((end - _bucket_start(start, interval)) / INTERVALS[interval][1]))
+
+
+def check_range(start, end, interval):
+    """Intervallar soni MAX_BUCKETS dan oshsa RangeTooLarge."""
+    count = bucket_count(start, end, interval)
+    if count > MAX_BUCKETS:
+        raise RangeTooLarge(
+            f"Oraliq juda katta: {count} ta '{interval}' interval (ko'pi bilan {MAX_BUCKETS}). "
+            f"Qisqaroq oraliq yoki kattaroq interval tanlang."
+        )
+
+
+def downsample(buckets, counts, points):
+    """Qo'shni intervallarni yig'ib, nuqtalar sonini `points` gacha kamaytirish."""
+    if len(counts) <= points:
+        return buckets, counts, 1
+    step = math.ceil(len(counts) / points)
+    return (
+        buckets[::step],
+        [sum(counts[i:i + step]) for i in range(0, len(counts), step)],
+        step,
+    )
+
+
+def compute_timeseries(start, end, interval, filters, points):
+    check_range(start, end, interval)
+    started = time.perf_counter()
+    trunc, delta = INTERVALS[interval]
+
+    shipments = Shipment.objects.filter(message__date__gte=start, message__date__lt=end)
+    for name, value in filters.items():
+        if name == 'phone':
+            shipments = shipments.filter(contact__phone=value)
+        else:
+            shipments = shipments.filter(**{FILTERS[name]: value})
+
+    rows = (
+        shipments
+        .annotate(bucket=trunc('message__date'))
+        .values('bucket')
+        .annotate(total=Count('id'))
+        .order_by('bucket')
+    )
+    totals = {row['bucket']: row['total'] for row in rows}
+
+    # Bo'sh intervallarni nol bilan to'ldirish
+    buckets, counts = [], []
+    current = _bucket_start(start, interval)
+    while current < end:
+        buckets.append(current)
+        counts.append(totals.get(current, 0))
+        current += delta
+
+    buckets, counts, step = downsample(buckets, counts, points)
+    return {
+        'interval': interval,
+        'bucket_size': step,
+        'points': [{'t': b.isoformat(), 'count': c} for b, c in zip(buckets, counts)],
+        'total': sum(counts),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def timeseries_key(start, end, interval, filters, points) -> str:
+    return make_key(TIMESERIES_NAMESPACE, start.isoformat(), end.isoformat(), interval, sorted(filters.items()), points)
+
+
+def get_timeseries(start, end, interval, filters, points):
+    """Keshlangan vaqt qatori. Qaytaradi: (natija, hit)"""
+    # Juda katta oraliq bazaga (kesh versiyasiga ham) murojaatsiz rad etiladi
+    check_range(start, end, interval)
+    key = timeseries_key(start, end, interval, filters, points)
+    return get_or_compute(
+        'timeseries', key, lambda: compute_timeseries(start, end, interval, filters, points), TIMESERIES_CACHE_TTL
+    )
@@ -1,7 +1,7 @@
 # telegram_app/urls.py
 
 from django.urls import path
-from . import views, auth_views
+from . import views, auth_views, api
 from .exports import export_to_excel, export_to_json
 
 urlpatterns = [
@@ -49,10 +49,30 @@ urlpatterns = [
     path('stats/<int:channel_id>/payment/', views.channel_payment_messages_view, name='channel_payment_messages'),
     path('stats/<int:channel_id>/route/duplicates/', views.route_duplicates_view, name='route_duplicates'),
     
+    # ==================== CONTACTS ====================
+    path('contacts/', views.contacts_view, name='contacts'),
+    path('contacts/<str:phone>/', views.contact_detail_view, name='contact_detail'),
+    
+    # ==================== LANES ====================
+    path('lanes/', views.lanes_view, name='lanes'),
+    path('api/lanes/matrix/', views.lane_matrix_api, name='lane_matrix_api'),
+    path('api/shipments/timeseries/', views.shipment_timeseries_api, name='shipment_timeseries_api'),
+    
+    # ==================== API (v1) ====================
+    path('api/v1/shipments/', api.shipments_api, name='api_shipments'),
+    path('api/v1/messages/', api.messages_api, name='api_messages'),
+    path('api/v1/channels/<int:channel_id>/stats/', api.channel_stats_api, name='api_channel_stats'),
+    path('api/shipments/changes/', api.shipment_changes_api, name='api_shipment_changes'),
+    path('api/outbox/stats/', api.outbox_stats_api, name='api_outbox_stats'),
+    
     # ==================== EXPORT ====================
     path('export-json/', views.export_json, name='export_json'),
     path('excel-export/', views.excel_export_page, name='excel_export_page'),
     path('export-excel/', export_to_excel, name='export_excel'),
+    path('exports/jobs/', views.export_job_create, name='export_job_create'),
+    path('exports/jobs/<int:job_id>/', views.export_job_view, name='export_job'),
+    path('exports/jobs/<int:job_id>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     # path('parsing/<int:channel_id>/', parsing_progress_view, name='parsing_progress')
 
 ]
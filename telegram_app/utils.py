@@ -1,29 +1,69 @@
+import gzip
 import json
+import os
 import re
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
 from .models import TelegramMessage
 
-def save_messages_json():
-    """Barcha xabarlarni tahlil qilib JSON faylga saqlash."""
-    qs = TelegramMessage.objects.all()
-    all_extracted_shipments = []
+MESSAGES_JSON_CHUNK = 2000
+
+
+def save_messages_json(path="telegram_messages.jsonl", *, compress=False, chunk_size=MESSAGES_JSON_CHUNK, progress=None):
+    """
+    Barcha xabarlarni tahlil qilib JSON Lines faylga yozish (har qatorda bitta yuk).
+    Xabarlar bo'laklab o'qiladi va har bo'lak darhol faylga yoziladi - xotira sarfi
+    xabarlar soniga bog'liq emas. Qaytaradi: (xabarlar soni, yuklar soni)
+    """
+    rows = (
+        TelegramMessage.objects
+        .order_by('id')
+        .values_list('channel_id', 'user_id', 'date', 'text')
+        .iterator(chunk_size=chunk_size)
+    )
+    tmp_path = f"{path}.tmp"
+    opener = gzip.open if compress else open
+    messages = shipments = 0
+
+    try:
+        with opener(tmp_path, "wt", encoding="utf-8") as f:
+            batch = []
+            for channel_id, user_id, date, text in rows:
+                messages += 1
+                # Bitta xabardan bir nechta yuklarni sug'urib olamiz
+                for ship in parse_shipment_text(text):
+                    batch.append(json.dumps({
+                        "channel_id": channel_id,
+                        "user_id": user_id,
+                        "date": date.isoformat(),
+                        "text_original": text,  # Asl matn (ixtiyoriy)
+                        **ship  # Parsing natijalari (origin, destination, va h.k.)
+                    }, ensure_ascii=False))
+                if messages % chunk_size == 0:
+                    shipments += _flush_lines(f, batch)
+                    if progress:
+                        progress(messages)
+            shipments += _flush_lines(f, batch)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if progress:
+        progress(messages)
+    return messages, shipments
+
+
+def _flush_lines(f, batch):
+    count = len(batch)
+    if batch:
+        f.write("\n".join(batch) + "\n")
+        batch.clear()
+    return count
 
-    for m in qs:
-        # Bitta xabardan bir nechta yuklarni sug'urib olamiz
-        shipments = parse_shipment_text(m.text)
-        
-        for ship in shipments:
-            data = {
-                "channel_id": m.channel_id,
-                "user_id": m.user_id,
-                "date": m.date.isoformat(),
-                "text_original": m.text,  # Asl matn (ixtiyoriy)
-                **ship  # Parsing natijalari (origin, destination, va h.k.)
-            }
-            all_extracted_shipments.append(data)
-
-    with open("telegram_messages.json", "w", encoding="utf-8") as f:
-        json.dump(all_extracted_shipments, f, ensure_ascii=False, indent=4)
-import re
 
 def parse_shipment_text(text: str) -> list:
     """Xabarni telefon raqamlari zanjiri asosida bo'laklarga bo'ladi."""
@@ -93,6 +133,11 @@ def _parse_single_block(text: str) -> dict:
     phones = re.findall(r"\+?\d[\d\s\-\(\)]{8,}\d", text)
     phone = phones[0].strip() if phones else None
 
+    # Telefon bo'lmasa Telegram @username ham kontakt sifatida olinadi
+    if not phone:
+        usernames = re.findall(r"@[A-Za-z][A-Za-z0-9_]{4,31}", text)
+        phone = usernames[0] if usernames else None
+
     return {
         "origin": origin,
         "destination": destination,
@@ -100,4 +145,40 @@ def _parse_single_block(text: str) -> dict:
         "truck_type": truck_type,
         "payment_type": payment_type,
         "phone": phone,
-    }
\ No newline at end of file
+    }
+
+class InvalidDateRange(ValueError):
+    """GET dagi sana noto'g'ri (2024-02-30, 2024-13-01, 'abc', 9999-12-31) - view 400 qaytaradi."""
+
+
+def _parse_param_date(name, value):
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        # Format to'g'ri, lekin bunday sana yo'q
+        parsed = None
+    if parsed is None:
+        raise InvalidDateRange(f"{name} noto'g'ri sana: {value!r} (YYYY-MM-DD kutilgan)")
+    return parsed
+
+
+def resolve_date_range(date_from: str | None, date_to: str | None, default_days: int = 7):
+    """
+    GET parametrlaridagi sanalarni (YYYY-MM-DD) aware datetime oralig'iga aylantiradi.
+    Qaytaradi: (start, end, date_from, date_to) - end chegaraga kirmaydi (sargable filtr uchun).
+    Noto'g'ri sana bo'lsa InvalidDateRange.
+    """
+    today = timezone.localdate()
+    parsed_to = _parse_param_date('date_to', date_to) or today
+    parsed_from = _parse_param_date('date_from', date_from)
+
+    tz = timezone.get_current_timezone()
+    try:
+        parsed_from = parsed_from or parsed_to - timedelta(days=default_days - 1)
+        start = timezone.make_aware(datetime.combine(parsed_from, time.min), tz)
+        end = timezone.make_aware(datetime.combine(parsed_to + timedelta(days=1), time.min), tz)
+    except OverflowError:
+        raise InvalidDateRange("Sana oralig'i ruxsat etilgan chegaradan tashqarida")
+    return start, end, parsed_from, parsed_to
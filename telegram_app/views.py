@@ -1,25 +1,35 @@
 import asyncio
-import re
 import threading
 from django.conf import settings
 from django.contrib.auth import logout
-from django.db.models import Count, Q, Min, Max
-from django.http import HttpResponse
+from django.db.models import Count, Q
+from django.http import FileResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 from django.core.paginator import Paginator
-from django.views.decorators.http import require_POST
-from asgiref.sync import async_to_sync
-from django.db import models
+from django.views.decorators.http import condition, require_GET, require_http_methods, require_POST
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 
-from .models import TelegramSession, Channel, Message, Shipment
+from .models import TelegramSession, Channel, Message, Shipment, CompressionDictionary, Contact, ContactKind, ExportJob
 from .telethon_client import get_client, get_channels, get_messages
-from .utils import save_messages_json, parse_shipment_text
-from .bot_service import send_export_now
+from .utils import InvalidDateRange, resolve_date_range
+from .ingest import save_message
+from .dedup import FINGERPRINT_FIELDS, find_near_duplicates
+from .contacts import TOP_LIMIT as CONTACTS_TOP_LIMIT, channel_top_contacts, normalize_phone
+from .stats import get_channel_stats, get_dashboard_stats
+from .caching import cache_stats
+from .lanes import get_lane_matrix
+from .timeseries import (
+    DEFAULT_POINTS, INTERVALS, MAX_POINTS, RangeTooLarge, check_range, clean_filters, get_timeseries, timeseries_key,
+)
+from .pagination import keyset_paginate
+from .snippets import build_snippet, get_matcher
+from .jobs import submit_export
+from .export_engine import export_response
+from .compression import is_enabled as compression_is_enabled, text_searchable
+from .exports import CONTACT_PHONE_TOTALS, PHONE_TOTALS, SHIPMENT_FLAT, export_format
 from telethon import TelegramClient
 from telethon.sessions import StringSession
 from telethon.errors import SessionPasswordNeededError
@@ -52,27 +62,6 @@ def _run_async_in_thread(coro):
 
 # ==================== HELPER FUNCTIONS ====================
 
-def highlight_text(text, keywords):
-    """
-    Text ichidagi keywordslarni sariq rangda highlight qilish
-    """
-    if not text or not keywords:
-        return text
-    
-    # Har bir keyword uchun case-insensitive replace
-    highlighted = text
-    for keyword in keywords:
-        if keyword.strip():
-            # Regex bilan case-insensitive replace
-            pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-            highlighted = pattern.sub(
-                lambda m: f'<mark style="background-color: yellow;">{m.group()}</mark>',
-                highlighted
-            )
-    
-    return highlighted
-
-
 def _get_tg_credentials():
     api_id = getattr(settings, 'TG_API_ID', None)
     api_hash = getattr(settings, 'TG_API_HASH', None)
@@ -207,49 +196,23 @@ def home_view(request):
 def dashboard_view(request):
     today = timezone.localdate()
 
-    shipments = Shipment.objects.select_related('message__channel').filter(message__date__date=today)
-
-    total_today = shipments.count()
-
-    top_origins = (
-        shipments
-        .values('origin')
-        .annotate(total=Count('id'))
-        .order_by('-total')[:10]
-    )
-    top_destinations = (
-        shipments
-        .values('destination')
-        .annotate(total=Count('id'))
-        .order_by('-total')[:10]
-    )
-    top_payments = (
-        shipments
-        .values('payment_type')
-        .annotate(total=Count('id'))
-        .order_by('-total')[:10]
-    )
-    top_cargo = (
-        shipments
-        .values('cargo_type')
-        .annotate(total=Count('id'))
-        .order_by('-total')[:10]
-    )
+    # Agregatlar keshdan olinadi, ingest yangi yuk yozsa kesh eskiradi (stats.py)
+    stats, cache_hit = get_dashboard_stats(today)
 
     sent = request.GET.get('sent')
     error = request.GET.get('err')
 
     context = {
         'today': today,
-        'total_today': total_today,
-        'top_origins': top_origins,
-        'top_destinations': top_destinations,
-        'top_payments': top_payments,
-        'top_cargo': top_cargo,
+        **stats,
+        'cache_hit': cache_hit,
+        'cache_stats': cache_stats('dashboard'),
         'sent': sent,
         'error': error,
     }
-    return render(request, 'dashboard.html', context)
+    response = render(request, 'dashboard.html', context)
+    response['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
 
 
 @require_POST
@@ -258,12 +221,13 @@ def bot_export_view(request):
         days = int(request.POST.get('days') or 1)
     except Exception:
         days = 1
+    days = max(1, min(days, 60))
 
-    try:
-        async_to_sync(send_export_now)(days=days)
-        return redirect(f"/dashboard/?sent=1")
-    except Exception as exc:
-        return redirect(f"/dashboard/?err={str(exc)}")
+    # Fayl fon vazifasida tayyorlanadi va botga yuboriladi (jobs.py)
+    job = submit_export(
+        fmt=export_format(request.POST.get('format')), params={'days': days}, deliver=ExportJob.Deliver.BOT
+    )
+    return redirect('export_job', job_id=job.id)
 
 
 # ==================== 2️⃣ CHANNELS MANAGEMENT (SUBSCRIPTION) ====================
@@ -340,36 +304,17 @@ def fetch_messages_view(request, channel_id):
     channel_obj, _ = Channel.objects.get_or_create(channel_id=channel_id)
 
     for m in messages:
-        # 1. Asosiy xabarni saqlash yoki olish
-        msg_obj, _ = Message.objects.get_or_create(
-            channel=channel_obj,
+        # Xabar va undan ajratilgan yuklarni saqlash (ingest.py)
+        save_message(
+            channel_obj,
             message_id=m.id,
-            defaults={
-                'sender_id': getattr(m.from_id, 'user_id', None),
-                'sender_name': getattr(m.sender, 'username', None) if m.sender else None,
-                'text': m.message,
-                'date': m.date,
-            },
+            sender_id=getattr(m.from_id, 'user_id', None),
+            sender_name=getattr(m.sender, 'username', None) if m.sender else None,
+            text=m.message,
+            date=m.date,
         )
 
-        # 2. Xabarni tahlil qilish (Endi bu LIST qaytaradi)
-        parsed_shipments = parse_shipment_text(m.message or "")
-
-        # 3. Har bir topilgan yukni alohida Shipment sifatida saqlash
-# views.py -> fetch_messages_view ichida
-        for parsed in parsed_shipments:
-            Shipment.objects.update_or_create(
-                message=msg_obj,
-                origin=parsed.get('origin'),
-                destination=parsed.get('destination'),
-                phone=parsed.get('phone'), # <--- Filtrga qo'shildi
-                defaults={
-                    'cargo_type': parsed.get('cargo_type'),
-                    'truck_type': parsed.get('truck_type'),
-                    'payment_type': parsed.get('payment_type'),
-                },
-            )
-            return redirect('channel_stats', channel_id=channel_id)
+    return redirect('channel_stats', channel_id=channel_id)
 
 # ==================== 1️⃣ MESSAGES WITH TAG SEARCH & HIGHLIGHT ====================
 
@@ -377,7 +322,7 @@ def saved_messages_view(request):
     """
     1️⃣ TAG filter va highlight bilan messages
     """
-    messages = Message.objects.select_related('channel').order_by('-date')
+    messages = Message.objects.select_related('channel')
 
     # Sana filtri
     date_from = request.GET.get('date_from', '')
@@ -404,18 +349,29 @@ def saved_messages_view(request):
         for keyword in keywords:
             q_objects |= Q(text__icontains=keyword)
         
-        messages = messages.filter(q_objects)
+        # Siqilgan (eski) xabarlarda `text` NULL - qidiruv faqat siqilmaganlar ustida
+        messages = text_searchable(messages).filter(q_objects)
 
     # Highlight uchun keywordslarni context'ga yuborish
-    paginator = Paginator(messages, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # (date, id) bo'yicha keyset pagination - OFFSET va COUNT(*) siz
+    page_obj = keyset_paginate(request, messages, date_field='date')
 
-    # Har bir message uchun highlighted text yaratish
+    # Har bir message uchun qisqa, escape qilingan snippet (matcher bir marta kompilyatsiya qilinadi)
+    matcher = get_matcher(keywords)
     for msg in page_obj.object_list:
-        msg.highlighted_text = highlight_text(msg.text, keywords)
+        msg.highlighted_text = build_snippet(msg.text, matcher) if matcher else None
+
+    # Siqilgan matnlar: tejalgan joy va shu sahifani ochish vaqti (64 KB lug'at o'qilmaydi)
+    compression_stats = CompressionDictionary.objects.defer('data').order_by('-id').first()
+    decompress_ms = sum(msg.decompress_seconds for msg in page_obj.object_list) * 1000
 
     context = {
+        'compression_stats': compression_stats,
+        'search_skips_compressed': bool(keywords) and (
+            compression_is_enabled() or bool(compression_stats and compression_stats.message_count)
+        ),
+        'compression_after_days': settings.MESSAGE_TEXT_COMPRESSION_AFTER_DAYS,
+        'decompress_ms': decompress_ms,
         'messages': page_obj.object_list,
         'page_obj': page_obj,
         'date_from': date_from,
@@ -438,10 +394,20 @@ def message_detail_view(request, message_id):
         shipment = message.shipment
     except Shipment.DoesNotExist:
         shipment = None
+
+    # Barcha kanallardagi yaqin-dublikatlar (SimHash bandlari orqali)
+    near_duplicates = [
+        msg for msg in find_near_duplicates(
+            Message.objects.select_related('channel'),
+            {field: getattr(message, field) for field in FINGERPRINT_FIELDS},
+        )
+        if msg.pk != message.pk
+    ]
     
     context = {
         'message': message,
         'shipment': shipment,
+        'near_duplicates': near_duplicates[:20],
     }
     return render(request, 'message_detail.html', context)
 
@@ -460,30 +426,25 @@ def route_duplicates_view(request, channel_id):
         origin=origin,
         destination=destination
     ).select_related('message').order_by('-message__date')
-    
-    # Dublikat detection (text similarity)
-    total_count = shipments.count()
-    unique_texts = set()
-    duplicate_count = 0
-    
-    shipments_with_status = []
-    for shipment in shipments:
-        text = (shipment.message.text or "").strip().lower()
-        
-        if text in unique_texts:
-            is_duplicate = True
-            duplicate_count += 1
-        else:
-            is_duplicate = False
-            unique_texts.add(text)
-        
-        shipments_with_status.append({
-            'shipment': shipment,
-            'is_duplicate': is_duplicate
-        })
-    
+
+    # Dublikatlar ingest paytida SimHash indeksi orqali belgilanadi (dedup.py):
+    # boshqa (istalgan kanaldagi) avvalgi xabarga yaqin bo'lsa - dublikat.
+    counts = shipments.aggregate(
+        total=Count('id'),
+        duplicates=Count('id', filter=Q(message__duplicate_of__isnull=False)),
+    )
+    total_count = counts['total']
+    duplicate_count = counts['duplicates']
     unique_count = total_count - duplicate_count
-    
+
+    shipments_with_status = [
+        {
+            'shipment': shipment,
+            'is_duplicate': shipment.message.duplicate_of_id is not None,
+        }
+        for shipment in shipments
+    ]
+
     context = {
         'channel_id': channel_id,
         'origin': origin,
@@ -499,7 +460,8 @@ def route_duplicates_view(request, channel_id):
 # ==================== EXISTING VIEWS (Updated) ====================
 
 def _get_filtered_shipments(request, channel_id):
-    shipments = Shipment.objects.filter(message__channel__channel_id=channel_id)
+    # channel va date - xabardan nusxa: JOIN siz, (channel, -date, -id) indeksi bo'yicha
+    shipments = Shipment.objects.filter(channel__channel_id=channel_id)
 
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
@@ -508,9 +470,9 @@ def _get_filtered_shipments(request, channel_id):
     parsed_to = parse_date(date_to) if date_to else None
 
     if parsed_from:
-        shipments = shipments.filter(message__date__date__gte=parsed_from)
+        shipments = shipments.filter(date__date__gte=parsed_from)
     if parsed_to:
-        shipments = shipments.filter(message__date__date__lte=parsed_to)
+        shipments = shipments.filter(date__date__lte=parsed_to)
 
     search_query = request.GET.get('search', '').strip()
     if search_query:
@@ -532,66 +494,36 @@ def channel_stats_view(request, channel_id):
     """
     shipments, date_from, date_to = _get_filtered_shipments(request, channel_id)
 
+    # Barcha o'lchovlar bitta so'rovda hisoblanadi va filtr bo'yicha keshlanadi,
+    # sahifalar esa keshdagi ro'yxatlarni varaqlaydi (stats.py)
+    stats = get_channel_stats(channel_id, shipments, {
+        'date_from': date_from,
+        'date_to': date_to,
+        'search': request.GET.get('search', '').strip(),
+    })
+
     # Agar sana tanlanmagan bo'lsa, barcha yuklar oralig'ini ko'rsatish
     if not date_from and not date_to:
-        # Eng eski va eng yangi xabar sanalarini topish
-        dates = shipments.aggregate(
-            oldest=models.Min('message__date'),
-            newest=models.Max('message__date')
-        )
-        if dates['oldest']:
-            date_from = dates['oldest'].strftime('%Y-%m-%d')
-        if dates['newest']:
-            date_to = dates['newest'].strftime('%Y-%m-%d')
-
-    # A → B yo'nalishlar + dublikat hisobi
-    route_qs = (
-        shipments
-        .values('origin', 'destination')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
-    route_paginator = Paginator(route_qs, 20)
-    route_page_number = request.GET.get('route_page', 1)
-    route_page_obj = route_paginator.get_page(route_page_number)
+        if stats['oldest']:
+            date_from = stats['oldest'].strftime('%Y-%m-%d')
+        if stats['newest']:
+            date_to = stats['newest'].strftime('%Y-%m-%d')
+
+    route_page_obj = Paginator(stats['route'], 20).get_page(request.GET.get('route_page', 1))
     route_stats = route_page_obj.object_list
 
-    cargo_qs = (
-        shipments
-        .values('cargo_type')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
-    cargo_paginator = Paginator(cargo_qs, 20)
-    cargo_page_number = request.GET.get('cargo_page', 1)
-    cargo_page_obj = cargo_paginator.get_page(cargo_page_number)
+    cargo_page_obj = Paginator(stats['cargo'], 20).get_page(request.GET.get('cargo_page', 1))
     cargo_stats = cargo_page_obj.object_list
 
-    truck_qs = (
-        shipments
-        .values('truck_type')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
-    truck_paginator = Paginator(truck_qs, 20)
-    truck_page_number = request.GET.get('truck_page', 1)
-    truck_page_obj = truck_paginator.get_page(truck_page_number)
+    truck_page_obj = Paginator(stats['truck'], 20).get_page(request.GET.get('truck_page', 1))
     truck_stats = truck_page_obj.object_list
 
-    payment_qs = (
-        shipments
-        .values('payment_type')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
-    payment_paginator = Paginator(payment_qs, 20)
-    payment_page_number = request.GET.get('payment_page', 1)
-    payment_page_obj = payment_paginator.get_page(payment_page_number)
+    payment_page_obj = Paginator(stats['payment'], 20).get_page(request.GET.get('payment_page', 1))
     payment_stats = payment_page_obj.object_list
 
     context = {
         'channel_id': channel_id,
-        'total_shipments': shipments.count(),
+        'total_shipments': stats['total'],
         'route_stats': route_stats,
         'route_page_obj': route_page_obj,
         'cargo_stats': cargo_stats,
@@ -618,78 +550,54 @@ def channel_stats_excel(request, channel_id):
         filename_parts.append(f"to_{date_to}")
     filename_base = "_".join(filename_parts)
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename_base}.xlsx"'
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Shipments"
-
-    headers = [
-        'channel_id', 'channel_title', 'message_id', 'date',
-        'origin', 'destination', 'cargo_type', 'truck_type',
-        'payment_type', 'phone',
-    ]
-    ws.append(headers)
-
-    for shipment in shipments.select_related('message__channel'):
-        msg = shipment.message
-        ch = msg.channel
-        ws.append([
-            ch.channel_id,
-            ch.title or "",
-            msg.message_id,
-            msg.date.isoformat() if msg.date else "",
-            shipment.origin or "",
-            shipment.destination or "",
-            shipment.cargo_type or "",
-            shipment.truck_type or "",
-            shipment.payment_type or "",
-            shipment.phone or "",
-        ])
-
-    for idx in range(1, len(headers) + 1):
-        col_letter = get_column_letter(idx)
-        ws.column_dimensions[col_letter].width = 18
-
-    wb.save(response)
-    return response
+    fmt = export_format(request.GET.get('format'))
+    return export_response(SHIPMENT_FLAT, shipments, fmt, filename_base)
 
 
 def channel_phones_view(request, channel_id):
     shipments, date_from, date_to = _get_filtered_shipments(request, channel_id)
 
     search_query = request.GET.get('search', '').strip()
+    id_kinds = [ContactKind.USERNAME, ContactKind.OTHER]
+
+    if not date_from and not date_to and not search_query:
+        # Filtrsiz holatda kontaktlar katalogidan: (channel, kind, -total) indeksi
+        channel = Channel.objects.filter(channel_id=channel_id).first()
+
+        def top(kinds):
+            return [
+                {'phone': stat.contact.display_phone or stat.contact.phone, 'total': stat.total, 'contact': stat.contact}
+                for stat in channel_top_contacts(channel, limit=CONTACTS_TOP_LIMIT + 1, kinds=kinds)
+            ]
+
+        phone_stats = top([ContactKind.PHONE])
+        id_stats = top(id_kinds)
+    else:
+        # Kontakt turi ingest paytida saqlangan, shuning uchun ikkita guruhlangan so'rov
+        contacts = (
+            shipments
+            .exclude(phone__isnull=True)
+            .exclude(phone__exact="")
+        )
+        if search_query:
+            contacts = contacts.filter(phone__icontains=search_query)
 
-    raw_stats = (
-        shipments
-        .exclude(phone__isnull=True)
-        .exclude(phone__exact="")
-        .values('phone')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
-
-    if search_query:
-        raw_stats = raw_stats.filter(phone__icontains=search_query)
-
-    phone_stats = []
-    id_stats = []
+        def grouped(qs):
+            return qs.values('phone').annotate(total=Count('id')).order_by('-total')
 
-    for item in raw_stats:
-        phone = item['phone'] or ""
-        digits_only = ''.join(ch for ch in phone if ch.isdigit())
-        if phone.startswith('+') or len(digits_only) >= 9:
-            phone_stats.append(item)
-        else:
-            id_stats.append(item)
+        phone_qs = grouped(contacts.filter(contact_kind=ContactKind.PHONE))
+        id_qs = grouped(contacts.filter(contact_kind__in=id_kinds))
+        phone_stats = list(phone_qs[:CONTACTS_TOP_LIMIT + 1])
+        id_stats = list(id_qs[:CONTACTS_TOP_LIMIT + 1])
 
+    # Aniq jami (COUNT) hisoblanmaydi - u kontaktlar soniga chiziqli; LIMIT+1 qator
+    # olinib, ko'proq bo'lsa "N+" ko'rsatiladi (to'liq ro'yxat - Excel export).
     context = {
         'channel_id': channel_id,
-        'phone_stats': phone_stats,
-        'id_stats': id_stats,
+        'phone_stats': phone_stats[:CONTACTS_TOP_LIMIT],
+        'id_stats': id_stats[:CONTACTS_TOP_LIMIT],
+        'phone_more': len(phone_stats) > CONTACTS_TOP_LIMIT,
+        'id_more': len(id_stats) > CONTACTS_TOP_LIMIT,
         'date_from': date_from,
         'date_to': date_to,
     }
@@ -701,17 +609,23 @@ def channel_phones_excel(request, channel_id):
 
     search_query = request.GET.get('search', '').strip()
 
-    phone_stats = (
-        shipments
-        .exclude(phone__isnull=True)
-        .exclude(phone__exact="")
-        .values('phone')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
+    if not date_from and not date_to and not search_query:
+        # Filtrsiz holatda kontaktlar katalogidan
+        spec = CONTACT_PHONE_TOTALS
+        phone_stats = channel_top_contacts(Channel.objects.filter(channel_id=channel_id).first(), limit=None)
+    else:
+        spec = PHONE_TOTALS
+        phone_stats = (
+            shipments
+            .exclude(phone__isnull=True)
+            .exclude(phone__exact="")
+            .values('phone')
+            .annotate(total=Count('id'))
+            .order_by('-total')
+        )
 
-    if search_query:
-        phone_stats = phone_stats.filter(phone__icontains=search_query)
+        if search_query:
+            phone_stats = phone_stats.filter(phone__icontains=search_query)
 
     filename_parts = [f"channel_{channel_id}_phones"]
     if date_from:
@@ -722,29 +636,148 @@ def channel_phones_excel(request, channel_id):
         filename_parts.append(f"search_{search_query[:20]}")
     filename_base = "_".join(filename_parts)
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return export_response(spec, phone_stats, export_format(request.GET.get('format')), filename_base)
+
+
+def contacts_view(request):
+    """Kontaktlar katalogi: telefon bo'yicha tezkor qidiruv"""
+    query = request.GET.get('q', '').strip()
+
+    contacts = Contact.objects.order_by('-last_seen')
+    if query:
+        contacts = contacts.filter(phone__startswith=normalize_phone(query))
+
+    return render(request, 'contacts.html', {
+        'contacts': contacts[:50],
+        'query': query,
+    })
+
+
+def contact_detail_view(request, phone):
+    """Bitta kontakt: agregatlar va oxirgi yuklari"""
+    contact = get_object_or_404(Contact, phone=normalize_phone(phone))
+
+    recent_shipments = (
+        contact.shipments
+        .select_related('channel')
+        .order_by('-date', '-id')[:50]
     )
-    response['Content-Disposition'] = f'attachment; filename="{filename_base}.xlsx"'
+    channel_stats = contact.channel_stats.select_related('channel').order_by('-total')
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Phones"
+    context = {
+        'contact': contact,
+        'top_routes': contact.top_routes(),
+        'channel_stats': channel_stats,
+        'shipments': recent_shipments,
+    }
+    return render(request, 'contact_detail.html', context)
 
-    headers = ['phone', 'total_shipments']
-    ws.append(headers)
 
-    for item in phone_stats:
-        ws.append([
-            item['phone'],
-            item['total'],
-        ])
+# ==================== LANES ====================
+def _lane_matrix_params(request):
+    start, end, date_from, date_to = resolve_date_range(
+        request.GET.get('date_from'), request.GET.get('date_to'), default_days=30
+    )
+    channel_ids = []
+    for raw in request.GET.get('channels', '').split(','):
+        raw = raw.strip()
+        if raw.lstrip('-').isdigit():
+            channel_ids.append(int(raw))
+    try:
+        top = max(1, min(int(request.GET.get('top') or 20), 200))
+    except ValueError:
+        top = 20
+    return start, end, date_from, date_to, channel_ids, top
 
-    for idx in range(1, len(headers) + 1):
-        col_letter = get_column_letter(idx)
-        ws.column_dimensions[col_letter].width = 20
 
-    wb.save(response)
+def lane_matrix_api(request):
+    """Origin × destination matritsasi (JSON): sparse + top-K + heatmap"""
+    try:
+        start, end, date_from, date_to, channel_ids, top = _lane_matrix_params(request)
+    except InvalidDateRange as exc:
+        return JsonResponse({'error': str(exc)}, status=400, json_dumps_params={'ensure_ascii': False})
+    matrix, cache_hit = get_lane_matrix(start, end, channel_ids, top_k=top)
+
+    response = JsonResponse({
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'channels': channel_ids,
+        **matrix,
+    }, json_dumps_params={'ensure_ascii': False})
+    response['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
+
+
+def lanes_view(request):
+    """Yo'nalishlar heatmap sahifasi"""
+    try:
+        start, end, date_from, date_to, channel_ids, top = _lane_matrix_params(request)
+    except InvalidDateRange as exc:
+        return HttpResponseBadRequest(str(exc))
+    matrix, cache_hit = get_lane_matrix(start, end, channel_ids, top_k=top)
+
+    heatmap = matrix['heatmap']
+    peak = heatmap['max'] or 1
+    rows = [
+        (origin, [(value, f'{value / peak:.2f}') for value in cells])
+        for origin, cells in zip(heatmap['origins'], heatmap['cells'])
+    ]
+
+    context = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'channels': Channel.objects.order_by('title'),
+        'selected_channels': channel_ids,
+        'matrix': matrix,
+        'heatmap_rows': rows,
+        'cache_hit': cache_hit,
+    }
+    return render(request, 'lanes.html', context)
+
+
+# ==================== TIMESERIES ====================
+def _timeseries_params(request):
+    interval = request.GET.get('interval', 'day')
+    if interval not in INTERVALS:
+        interval = 'day'
+    default_days = {'hour': 2, 'day': 30, 'week': 182}[interval]
+    start, end, date_from, date_to = resolve_date_range(
+        request.GET.get('date_from'), request.GET.get('date_to'), default_days=default_days
+    )
+    try:
+        points = max(10, min(int(request.GET.get('points') or DEFAULT_POINTS), MAX_POINTS))
+    except ValueError:
+        points = DEFAULT_POINTS
+    return start, end, interval, clean_filters(request.GET), points
+
+
+def _timeseries_etag(request):
+    # Kalitda kesh versiyasi bor: yangi yuk kelmaguncha ETag o'zgarmaydi
+    try:
+        start, end, interval, filters, points = _timeseries_params(request)
+        check_range(start, end, interval)
+    except (InvalidDateRange, RangeTooLarge):
+        return None
+    return timeseries_key(start, end, interval, filters, points)
+
+
+@require_GET
+@condition(etag_func=_timeseries_etag)
+def shipment_timeseries_api(request):
+    """Yuklar soni vaqt bo'yicha: ?interval=hour|day|week&origin=&destination=&channel=&cargo_type=&phone="""
+    try:
+        start, end, interval, filters, points = _timeseries_params(request)
+        series, cache_hit = get_timeseries(start, end, interval, filters, points)
+    except (InvalidDateRange, RangeTooLarge) as exc:
+        return JsonResponse({'error': str(exc)}, status=400, json_dumps_params={'ensure_ascii': False})
+
+    response = JsonResponse({
+        'date_from': start.isoformat(),
+        'date_to': end.isoformat(),
+        'filters': filters,
+        **series,
+    }, json_dumps_params={'ensure_ascii': False})
+    response['X-Cache'] = 'HIT' if cache_hit else 'MISS'
     return response
 
 
@@ -764,7 +797,7 @@ def channel_phone_messages_view(request, channel_id):
             Q(phone__icontains=phone_clean[-9:]) if len(phone_clean) >= 9 else Q()  # Oxirgi 9 ta raqam
         )
 
-    shipments = shipments.select_related('message__channel').order_by('-message__date')
+    page = keyset_paginate(request, shipments.select_related('message__channel'), date_field='date')
 
     context = {
         'channel_id': channel_id,
@@ -776,7 +809,8 @@ def channel_phone_messages_view(request, channel_id):
         'payment_type': None,
         'date_from': date_from,
         'date_to': date_to,
-        'shipments': shipments,
+        'shipments': page.object_list,
+        'page': page,
     }
     return render(request, 'phone_messages.html', context)
 
@@ -792,7 +826,7 @@ def channel_route_messages_view(request, channel_id):
     if destination:
         shipments = shipments.filter(destination=destination)
 
-    shipments = shipments.select_related('message__channel').order_by('-message__date')
+    page = keyset_paginate(request, shipments.select_related('message__channel'), date_field='date')
 
     context = {
         'channel_id': channel_id,
@@ -801,7 +835,8 @@ def channel_route_messages_view(request, channel_id):
         'cargo_type': None,
         'date_from': date_from,
         'date_to': date_to,
-        'shipments': shipments,
+        'shipments': page.object_list,
+        'page': page,
     }
     return render(request, 'route_messages.html', context)
 
@@ -813,7 +848,7 @@ def channel_cargo_messages_view(request, channel_id):
     if cargo_type:
         shipments = shipments.filter(cargo_type=cargo_type)
 
-    shipments = shipments.select_related('message__channel').order_by('-message__date')
+    page = keyset_paginate(request, shipments.select_related('message__channel'), date_field='date')
 
     context = {
         'channel_id': channel_id,
@@ -822,7 +857,8 @@ def channel_cargo_messages_view(request, channel_id):
         'cargo_type': cargo_type,
         'date_from': date_from,
         'date_to': date_to,
-        'shipments': shipments,
+        'shipments': page.object_list,
+        'page': page,
     }
     return render(request, 'route_messages.html', context)
 
@@ -834,7 +870,7 @@ def channel_truck_messages_view(request, channel_id):
     if truck_type:
         shipments = shipments.filter(truck_type=truck_type)
 
-    shipments = shipments.select_related('message__channel').order_by('-message__date')
+    page = keyset_paginate(request, shipments.select_related('message__channel'), date_field='date')
 
     context = {
         'channel_id': channel_id,
@@ -845,7 +881,8 @@ def channel_truck_messages_view(request, channel_id):
         'payment_type': None,
         'date_from': date_from,
         'date_to': date_to,
-        'shipments': shipments,
+        'shipments': page.object_list,
+        'page': page,
     }
     return render(request, 'route_messages.html', context)
 
@@ -857,7 +894,7 @@ def channel_payment_messages_view(request, channel_id):
     if payment_type:
         shipments = shipments.filter(payment_type=payment_type)
 
-    shipments = shipments.select_related('message__channel').order_by('-message__date')
+    page = keyset_paginate(request, shipments.select_related('message__channel'), date_field='date')
 
     context = {
         'channel_id': channel_id,
@@ -868,14 +905,85 @@ def channel_payment_messages_view(request, channel_id):
         'payment_type': payment_type,
         'date_from': date_from,
         'date_to': date_to,
-        'shipments': shipments,
+        'shipments': page.object_list,
+        'page': page,
     }
     return render(request, 'route_messages.html', context)
 
 
+# ==================== EXPORT JOBS ====================
+@require_POST
+def export_job_create(request):
+    """Export vazifasini navbatga qo'yish va progress sahifasiga o'tish"""
+    try:
+        days = max(1, min(int(request.POST.get('days') or 1), 365))
+    except ValueError:
+        days = 1
+    job = submit_export(fmt=export_format(request.POST.get('format')), params={'days': days})
+    return redirect('export_job', job_id=job.id)
+
+
+def _job_progress(job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'current': job.processed_rows,
+        'total': job.total_rows,
+        'percent': job.percent,
+        'eta_seconds': job.eta_seconds,
+        'error': job.error,
+    }
+
+
+def export_job_view(request, job_id):
+    """Export progress sahifasi: yozilgan qatorlar, ETA, tayyor bo'lsa yuklash havolasi"""
+    job = get_object_or_404(ExportJob, id=job_id)
+    return render(request, 'parsing_progress.html', {
+        'job': job,
+        'progress': _job_progress(job),
+    })
+
+
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    return JsonResponse(_job_progress(job))
+
+
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, status=ExportJob.Status.DONE)
+    try:
+        handle = open(job.file_path, 'rb')
+    except OSError:
+        # Fayl muddati o'tib o'chirilgan - qayta tayyorlash
+        job = submit_export(kind=job.kind, fmt=job.fmt, params=job.params)
+        return redirect('export_job', job_id=job.id)
+    return FileResponse(handle, as_attachment=True, filename=job.filename)
+
+
+@require_http_methods(['GET', 'POST'])
 def export_json(request):
-    save_messages_json()
-    return HttpResponse("JSON file created successfully!")
+    """
+    Xabarlarni JSON Lines ga yozish fon vazifasida bajariladi (jobs.py):
+    POST vazifani navbatga qo'yadi, GET ?job=<id> holatini qaytaradi.
+    """
+    if request.method == 'POST':
+        fmt = 'jsonl.gz' if request.POST.get('gzip') else 'jsonl'
+        job = submit_export(kind='messages_json', fmt=fmt)
+    else:
+        job_id = request.GET.get('job', '')
+        if not job_id.isdigit():
+            return JsonResponse(
+                {'error': "Vazifa POST bilan yaratiladi; holati uchun ?job=<id>"},
+                status=400, json_dumps_params={'ensure_ascii': False},
+            )
+        job = get_object_or_404(ExportJob, id=int(job_id), kind='messages_json')
+
+    data = _job_progress(job)
+    data['status_url'] = f"{reverse('export_json')}?job={job.id}"
+    data['progress_url'] = reverse('export_job', args=[job.id])
+    if job.status == ExportJob.Status.DONE:
+        data['download_url'] = reverse('export_job_download', args=[job.id])
+    return JsonResponse(data, status=200 if job.is_finished else 202)
 
 
 def logout_view(request):